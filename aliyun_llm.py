@@ -1,30 +1,60 @@
 # coding=utf-8
-from openai import OpenAI
-import os
+import sys
+import atexit
+import threading
+from tool.llm.AsyncLLMClient import SyncLLMClient
+
+# 进程内共享的同步客户端，按(API密钥, 服务)各创建一个：所有实例共用一个后台事件循环、连接池和限流配额
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key=None, backend=None):
+    """获取共享的同步客户端，首次使用时创建"""
+    key = (api_key, backend)
+    with _clients_lock:
+        if key not in _clients:
+            if not _clients:
+                atexit.register(close_clients)
+            _clients[key] = SyncLLMClient(api_key=api_key, backend=backend)
+        return _clients[key]
+
+
+def close_clients():
+    """关闭所有共享客户端，进程退出时自动调用"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
 
 class AliyunLLM:
     """
     阿里云大语言模型API封装类
     """
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache=None, backend=None):
         """
         初始化阿里云大语言模型客户端
         
         Args:
             api_key: 阿里云API密钥，如果不提供则尝试从环境变量获取
+            cache: 响应缓存(ResponseCache)，可选，提供后相同请求直接返回缓存结果
+            backend: 服务名称（dashscope/deepseek/ollama/mock），可选，默认读取环境变量LLM_BACKEND
         """
-        # 优先使用传入的API密钥，否则尝试从环境变量获取
-        self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY", "sk-c8464e16fdc844fd8ca1399062d3c1d7")
-        self.base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
-        
-        # 初始化OpenAI客户端
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-        )
+        # 使用进程内共享的同步客户端，所有实例共享连接池、并发数和限流配额
+        # 服务由环境变量 LLM_BACKEND 选择（默认阿里云），未传入API密钥时使用服务配置中的密钥
+        self.client = get_client(api_key, backend)
+        self.api_key = self.client.client.api_key
+        self.base_url = self.client.client.base_url
+        self.cache = cache
+        self.last_metrics = None
+        self._reasoning_started = False
+        self._answer_started = False
     
-    def chat(self, prompt, model="qwq-32b", system_prompt=None, include_reasoning=True, return_raw_text=False):
+    def chat(self, prompt, model="qwq-32b", system_prompt=None, include_reasoning=True, return_raw_text=False,
+             on_reasoning=None, on_content=None, return_metrics=False):
         """
         发送聊天请求到阿里云大语言模型
         
@@ -34,63 +64,62 @@ class AliyunLLM:
             system_prompt: 系统提示信息，可选
             include_reasoning: 是否显示思考过程，默认为True
             return_raw_text: 是否仅返回纯文本结果，默认为False
+            on_reasoning: 收到思考过程增量时的回调，可选，提供后不再默认打印思考过程
+            on_content: 收到回复内容增量时的回调，可选，提供后不再默认打印回复内容
+            return_metrics: 是否在返回值末尾附加计时指标，默认为False
             
         Returns:
             如果return_raw_text=True，返回完整回复内容的字符串
             如果return_raw_text=False，返回(思考过程,回复内容)的元组
+            return_metrics=True时在以上结果后附加计时指标字典（首token时间ttft、首个回复token时间ttfa、
+            生成速度tokens_per_second、用量usage），最近一次的指标也保存在last_metrics中
         """
-        # 构建消息列表
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-        
-        # 阿里云模型只支持流式请求
-        completion = self.client.chat.completions.create(
-            model=model,
-            messages=messages,
-            stream=True  # 阿里云要求必须使用流式模式
-        )
+        display = include_reasoning and not return_raw_text
         
-        reasoning_content = ""  # 定义完整思考过程
-        answer_content = ""     # 定义完整回复
-        is_answering = False    # 判断是否结束思考过程并开始回复
+        # 默认的显示方式：直接写入标准输出，不逐块刷新
+        if display:
+            on_reasoning = on_reasoning or self._print_reasoning
+            on_content = on_content or self._print_content
+            self._reasoning_started = False
+            self._answer_started = False
         
-        if include_reasoning and not return_raw_text:
-            print("\n" + "=" * 20 + "思考过程" + "=" * 20 + "\n")
+        # 缓存、重试、熔断和对冲都由统一客户端处理；没有增量回调时才会对冲
+        reasoning_content, answer_content, self.last_metrics = self.client.chat(
+            prompt, model=model, system_prompt=system_prompt, on_reasoning=on_reasoning, on_content=on_content,
+            return_metrics=True, cache=self.cache)
         
-        for chunk in completion:
-            # 如果chunk.choices为空，则是usage信息
-            if not chunk.choices:
-                if hasattr(chunk, 'usage') and include_reasoning and not return_raw_text:
-                    print("\nToken使用情况:")
-                    print(chunk.usage)
-            else:
-                delta = chunk.choices[0].delta
-                # 处理思考过程
-                if hasattr(delta, 'reasoning_content') and delta.reasoning_content is not None:
-                    if include_reasoning and not return_raw_text:
-                        print(delta.reasoning_content, end='', flush=True)
-                    reasoning_content += delta.reasoning_content
-                else:
-                    # 开始回复部分
-                    if delta.content != "" and is_answering is False:
-                        if include_reasoning and not return_raw_text:
-                            print("\n" + "=" * 20 + "完整回复" + "=" * 20 + "\n")
-                        is_answering = True
-                    # 输出回复内容
-                    if include_reasoning and not return_raw_text:
-                        print(delta.content, end='', flush=True)
-                    answer_content += delta.content
+        # 结束后打印一个换行和用量信息
+        if display:
+            if self.last_metrics.get("cached"):
+                print("\n" + "=" * 20 + "完整回复(缓存)" + "=" * 20 + "\n")
+                print(answer_content)
+            sys.stdout.write("\n")
+            if self.last_metrics.get("usage"):
+                print("\nToken使用情况:")
+                print(self.last_metrics["usage"])
+            sys.stdout.flush()
         
-        # 结束后打印一个换行
-        if include_reasoning and not return_raw_text:
-            print()
-            
-        if return_raw_text:
-            return answer_content
-        else:
-            return (reasoning_content, answer_content)
+        return self._result(reasoning_content, answer_content, return_raw_text, return_metrics)
+    
+    def _result(self, reasoning_content, answer_content, return_raw_text, return_metrics):
+        result = (answer_content,) if return_raw_text else (reasoning_content, answer_content)
+        if return_metrics:
+            result += (self.last_metrics,)
+        return result[0] if len(result) == 1 else result
+    
+    def _print_reasoning(self, text):
+        # 第一个思考过程到达时打印分隔标题，命中缓存时不打印
+        if not self._reasoning_started:
+            sys.stdout.write("\n" + "=" * 20 + "思考过程" + "=" * 20 + "\n\n")
+            self._reasoning_started = True
+        sys.stdout.write(text)
+    
+    def _print_content(self, text):
+        # 第一个回复内容到达时打印分隔标题
+        if not self._answer_started:
+            sys.stdout.write("\n" + "=" * 20 + "完整回复" + "=" * 20 + "\n\n")
+            self._answer_started = True
+        sys.stdout.write(text)
     
     def chat_without_streaming_display(self, prompt, model="qwq-32b", system_prompt=None):
         """
@@ -0,0 +1,307 @@
+# coding=utf-8
+"""
+api_server 的Python客户端
+
+- APIClient: 基于requests.Session的同步客户端，长连接复用，5xx/429等临时错误按指数退避自动重试，
+  服务端返回Retry-After时按其等待
+- AsyncAPIClient: 基于httpx的异步客户端，同样的重试策略，并发数有上限，适合一次提交大量提问
+
+两个客户端都支持流式接口(/api/chat/stream)和批量接口(/api/chat/batch):
+
+    with APIClient() as client:
+        print(client.chat("你好")["answer"])
+        for event in client.stream("写一首短诗"):
+            print(event)
+
+    async with AsyncAPIClient(concurrency=10) as client:
+        results = await client.chat_many(["问题1", "问题2"])
+"""
+import json
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    # 只使用同步客户端时不需要安装httpx
+    httpx = None
+
+API_BASE_URL = "http://localhost:5000"  # API服务的基础URL
+
+# 可重试的状态码：限流、服务端错误和网关错误
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class APIError(Exception):
+    """API返回错误"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_retry_after(value):
+    """解析Retry-After头，支持秒数和HTTP日期两种格式，返回等待秒数"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, backoff_factor, max_backoff, retry_after=None):
+    """第attempt次重试前的等待秒数：优先使用Retry-After，否则指数退避并加随机抖动"""
+    if retry_after is not None:
+        return min(retry_after, max_backoff)
+    delay = min(max_backoff, backoff_factor * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+def build_payload(prompt, system_prompt=None):
+    data = {"prompt": prompt}
+    if system_prompt:
+        data["system_prompt"] = system_prompt
+    return data
+
+
+def build_batch_payload(prompts, system_prompt=None, concurrency=None, with_reasoning=False):
+    data = {"prompts": prompts, "with_reasoning": with_reasoning}
+    if system_prompt:
+        data["system_prompt"] = system_prompt
+    if concurrency:
+        data["concurrency"] = concurrency
+    return data
+
+
+def parse_sse_line(line):
+    """解析一行Server-Sent Events，data行返回事件字典，其他行返回None"""
+    if line and line.startswith("data:"):
+        return json.loads(line[5:].strip())
+    return None
+
+
+def unwrap(result, status_code=None):
+    """取出响应中的data，status为error时抛出APIError"""
+    if result.get("status") != "success":
+        raise APIError(result.get("error", "未知错误"), status_code)
+    return result["data"]
+
+
+class APIClient:
+    """
+    同步客户端
+
+    所有请求共用一个Session，连接池中的长连接在请求之间复用；连接失败、读超时以及429/5xx响应
+    由urllib3按指数退避自动重试，429/503响应带Retry-After时按其等待。
+    """
+
+    def __init__(self, base_url=API_BASE_URL, timeout=(5, 600), retries=3, backoff_factor=0.5, max_backoff=30,
+                 pool_size=10):
+        """
+        :param base_url: API服务地址
+        :param timeout: 超时秒数，可以是(连接超时, 读取超时)
+        :param retries: 最多重试次数
+        :param backoff_factor: 退避基数，第n次重试前等待 backoff_factor * 2^n 秒
+        :param max_backoff: 单次等待的上限（秒）
+        :param pool_size: 连接池大小，多线程共用一个客户端时不小于线程数
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            backoff_max=max_backoff,
+            status_forcelist=RETRY_STATUSES,
+            # 提问接口没有副作用，POST也可以安全重试
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path, data, stream=False):
+        response = self.session.post(f"{self.base_url}{path}", json=data, timeout=self.timeout, stream=stream)
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error", response.text)
+            except ValueError:
+                message = response.text
+            response.close()
+            raise APIError(f"API请求失败，状态码: {response.status_code}，错误信息: {message}", response.status_code)
+        return response
+
+    def chat(self, prompt, system_prompt=None, with_reasoning=False) -> Dict[str, str]:
+        """
+        发送提问，返回data字典（answer，with_reasoning为True时还有reasoning）
+
+        :raises APIError: 服务返回错误或重试次数用尽
+        """
+        endpoint = "/api/chat_with_reasoning" if with_reasoning else "/api/chat"
+        response = self._post(endpoint, build_payload(prompt, system_prompt))
+        return unwrap(response.json(), response.status_code)
+
+    def stream(self, prompt, system_prompt=None) -> Iterator[Dict[str, Any]]:
+        """
+        流式提问，逐个产出事件: {"type": "reasoning"/"answer", "content": ...}，最后为{"type": "done", "metrics": ...}
+
+        :raises APIError: 服务返回错误或流中出现error事件
+        """
+        with self._post("/api/chat/stream", build_payload(prompt, system_prompt), stream=True) as response:
+            # 响应头没有声明字符集时requests按ISO-8859-1解码，这里固定为UTF-8
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                event = parse_sse_line(line)
+                if event is None:
+                    continue
+                if event["type"] == "error":
+                    raise APIError(event["error"])
+                yield event
+
+    def batch(self, prompts, system_prompt=None, concurrency=None, with_reasoning=False) -> Iterator[Dict[str, Any]]:
+        """批量提问，按完成顺序逐条产出结果，最后一条为status为done的汇总"""
+        data = build_batch_payload(prompts, system_prompt, concurrency, with_reasoning)
+        with self._post("/api/chat/batch", data, stream=True) as response:
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+
+    def health(self) -> Dict[str, Any]:
+        response = self.session.get(f"{self.base_url}/api/health", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class AsyncAPIClient:
+    """
+    异步客户端
+
+    基于httpx.AsyncClient，连接池和同时进行中的请求数都受concurrency限制；连接错误和429/5xx响应
+    按指数退避（带随机抖动）重试，响应带Retry-After时按其等待。流式请求只在收到响应之前重试。
+    """
+
+    def __init__(self, base_url=API_BASE_URL, timeout=600, connect_timeout=5, retries=3, backoff_factor=0.5,
+                 max_backoff=30, concurrency=10):
+        """
+        :param concurrency: 同时进行中的请求上限
+        其他参数与 APIClient 相同
+        """
+        if httpx is None:
+            raise ImportError("AsyncAPIClient 需要安装httpx: pip install httpx")
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def _send(self, method, path, data=None, stream=False):
+        """发送请求并在临时错误时重试，返回状态码为200的响应"""
+        attempt = 0
+        while True:
+            request = self.client.build_request(method, path, json=data)
+            try:
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if attempt >= self.retries:
+                    raise APIError(f"连接API服务失败: {e}")
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_factor, self.max_backoff))
+                attempt += 1
+                continue
+
+            if response.status_code == 200:
+                return response
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                await response.aclose()
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_factor, self.max_backoff, retry_after))
+                attempt += 1
+                continue
+
+            body = (await response.aread()).decode("utf-8", errors="replace")
+            await response.aclose()
+            try:
+                message = json.loads(body).get("error", body)
+            except ValueError:
+                message = body
+            raise APIError(f"API请求失败，状态码: {response.status_code}，错误信息: {message}", response.status_code)
+
+    async def chat(self, prompt, system_prompt=None, with_reasoning=False) -> Dict[str, str]:
+        """发送提问，返回data字典"""
+        endpoint = "/api/chat_with_reasoning" if with_reasoning else "/api/chat"
+        async with self._semaphore:
+            response = await self._send("POST", endpoint, build_payload(prompt, system_prompt))
+            return unwrap(response.json(), response.status_code)
+
+    async def chat_many(self, prompts: List[str], system_prompt=None, with_reasoning=False) -> List[Any]:
+        """并发发送多个提问，按输入顺序返回data字典，失败的提问对应位置为APIError"""
+        tasks = [self.chat(prompt, system_prompt, with_reasoning) for prompt in prompts]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def stream(self, prompt, system_prompt=None) -> AsyncIterator[Dict[str, Any]]:
+        """流式提问，逐个产出事件，格式与 APIClient.stream 相同"""
+        async with self._semaphore:
+            response = await self._send("POST", "/api/chat/stream", build_payload(prompt, system_prompt), stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    event = parse_sse_line(line)
+                    if event is None:
+                        continue
+                    if event["type"] == "error":
+                        raise APIError(event["error"])
+                    yield event
+            finally:
+                await response.aclose()
+
+    async def batch(self, prompts, system_prompt=None, concurrency=None,
+                    with_reasoning=False) -> AsyncIterator[Dict[str, Any]]:
+        """批量提问，按完成顺序逐条产出结果，最后一条为status为done的汇总"""
+        data = build_batch_payload(prompts, system_prompt, concurrency, with_reasoning)
+        async with self._semaphore:
+            response = await self._send("POST", "/api/chat/batch", data, stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line)
+            finally:
+                await response.aclose()
+
+    async def health(self) -> Dict[str, Any]:
+        response = await self._send("GET", "/api/health")
+        return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
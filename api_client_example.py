@@ -1,9 +1,10 @@
 # coding=utf-8
-import requests
 import json
 import time
+from api_client import API_BASE_URL, APIClient, APIError
 
-API_BASE_URL = "http://localhost:5000"  # API服务的基础URL
+# 所有示例共用一个客户端，长连接在请求之间复用，临时错误自动重试
+client = APIClient(API_BASE_URL)
 
 def call_chat_api(prompt, system_prompt=None, with_reasoning=False):
     """
@@ -17,52 +18,60 @@ def call_chat_api(prompt, system_prompt=None, with_reasoning=False):
     Returns:
         API响应内容
     """
-    # 构建请求数据
-    data = {
-        "prompt": prompt
-    }
-    
-    if system_prompt:
-        data["system_prompt"] = system_prompt
-        
-    # 选择API端点
-    endpoint = "/api/chat_with_reasoning" if with_reasoning else "/api/chat"
-    
-    # 发送请求
-    response = requests.post(
-        f"{API_BASE_URL}{endpoint}",
-        json=data,
-        headers={"Content-Type": "application/json"}
-    )
-    
-    # 检查响应状态码
-    if response.status_code != 200:
-        print(f"API请求失败，状态码: {response.status_code}")
-        print(f"错误信息: {response.text}")
-        return None
-        
-    # 解析JSON响应
     try:
-        result = response.json()
-        return result
+        return {"status": "success", "data": client.chat(prompt, system_prompt, with_reasoning)}
+    except APIError as e:
+        print(e)
+        return None
     except Exception as e:
-        print(f"解析响应失败: {e}")
-        print(f"原始响应: {response.text}")
+        print(f"连接API服务失败: {e}")
         return None
 
+def call_stream_api(prompt, system_prompt=None):
+    """
+    调用流式聊天API，思考过程和回答生成时逐段打印
+    
+    Returns:
+        完成时的计时指标，失败返回None
+    """
+    try:
+        for event in client.stream(prompt, system_prompt):
+            if event["type"] in ("reasoning", "answer"):
+                print(event["content"], end="", flush=True)
+            elif event["type"] == "done":
+                print()
+                return event["metrics"]
+    except Exception as e:
+        print(f"\n流式请求失败: {e}")
+    return None
+
+def call_batch_api(prompts, system_prompt=None, concurrency=None, with_reasoning=False):
+    """
+    调用批量聊天API，结果按完成顺序逐条返回
+    
+    Args:
+        prompts: 提问列表，元素可以是字符串或{"id": 编号, "prompt": 提问, "system_prompt": 可选}
+        system_prompt: 公共系统提示，可选
+        concurrency: 服务端并发数，可选
+        with_reasoning: 是否返回思考过程
+        
+    Yields:
+        每条结果的字典，最后一条为status为done的汇总
+    """
+    # 流式读取NDJSON，一个连接驱动服务端整个并发池
+    try:
+        yield from client.batch(prompts, system_prompt, concurrency, with_reasoning)
+    except APIError as e:
+        print(e)
+
 def check_health():
     """检查API服务健康状态"""
     try:
-        response = requests.get(f"{API_BASE_URL}/api/health")
-        if response.status_code == 200:
-            result = response.json()
-            print(f"API服务状态: {result.get('status')}")
-            print(f"消息: {result.get('message')}")
-            print(f"版本: {result.get('version')}")
-            return True
-        else:
-            print(f"健康检查失败，状态码: {response.status_code}")
-            return False
+        result = client.health()
+        print(f"API服务状态: {result.get('status')}")
+        print(f"消息: {result.get('message')}")
+        print(f"版本: {result.get('version')}")
+        return True
     except Exception as e:
         print(f"连接API服务失败: {e}")
         return False
@@ -138,6 +147,32 @@ def main():
         print(result["data"]["answer"])
     else:
         print("请求失败")
+    
+    # 示例4: 批量对话
+    print("\n\n示例4: 批量对话")
+    print("-" * 50)
+    
+    prompts = ["用一句话介绍南昌", "用一句话介绍九江", {"id": "jdz", "prompt": "用一句话介绍景德镇"}]
+    print(f"批量提交 {len(prompts)} 条提问")
+    
+    for result in call_batch_api(prompts, concurrency=3):
+        if result.get("status") == "done":
+            print(f"\n全部完成: 成功{result['succeeded']}条，失败{result['failed']}条，耗时{result['elapsed']}秒")
+        elif result.get("status") == "success":
+            print(f"\n[{result['id']}] {result['data']['answer']}")
+        else:
+            print(f"\n[{result['id']}] 请求失败: {result.get('error')}")
+    
+    # 示例5: 流式对话
+    print("\n\n示例5: 流式对话")
+    print("-" * 50)
+    
+    prompt = "用三句话介绍滕王阁"
+    print(f"用户提问: {prompt}\n")
+    
+    metrics = call_stream_api(prompt)
+    if metrics:
+        print(f"\n首token时间: {metrics.get('ttft')}秒，总耗时: {metrics.get('total_seconds')}秒")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,127 @@
+# coding=utf-8
+"""
+API服务压力测试
+
+按不同的并发数向 api_server 发送请求，统计吞吐量、延迟分位数和流式接口的首 token 时间，
+用于观察服务在并发增加时的扩展情况。离线测试时可先启动模拟大模型服务:
+
+    python -m tool.llm.MockServer --first-token-latency 0.5 --tokens-per-second 40
+    LLM_BACKEND=mock LLM_CONCURRENCY=200 python api_server.py
+    python api_load_test.py --levels 1 5 10 20 50 --requests 100
+"""
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import httpx
+
+API_BASE_URL = "http://localhost:5000"
+
+
+def percentile(values, q):
+    """计算分位数（q取0-100）"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+async def call_chat(client, prompt):
+    """调用 /api/chat，返回(总耗时, 首token时间)"""
+    started = time.perf_counter()
+    response = await client.post("/api/chat", json={"prompt": prompt})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+async def call_stream(client, prompt):
+    """调用 /api/chat/stream，返回(总耗时, 首token时间)"""
+    started = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/api/chat/stream", json={"prompt": prompt}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if event["type"] in ("reasoning", "answer") and first_token is None:
+                first_token = time.perf_counter() - started
+            elif event["type"] == "error":
+                raise RuntimeError(event["error"])
+    elapsed = time.perf_counter() - started
+    return elapsed, first_token if first_token is not None else elapsed
+
+
+async def run_level(base_url, concurrency, total, endpoint):
+    """以指定并发数发送total个请求"""
+    call = call_stream if endpoint == "stream" else call_chat
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, first_tokens, errors = [], [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=600) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                try:
+                    # 每个请求的提示词不同，避免命中服务端缓存
+                    elapsed, first_token = await call(client, f"压力测试请求 {concurrency}-{i}-{time.time()}")
+                    latencies.append(elapsed)
+                    first_tokens.append(first_token)
+                except Exception as e:
+                    errors += 1
+                    print(f"请求失败: {e}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        wall = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "wall": wall,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "mean": statistics.mean(latencies) if latencies else 0.0,
+        "ttft_p50": percentile(first_tokens, 50),
+    }
+
+
+async def main_async(base_url, levels, total, endpoint):
+    print("=" * 70)
+    print(f"API服务压力测试: {base_url}  接口: {endpoint}  每档请求数: {total}")
+    print("=" * 70)
+    print(f"{'并发':>6}{'吞吐(次/秒)':>14}{'P50(秒)':>10}{'P95(秒)':>10}{'首token P50':>14}{'失败':>6}{'加速比':>8}")
+
+    baseline = None
+    for concurrency in levels:
+        result = await run_level(base_url, concurrency, total, endpoint)
+        baseline = baseline or result["throughput"]
+        speedup = result["throughput"] / baseline if baseline else 0.0
+        print(f"{result['concurrency']:>6}{result['throughput']:>14.2f}{result['p50']:>10.2f}"
+              f"{result['p95']:>10.2f}{result['ttft_p50']:>14.2f}{result['errors']:>6}{speedup:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API服务压力测试")
+    parser.add_argument("--url", default=API_BASE_URL, help="API服务地址")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 5, 10, 20, 50], help="依次测试的并发数")
+    parser.add_argument("--requests", type=int, default=50, help="每个并发档位发送的请求数")
+    parser.add_argument("--endpoint", choices=["chat", "stream"], default="chat", help="测试的接口")
+    args = parser.parse_args()
+
+    # 设置事件循环策略（在Windows上需要）
+    if platform.system() == 'Windows':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    asyncio.run(main_async(args.url, args.levels, args.requests, args.endpoint))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,92 @@
 # coding=utf-8
-from flask import Flask, request, jsonify
-from aliyun_llm import AliyunLLM
 import os
+import json
+import math
+import time
 import traceback
+import contextlib
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from tool.llm.AsyncLLMClient import AsyncLLMClient
+from tool.llm.Resilience import CircuitOpenError, RetryPolicy
+from tool.llm.SingleFlight import SingleFlight
+from tool.llm.SlidingWindowExecutor import SlidingWindowExecutor
+from tool.llm.StreamCollector import StreamCollector
+from tool.llm.Telemetry import Telemetry
 
-app = Flask(__name__)
+# 批量接口单次请求的最大并发数和最大条数
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", 20))
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 1000))
 
-# 创建LLM实例
-llm = AliyunLLM()
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """
+    在服务的事件循环中创建统一客户端，所有请求共享连接池和限流配额，同时到达的相同请求合并为一次上游调用。
+    上游熔断时交互式请求不等待冷却，立即返回503
+    """
+    app.state.single_flight = SingleFlight()
+    app.state.telemetry = Telemetry.default()
+    app.state.llm = AsyncLLMClient(single_flight=app.state.single_flight, telemetry=app.state.telemetry,
+                                   retry_policy=RetryPolicy(wait_on_open=False))
+    yield
+    await app.state.llm.aclose()
+
+
+async def read_prompt(request: Request):
+    """
+    读取请求中的prompt和system_prompt
+
+    Returns:
+        (prompt, system_prompt, 错误响应)，参数不完整时错误响应不为None
+    """
+    try:
+        data = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        data = None
+
+    if not isinstance(data, dict) or 'prompt' not in data:
+        return None, None, JSONResponse({
+            'status': 'error',
+            'error': '请求参数不完整，需要提供prompt字段'
+        }, status_code=400)
+
+    # system_prompt为可选参数
+    return data['prompt'], data.get('system_prompt'), None
+
+
+def error_response(e):
+    """捕获并返回错误，上游熔断时返回503和Retry-After"""
+    error_message = str(e)
+    if isinstance(e, CircuitOpenError):
+        print(f"API调用被熔断: {error_message}")
+        return JSONResponse({
+            'status': 'error',
+            'error': error_message
+        }, status_code=503, headers={'Retry-After': str(math.ceil(e.retry_after))})
+
+    traceback_info = traceback.format_exc()
+    print(f"API调用出错: {error_message}\n{traceback_info}")
+
+    return JSONResponse({
+        'status': 'error',
+        'error': error_message
+    }, status_code=500)
+
+
+async def chat(request: Request):
     """
     聊天API接口
-    
+
     请求体JSON格式:
     {
         "prompt": "用户提问内容",
         "system_prompt": "可选的系统提示"
     }
-    
+
     响应JSON格式:
     {
         "status": "success" 或 "error",
@@ -29,55 +96,35 @@ def chat():
         "error": "如果status为error，返回错误消息"
     }
     """
+    prompt, system_prompt, error = await read_prompt(request)
+    if error is not None:
+        return error
+
     try:
-        # 获取请求参数
-        data = request.get_json()
-        
-        if not data or 'prompt' not in data:
-            return jsonify({
-                'status': 'error',
-                'error': '请求参数不完整，需要提供prompt字段'
-            }), 400
-            
-        prompt = data['prompt']
-        system_prompt = data.get('system_prompt')  # 可选参数
-        
-        # 调用大模型API
-        response = llm.chat_without_streaming_display(
-            prompt=prompt,
-            system_prompt=system_prompt
-        )
-        
+        # 调用大模型API，等待期间不占用工作线程
+        _, answer = await request.app.state.llm.chat(prompt, system_prompt=system_prompt)
+
         # 返回结果
-        return jsonify({
+        return JSONResponse({
             'status': 'success',
             'data': {
-                'answer': response
+                'answer': answer
             }
         })
-        
     except Exception as e:
-        # 捕获并返回错误
-        error_message = str(e)
-        traceback_info = traceback.format_exc()
-        print(f"API调用出错: {error_message}\n{traceback_info}")
-        
-        return jsonify({
-            'status': 'error',
-            'error': error_message
-        }), 500
+        return error_response(e)
+
 
-@app.route('/api/chat_with_reasoning', methods=['POST'])
-def chat_with_reasoning():
+async def chat_with_reasoning(request: Request):
     """
     带思考过程的聊天API接口
-    
+
     请求体JSON格式:
     {
         "prompt": "用户提问内容",
         "system_prompt": "可选的系统提示"
     }
-    
+
     响应JSON格式:
     {
         "status": "success" 或 "error",
@@ -88,60 +135,212 @@ def chat_with_reasoning():
         "error": "如果status为error，返回错误消息"
     }
     """
+    prompt, system_prompt, error = await read_prompt(request)
+    if error is not None:
+        return error
+
     try:
-        # 获取请求参数
-        data = request.get_json()
-        
-        if not data or 'prompt' not in data:
-            return jsonify({
-                'status': 'error',
-                'error': '请求参数不完整，需要提供prompt字段'
-            }), 400
-            
-        prompt = data['prompt']
-        system_prompt = data.get('system_prompt')  # 可选参数
-        
         # 调用大模型API，获取思考过程和回答
-        reasoning, answer = llm.chat(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            include_reasoning=False,  # API调用时不打印思考过程
-            return_raw_text=False     # 返回元组
-        )
-        
+        reasoning, answer = await request.app.state.llm.chat(prompt, system_prompt=system_prompt)
+
         # 返回结果
-        return jsonify({
+        return JSONResponse({
             'status': 'success',
             'data': {
                 'reasoning': reasoning,
                 'answer': answer
             }
         })
-        
     except Exception as e:
-        # 捕获并返回错误
-        error_message = str(e)
-        traceback_info = traceback.format_exc()
-        print(f"API调用出错: {error_message}\n{traceback_info}")
-        
-        return jsonify({
+        return error_response(e)
+
+
+def sse_event(payload):
+    """编码一条Server-Sent Events消息"""
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def chat_stream(request: Request):
+    """
+    流式聊天API接口（Server-Sent Events）
+
+    请求体JSON格式与 /api/chat 相同，响应为 text/event-stream，每条消息的data为JSON:
+    {"type": "reasoning", "content": "思考过程增量"}
+    {"type": "answer", "content": "回答内容增量"}
+    {"type": "done", "metrics": {"ttft": 首token秒数, "ttfa": 首个回答token秒数, ...}}
+    {"type": "error", "error": "错误消息"}
+    """
+    prompt, system_prompt, error = await read_prompt(request)
+    if error is not None:
+        return error
+
+    async def events():
+        collector = StreamCollector()
+        try:
+            # 收到增量立即转发，不等待完整回复
+            async for chunk in request.app.state.llm.stream(prompt, system_prompt=system_prompt):
+                collector.feed(chunk)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if getattr(delta, 'reasoning_content', None):
+                    yield sse_event({'type': 'reasoning', 'content': delta.reasoning_content})
+                if delta.content:
+                    yield sse_event({'type': 'answer', 'content': delta.content})
+            collector.finish()
+            yield sse_event({'type': 'done', 'metrics': collector.metrics()})
+        except Exception as e:
+            print(f"流式API调用出错: {e}\n{traceback.format_exc()}")
+            yield sse_event({'type': 'error', 'error': str(e)})
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def chat_batch(request: Request):
+    """
+    批量聊天API接口（NDJSON流式返回）
+
+    请求体JSON格式:
+    {
+        "prompts": ["提问1", {"id": "自定义编号", "prompt": "提问2", "system_prompt": "可选"}, ...],
+        "system_prompt": "可选的公共系统提示",
+        "concurrency": 可选的并发数,
+        "with_reasoning": 是否返回思考过程，默认false
+    }
+
+    响应为 application/x-ndjson，每完成一条立即返回一行（按完成顺序）:
+    {"index": 序号, "id": 编号, "status": "success", "data": {"answer": "...", "reasoning": "..."}}
+    {"index": 序号, "id": 编号, "status": "error", "error": "错误消息"}
+    最后一行为汇总:
+    {"status": "done", "total": 总数, "succeeded": 成功数, "failed": 失败数, "elapsed": 耗时秒数}
+    """
+    try:
+        data = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        data = None
+
+    prompts = data.get('prompts') if isinstance(data, dict) else None
+    if not isinstance(prompts, list) or not prompts:
+        return JSONResponse({
             'status': 'error',
-            'error': error_message
-        }), 500
+            'error': '请求参数不完整，需要提供非空的prompts数组'
+        }, status_code=400)
+    if len(prompts) > BATCH_MAX_SIZE:
+        return JSONResponse({
+            'status': 'error',
+            'error': f'单次最多提交{BATCH_MAX_SIZE}条'
+        }, status_code=400)
+
+    # 统一为 (序号, 编号, prompt, system_prompt)
+    shared_system_prompt = data.get('system_prompt')
+    items = []
+    for index, item in enumerate(prompts):
+        if isinstance(item, dict):
+            if 'prompt' not in item:
+                return JSONResponse({
+                    'status': 'error',
+                    'error': f'第{index + 1}条缺少prompt字段'
+                }, status_code=400)
+            items.append((index, item.get('id', index), item['prompt'], item.get('system_prompt', shared_system_prompt)))
+        else:
+            items.append((index, index, str(item), shared_system_prompt))
+
+    # 并发数须为正整数，超过上限时按上限处理
+    concurrency = data.get('concurrency')
+    if concurrency is None:
+        concurrency = BATCH_MAX_CONCURRENCY
+    try:
+        concurrency = int(concurrency) if not isinstance(concurrency, bool) else 0
+    except (TypeError, ValueError):
+        concurrency = 0
+    if concurrency < 1:
+        return JSONResponse({
+            'status': 'error',
+            'error': 'concurrency必须是正整数'
+        }, status_code=400)
+    concurrency = min(concurrency, BATCH_MAX_CONCURRENCY)
+    with_reasoning = bool(data.get('with_reasoning'))
+    llm = request.app.state.llm
+
+    async def worker(item):
+        _, _, prompt, system_prompt = item
+        return await llm.chat(prompt, system_prompt=system_prompt)
+
+    async def lines():
+        started = time.perf_counter()
+        succeeded = failed = 0
+        # 滑动窗口调度：同时保持concurrency个请求在途，完成一条返回一行
+        async for (index, item_id, _, _), result in SlidingWindowExecutor(concurrency).run(items, worker):
+            if isinstance(result, Exception):
+                failed += 1
+                line = {'index': index, 'id': item_id, 'status': 'error', 'error': str(result)}
+            else:
+                succeeded += 1
+                reasoning, answer = result
+                line = {'index': index, 'id': item_id, 'status': 'success', 'data': {'answer': answer}}
+                if with_reasoning:
+                    line['data']['reasoning'] = reasoning
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        yield json.dumps({
+            'status': 'done',
+            'total': len(items),
+            'succeeded': succeeded,
+            'failed': failed,
+            'elapsed': round(time.perf_counter() - started, 3)
+        }, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
+async def health_check(request: Request):
     """健康检查接口"""
-    return jsonify({
+    return JSONResponse({
         'status': 'success',
         'message': 'API服务正常运行',
-        'version': '1.0.0'
+        'version': '1.1.0',
+        'single_flight': request.app.state.single_flight.stats(),
+        'circuit_breaker': request.app.state.llm.circuit_breaker.stats(),
+        'retries': request.app.state.llm.retry_policy.stats()
     })
 
-@app.route('/', methods=['GET'])
-def home():
+
+async def metrics(request: Request):
+    """Prometheus格式的指标接口：上游调用延迟、首token时间、token用量、错误数、进行中请求数、请求合并、重试和熔断计数"""
+    single_flight = request.app.state.single_flight.stats()
+    retries = request.app.state.llm.retry_policy.stats()
+    breaker = request.app.state.llm.circuit_breaker.stats()
+    states = {'closed': 0, 'half_open': 1, 'open': 2}
+    text = request.app.state.telemetry.prometheus_text() + "\n".join([
+        "# HELP llm_single_flight_upstream_total 请求合并后实际发起的上游调用数",
+        "# TYPE llm_single_flight_upstream_total counter",
+        f"llm_single_flight_upstream_total {single_flight['upstream_calls']}",
+        "# HELP llm_single_flight_coalesced_total 被合并、未发起上游调用的请求数",
+        "# TYPE llm_single_flight_coalesced_total counter",
+        f"llm_single_flight_coalesced_total {single_flight['coalesced_calls']}",
+        "# HELP llm_retries_total 按错误类型统计的重试次数",
+        "# TYPE llm_retries_total counter",
+        *[f'llm_retries_total{{type="{name}"}} {count}' for name, count in retries['retries'].items()],
+        "# HELP llm_gave_up_total 按错误类型统计的重试用尽或不可重试的失败次数",
+        "# TYPE llm_gave_up_total counter",
+        *[f'llm_gave_up_total{{type="{name}"}} {count}' for name, count in retries['gave_up'].items()],
+        "# HELP llm_circuit_state 熔断器状态（0关闭，1半开，2打开）",
+        "# TYPE llm_circuit_state gauge",
+        f"llm_circuit_state {states[breaker['state']]}",
+        "# HELP llm_circuit_opened_total 熔断器打开次数",
+        "# TYPE llm_circuit_opened_total counter",
+        f"llm_circuit_opened_total {breaker['opened']}",
+        "# HELP llm_circuit_rejected_total 熔断期间直接拒绝的请求数",
+        "# TYPE llm_circuit_rejected_total counter",
+        f"llm_circuit_rejected_total {breaker['rejected']}",
+    ]) + "\n"
+    return PlainTextResponse(text, media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def home(request: Request):
     """首页，返回简单的使用说明"""
-    return """
+    return HTMLResponse("""
     <html>
     <head>
         <title>阿里云大模型API服务</title>
@@ -155,7 +354,7 @@ def home():
     <body>
         <h1>阿里云大模型API服务</h1>
         <p>这是一个封装了阿里云大语言模型的API服务。你可以通过以下端点与服务交互：</p>
-        
+
         <div class="endpoint">
             <h3>1. 基本对话接口</h3>
             <code>POST /api/chat</code>
@@ -168,7 +367,7 @@ def home():
 }
             </pre>
         </div>
-        
+
         <div class="endpoint">
             <h3>2. 带思考过程的对话接口</h3>
             <code>POST /api/chat_with_reasoning</code>
@@ -181,30 +380,79 @@ def home():
 }
             </pre>
         </div>
-        
+
+        <div class="endpoint">
+            <h3>3. 流式对话接口 (Server-Sent Events)</h3>
+            <code>POST /api/chat/stream</code>
+            <p>请求格式同上，思考过程和回答在生成时逐段返回，每条消息为
+            <code>{"type": "reasoning" | "answer" | "done" | "error", ...}</code>。</p>
+        </div>
+
+        <div class="endpoint">
+            <h3>4. 批量对话接口 (NDJSON)</h3>
+            <code>POST /api/chat/batch</code>
+            <p>一次提交多条提问，服务端按并发上限同时处理，每完成一条立即返回一行JSON，最后一行为汇总。</p>
+            <h4>请求格式:</h4>
+            <pre>
+{
+    "prompts": ["问题1", {"id": "a2", "prompt": "问题2"}],
+    "system_prompt": "可选的公共系统提示",
+    "concurrency": 10,
+    "with_reasoning": false
+}
+            </pre>
+        </div>
+
         <div class="endpoint">
-            <h3>3. 健康检查接口</h3>
+            <h3>5. 健康检查接口</h3>
             <code>GET /api/health</code>
             <p>检查API服务是否正常运行。</p>
         </div>
-        
+
+        <div class="endpoint">
+            <h3>6. 监控指标接口</h3>
+            <code>GET /metrics</code>
+            <p>Prometheus文本格式的调用延迟、首token时间、token用量、错误数和进行中请求数。</p>
+        </div>
+
         <h3>使用示例 (使用curl):</h3>
         <pre>
-curl -X POST http://localhost:5000/api/chat \
-  -H "Content-Type: application/json" \
+curl -X POST http://localhost:5000/api/chat \\
+  -H "Content-Type: application/json" \\
   -d '{"prompt": "你好，请介绍一下自己", "system_prompt": "你是一位专业的AI助手"}'
+
+curl -N -X POST http://localhost:5000/api/chat/stream \\
+  -H "Content-Type: application/json" \\
+  -d '{"prompt": "你好，请介绍一下自己"}'
         </pre>
     </body>
     </html>
-    """
+    """)
+
+
+app = Starlette(
+    routes=[
+        Route('/api/chat', chat, methods=['POST']),
+        Route('/api/chat_with_reasoning', chat_with_reasoning, methods=['POST']),
+        Route('/api/chat/stream', chat_stream, methods=['POST']),
+        Route('/api/chat/batch', chat_batch, methods=['POST']),
+        Route('/api/health', health_check, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/', home, methods=['GET']),
+    ],
+    lifespan=lifespan,
+)
 
 if __name__ == '__main__':
     # 获取端口，默认为5000
     port = int(os.environ.get("PORT", 5000))
-    
-    # 在开发环境中使用debug模式
-    debug_mode = os.environ.get("FLASK_ENV") == "development"
-    
-    # 启动Flask应用
+
+    # 在开发环境中开启自动重载
+    debug_mode = os.environ.get("FLASK_ENV") == "development" or os.environ.get("APP_ENV") == "development"
+
+    # 单进程异步服务，等待大模型响应时不阻塞其他请求；并发上限由 LLM_CONCURRENCY 控制
     print(f"启动API服务，监听端口: {port}, 调试模式: {'开启' if debug_mode else '关闭'}")
-    app.run(host='0.0.0.0', port=port, debug=debug_mode) 
\ No newline at end of file
+    if debug_mode:
+        uvicorn.run("api_server:app", host='0.0.0.0', port=port, reload=True)
+    else:
+        uvicorn.run(app, host='0.0.0.0', port=port)
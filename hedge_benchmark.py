@@ -0,0 +1,98 @@
+# coding=utf-8
+"""
+对冲请求基准测试
+
+在本地启动带长尾延迟的模拟大模型服务，以相同的请求分别在不对冲和对冲两种模式下运行，
+比较延迟分位数、总耗时和额外发出的请求数:
+
+    python hedge_benchmark.py --requests 300 --concurrency 20 --tail-probability 0.05 --tail-latency 8
+    python hedge_benchmark.py --percentile 90 --budget 0.1
+"""
+import time
+import asyncio
+import argparse
+import platform
+from tool.llm.AsyncLLMClient import AsyncLLMClient
+from tool.llm.Hedging import HedgePolicy, LatencyTracker
+from tool.llm.MockServer import MockLLMServer
+from tool.llm.Telemetry import Telemetry
+
+
+async def run_mode(server, total, concurrency, hedge_policy):
+    """以指定并发数发送total个请求，返回延迟统计"""
+    client = AsyncLLMClient(backend="mock", base_url=server.base_url, concurrency=concurrency,
+                            requests_per_minute=1e9, tokens_per_minute=1e12, telemetry=Telemetry(),
+                            hedge_policy=hedge_policy)
+    tracker = LatencyTracker(window=total)
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+    upstream_before = server.request_count
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                # 每个请求的提示词不同，避免请求合并
+                await client.chat(f"对冲测试请求 {i}-{time.time()}", model="mock")
+                tracker.observe(time.perf_counter() - started)
+            except Exception as e:
+                errors += 1
+                print(f"请求失败: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - started
+    await client.aclose()
+
+    result = tracker.stats()
+    result.update({"wall": wall, "errors": errors, "upstream": server.request_count - upstream_before})
+    return result
+
+
+async def main_async(args):
+    server = MockLLMServer(port=args.port, default_reply="南昌市红谷滩新区丰和中大道", reasoning="分析地址",
+                           first_token_latency=args.first_token_latency, tokens_per_second=args.tokens_per_second,
+                           tail_probability=args.tail_probability, tail_latency=args.tail_latency).start()
+    try:
+        print("=" * 78)
+        print(f"对冲请求基准测试: {args.requests}个请求，并发{args.concurrency}，"
+              f"长尾概率{args.tail_probability:.0%}，长尾延迟+{args.tail_latency}秒")
+        print("=" * 78)
+        print(f"{'模式':<8}{'P50(秒)':>10}{'P95(秒)':>10}{'P99(秒)':>10}{'总耗时(秒)':>12}{'上游请求':>10}{'失败':>6}")
+
+        policy = HedgePolicy(percentile=args.percentile, budget=args.budget, min_samples=args.min_samples,
+                             min_delay=args.min_delay)
+        for name, hedge_policy in (("不对冲", None), ("对冲", policy)):
+            r = await run_mode(server, args.requests, args.concurrency, hedge_policy)
+            print(f"{name:<8}{r['p50']:>10.2f}{r['p95']:>10.2f}{r['p99']:>10.2f}{r['wall']:>12.2f}"
+                  f"{r['upstream']:>10}{r['errors']:>6}")
+        print(policy.report())
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对冲请求基准测试")
+    parser.add_argument("--requests", type=int, default=200, help="每种模式发送的请求数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发数")
+    parser.add_argument("--percentile", type=float, default=95, help="触发对冲的延迟分位数")
+    parser.add_argument("--budget", type=float, default=0.05, help="备份请求数占调用总数的比例上限")
+    parser.add_argument("--min-samples", type=int, default=20, help="开始对冲前至少需要的延迟样本数")
+    parser.add_argument("--min-delay", type=float, default=0.5, help="触发对冲的最短等待（秒）")
+    parser.add_argument("--port", type=int, default=8766, help="模拟服务端口")
+    parser.add_argument("--first-token-latency", type=float, default=0.5, help="模拟服务的首 token 延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="模拟服务的生成速度")
+    parser.add_argument("--tail-probability", type=float, default=0.05, help="出现长尾延迟的概率")
+    parser.add_argument("--tail-latency", type=float, default=5.0, help="长尾延迟额外增加的秒数")
+    args = parser.parse_args()
+
+    # 设置事件循环策略（在Windows上需要）
+    if platform.system() == 'Windows':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 import polars as pl
 import os
 from aliyun_llm import AliyunLLM
-import time
+from tool.llm.ResponseCache import ResponseCache
 
 def extract_address(text, llm):
     """使用AI从文本中提取地址"""
@@ -64,8 +64,9 @@ def main():
     print("简易投诉热点地址提取工具")
     print("=" * 50)
     
-    # 初始化大模型
-    llm = AliyunLLM()
+    # 初始化大模型，相同的提示词直接使用缓存结果
+    cache = ResponseCache()
+    llm = AliyunLLM(cache=cache)
     
     # 直接指定文件路径
     file_path = "WorkDocument/投诉热点明细分析/source/202403-202502投诉热点明细表-终稿.xlsx"
@@ -115,9 +116,6 @@ def main():
             else:
                 print("✗ 解析地址失败")
                 results.append({"原始文本": text, "地址": address})
-                
-            # 避免API请求过快
-            time.sleep(0.5)
         
         # 保存结果
         if results:
@@ -130,6 +128,7 @@ def main():
             if count > 0:
                 success_rate = (successful / count) * 100
                 print(f"地址解析成功率: {success_rate:.2f}%")
+            print(cache.report())
         
     except Exception as e:
         print(f"程序执行错误: {e}")
@@ -0,0 +1,35 @@
+from tool.data.AddressDeduplicator import AddressDeduplicator
+
+
+def test_merges_parent_and_child():
+    addresses, ambiguous = AddressDeduplicator().deduplicate(['南昌大学', '南昌大学前湖校区', '南昌大学前湖校区', '南昌大学'])
+    assert addresses == ['南昌大学前湖校区']
+    assert not ambiguous
+
+
+def test_parent_merges_into_single_numbered_child():
+    addresses, ambiguous = AddressDeduplicator().deduplicate(['艾溪湖小区', '艾溪湖小区3栋', '艾溪湖小区3栋'])
+    assert addresses == ['艾溪湖小区3栋']
+    assert not ambiguous
+
+
+def test_parent_does_not_chain_different_building_numbers():
+    """不含数字的上级地址不能把楼栋号不同的地址连成一簇"""
+    address_list = ['艾溪湖小区', '艾溪湖小区3栋', '艾溪湖小区3栋', '艾溪湖小区5栋', '艾溪湖小区5栋']
+    clusters, ambiguous = AddressDeduplicator().cluster(address_list)
+    assert ambiguous
+    assert AddressDeduplicator().deduplicate(address_list)[1]
+
+
+def test_different_house_numbers_stay_separate():
+    clusters, _ = AddressDeduplicator().cluster(['北京东路12号小区', '北京东路12号小区', '北京东路13号小区'])
+    assert [c['count'] for c in clusters] == [2, 1]
+
+
+def test_alias_is_ambiguous():
+    _, ambiguous = AddressDeduplicator().deduplicate(['江西师范大学', '江西师范大学', '江西师大'])
+    assert ambiguous
+
+
+def test_empty():
+    assert AddressDeduplicator().deduplicate([]) == ([], False)
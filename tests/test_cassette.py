@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from openai.types.chat import ChatCompletionChunk
+
+from tool.llm.Cassette import Cassette, CassetteMissError
+
+
+def _chunk(content):
+    return ChatCompletionChunk.model_validate({
+        "id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": "mock",
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    })
+
+
+async def _upstream():
+    for content in ("南昌", "八一大道"):
+        yield _chunk(content)
+
+
+async def _collect(iterator):
+    return [chunk.choices[0].delta.content async for chunk in iterator]
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "tape.jsonl")
+    key = Cassette.make_key("mock", None, "提取地址")
+
+    recorder = Cassette(path, mode="record")
+    assert not recorder.should_replay(key)
+    recorded = asyncio.run(_collect(recorder.record(key, "mock", 0.0, _upstream())))
+    assert recorded == ["南昌", "八一大道"]
+
+    player = Cassette(path, mode="replay", speed=0)
+    assert player.should_replay(key)
+    assert asyncio.run(_collect(player.replay(key))) == recorded
+    assert player.stats()["replayed"] == 1
+
+
+def test_replay_miss(tmp_path):
+    path = str(tmp_path / "tape.jsonl")
+    Cassette(path, mode="record")
+    player = Cassette(path, mode="replay")
+    with pytest.raises(CassetteMissError):
+        player.should_replay(Cassette.make_key("mock", None, "没有录制"))
+    # auto 模式下没有录制的请求照常调用上游
+    assert not Cassette(path, mode="auto").should_replay(Cassette.make_key("mock", None, "没有录制"))
+
+
+def test_replay_requires_existing_tape(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Cassette(str(tmp_path / "missing.jsonl"), mode="replay")
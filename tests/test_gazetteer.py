@@ -0,0 +1,33 @@
+from tool.data.Gazetteer import Gazetteer
+
+
+def test_strip_prefix():
+    gazetteer = Gazetteer.default()
+    assert gazetteer.strip_prefix("江西省南昌市红谷滩区万达广场") == "万达广场"
+    assert gazetteer.strip_prefix("南昌东湖区八一大道") == "八一大道"
+
+
+def test_alias_needs_following_division():
+    """简称只有紧跟其他行政区划时才识别，不截断"南昌大学" """
+    assert Gazetteer.default().strip_prefix("南昌大学前湖校区") == "南昌大学前湖校区"
+
+
+def test_strip_prefix_keeps_address_that_is_only_divisions():
+    assert Gazetteer.default().strip_prefix("南昌市东湖区") == "南昌市东湖区"
+
+
+def test_dedupe_leading_divisions():
+    gazetteer = Gazetteer.default()
+    assert gazetteer.dedupe("南昌市南昌市东湖区八一大道") == "南昌市东湖区八一大道"
+    assert gazetteer.dedupe("南昌东湖区南昌市东湖区八一大道") == "南昌市东湖区八一大道"
+
+
+def test_dedupe_keeps_divisions_inside_poi_names():
+    assert Gazetteer.default().dedupe("南昌市东湖区八一大道东湖区政府") == "南昌市东湖区八一大道东湖区政府"
+
+
+def test_split_prefix():
+    units, rest = Gazetteer.default().split_prefix("九江市永修县涂埠镇新城路")
+    assert [u.name for u in units] == ["九江市", "永修县", "涂埠镇"]
+    assert units[2].parent == "永修县"
+    assert rest == "新城路"
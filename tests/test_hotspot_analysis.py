@@ -0,0 +1,28 @@
+import polars as pl
+import pytest
+
+import 投诉热点明细分析 as hotspot
+
+
+def _frame(groups):
+    """groups 个非空投诉标识分组，另有两条投诉标识为空的记录穿插其中"""
+    ids, locations = [None], ["南昌市红谷滩区丰和大道100号"]
+    for g in range(groups):
+        ids += [f"id{g}", f"id{g}"]
+        locations += [f"九江市浔阳区庐山路{g}号", f"九江市浔阳区庐山路{g}号"]
+    ids.append(None)
+    locations.append("南昌市红谷滩区丰和大道200号")
+    return pl.DataFrame({"投诉标识": ids, "参考位置": locations, "投诉位置": [""] * len(ids)},
+                        schema={"投诉标识": pl.Utf8, "参考位置": pl.Utf8, "投诉位置": pl.Utf8})
+
+
+@pytest.mark.parametrize("groups, workers", [(1, 1), (hotspot.PARALLEL_MIN_GROUPS, 2)],
+                         ids=["serial", "pool"])
+def test_null_ids_form_one_group_and_keep_row_order(groups, workers):
+    df = _frame(groups)
+    _, result = hotspot.process_excel(df, workers=workers)
+
+    assert result["投诉标识"].to_list() == df["投诉标识"].to_list()
+    locations = result["投诉位置"].to_list()
+    assert locations[0] == locations[-1] == "南昌市红谷滩区丰和大道"
+    assert locations[1] == locations[2] == "九江市浔阳区庐山路0号"
@@ -0,0 +1,22 @@
+from tool.llm.LongestJobFirst import LongestJobFirst
+
+
+def test_order_longest_first_and_stable():
+    scheduler = LongestJobFirst(cost=len)
+    assert scheduler.order(["ab", "abcd", "cd", "a"]) == ["abcd", "ab", "cd", "a"]
+    assert scheduler.costs["abcd"] == 4
+
+
+def test_makespan_list_scheduling():
+    assert LongestJobFirst.makespan([1, 1, 1, 3], workers=2) == 4
+    assert LongestJobFirst.makespan([3, 1, 1, 1], workers=2) == 3
+    assert LongestJobFirst.makespan([], workers=4) == 0
+
+
+def test_compare_reports_reduction():
+    costs = {"a": 1, "b": 1, "c": 1, "d": 3}
+    result = LongestJobFirst.compare(["a", "b", "c", "d"], costs, workers=2)
+    assert result["original"] == 4
+    assert result["longest_first"] == 3
+    assert result["lower_bound"] == 3
+    assert result["reduction"] == 0.25
@@ -0,0 +1,34 @@
+from tool.llm.PromptBudget import PromptBudget
+
+
+def _render(items, omitted, omitted_count):
+    return "\n".join(f"{text}({count})" for text, count in items)
+
+
+def test_prompt_within_budget_is_unchanged():
+    budget = PromptBudget(max_tokens=1000)
+    prompt, items = budget.fit({"八一大道1号": 2, "红谷滩万达广场": 1}, _render)
+    assert items == [("八一大道1号", 2), ("红谷滩万达广场", 1)]
+    assert budget.stats()["compacted"] == 0
+
+
+def test_near_step_uses_caller_cluster():
+    """近似条目的合并由调用方传入的聚类函数完成，只在数字相同的条目间进行"""
+    groups = []
+
+    def cluster(texts):
+        groups.append(sorted(set(texts)))
+        return [{"location": max(set(texts), key=texts.count), "count": len(texts)}]
+
+    budget = PromptBudget(max_tokens=12, cluster=cluster)
+    _, items = budget.fit({"八一大道一号楼": 3, "八一大道壹号楼": 1, "南京路2号": 1}, _render)
+    assert ("八一大道一号楼", 4) in items
+    assert ["南京路2号"] in groups
+    assert budget.stats()["steps"]["near"] == 1
+
+
+def test_near_step_skipped_without_cluster():
+    budget = PromptBudget(max_tokens=1)
+    _, items = budget.fit({"八一大道一号楼": 3, "八一大道壹号楼": 1}, _render)
+    assert "near" not in budget.stats()["steps"]
+    assert items == [("八一大道一号楼", 3)]
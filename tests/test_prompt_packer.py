@@ -0,0 +1,44 @@
+import json
+import re
+
+from tool.llm.PromptPacker import PromptPacker
+
+
+def _answer(prompt, skip=()):
+    """按提示词中的编号回复，skip 中的文本不返回"""
+    records = re.findall(r"^\[(\d+)\] (.*)$", prompt, re.M)
+    return json.dumps([{"id": int(n), "address": text + "地址"} for n, text in records if text not in skip],
+                      ensure_ascii=False)
+
+
+def test_parse_ignores_invalid_items():
+    packer = PromptPacker("提取地址", field="address")
+    answer = '```json\n[{"id": 1, "address": "八一大道"}, {"id": 9, "address": "越界"}, {"id": 2, "address": ""}]\n```'
+    assert packer.parse(answer, 2) == {1: "八一大道"}
+
+
+def test_missing_records_are_repacked():
+    packer = PromptPacker("提取地址", pack_size=3, field="address")
+    calls = []
+
+    def chat(prompt):
+        calls.append(prompt)
+        # 第一次请求漏掉“乙”，重新打包后正常返回
+        return _answer(prompt, skip=("乙",) if len(calls) == 1 else ())
+
+    result = packer.run([(1, "甲"), (2, "乙"), (3, "丙")], chat)
+    assert result == {1: "甲地址", 2: "乙地址", 3: "丙地址"}
+    assert packer.requests == 2
+
+
+def test_failing_pack_is_split_until_single_record_fails():
+    packer = PromptPacker("提取地址", pack_size=4, field="address", failure_value="解析地址失败")
+
+    def chat(prompt):
+        # 含“坏”的包整包无法解析
+        return "无法处理" if "坏" in prompt else _answer(prompt)
+
+    result = packer.run([(1, "甲"), (2, "坏"), (3, "丙"), (4, "丁")], chat)
+    assert result == {1: "甲地址", 2: "解析地址失败", 3: "丙地址", 4: "丁地址"}
+    assert packer.failures == 1
+    assert packer.splits == 2
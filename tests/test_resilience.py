@@ -0,0 +1,51 @@
+import httpx
+import openai
+import pytest
+
+from tool.llm.Resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("POST", "http://127.0.0.1/v1/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+def test_circuit_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # 冷却结束后只放行一个探测请求
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_rejects_calls():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert 0 < excinfo.value.retry_after <= 60
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_retryable_errors():
+    policy = RetryPolicy()
+    assert policy.is_retryable(_status_error(429))
+    assert policy.is_retryable(_status_error(503))
+    assert not policy.is_retryable(_status_error(400))
+    assert policy.is_retryable(CircuitOpenError(1))
+    assert not RetryPolicy(wait_on_open=False).is_retryable(CircuitOpenError(1))
+
+
+def test_delay_honours_retry_after_and_caps_backoff():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    assert 3.0 <= policy.delay(0, _status_error(429, {"retry-after": "3"})) <= 4.0
+    assert all(0 <= policy.delay(10, _status_error(503)) <= 5.0 for _ in range(20))
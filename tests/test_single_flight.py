@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from tool.llm.SingleFlight import SingleFlight
+
+
+async def _slow_stream(started: asyncio.Event):
+    yield "第一块"
+    started.set()
+    await asyncio.sleep(10)
+    yield "第二块"
+
+
+async def _numbers():
+    for i in range(3):
+        await asyncio.sleep(0)
+        yield i
+
+
+def test_coalesces_identical_requests():
+    async def run():
+        single_flight = SingleFlight()
+
+        async def consume():
+            return [chunk async for chunk in single_flight.stream("key", _numbers)]
+
+        return single_flight, await asyncio.gather(consume(), consume())
+
+    single_flight, results = asyncio.run(run())
+    assert results == [[0, 1, 2], [0, 1, 2]]
+    assert single_flight.upstream_calls == 1
+    assert single_flight.coalesced_calls == 1
+
+
+def test_cancelled_upstream_fans_out_error_and_stays_cancelled():
+    async def run():
+        single_flight = SingleFlight()
+        started = asyncio.Event()
+        received = []
+
+        async def consume():
+            async for chunk in single_flight.stream("key", lambda: _slow_stream(started)):
+                received.append(chunk)
+
+        consumer = asyncio.create_task(consume())
+        await started.wait()
+        task = single_flight._flights["key"].task
+        task.cancel()
+        with pytest.raises(ConnectionAbortedError):
+            await consumer
+        await asyncio.sleep(0)
+        return task, received, single_flight
+
+    task, received, single_flight = asyncio.run(run())
+    assert task.cancelled()
+    assert received == ["第一块"]
+    assert single_flight.in_flight == 0
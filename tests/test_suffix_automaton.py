@@ -0,0 +1,21 @@
+from tool.data.SuffixAutomaton import SuffixAutomaton
+
+
+def test_most_shared_substring():
+    automaton = SuffixAutomaton(["南昌市八一大道1号", "八一大道3号楼", "东湖区八一大道"])
+    assert automaton.most_shared_substring(min_length=2) == ("八一大道", 3)
+
+
+def test_prefers_more_documents_over_longer_substring():
+    automaton = SuffixAutomaton(["红谷滩万达广场", "红谷滩万达广场", "万达", "万达影城"])
+    assert automaton.most_shared_substring(min_length=2) == ("万达", 4)
+
+
+def test_result_does_not_depend_on_order():
+    strings = ["青山湖区北京东路", "北京东路339号", "北京西路"]
+    expected = SuffixAutomaton(strings).most_shared_substring(min_length=2)
+    assert SuffixAutomaton(strings[::-1]).most_shared_substring(min_length=2) == expected == ("北京", 3)
+
+
+def test_no_substring_long_enough():
+    assert SuffixAutomaton(["甲乙", "丙丁"]).most_shared_substring(min_length=3) is None
@@ -0,0 +1,15 @@
+from tool.llm.TieredExtractor import TieredExtractor
+
+
+def test_record_llm_counts_external_calls():
+    """打包、批处理等在流水线外完成的大模型提取也计入大模型层"""
+    tiered = TieredExtractor(lambda text: None)
+    assert tiered.try_rules("用户反映信号差") is None
+    tiered.record_llm("用户反映信号差", "南昌市八一大道", 2.0)
+    tiered.record_llm("无地址", None, 1.0)
+
+    llm = tiered.stats()["llm"]
+    assert llm["calls"] == 2
+    assert llm["hits"] == 1
+    assert llm["avg_seconds"] == 1.5
+    assert tiered.stats()["rule"]["calls"] == 1
@@ -0,0 +1,68 @@
+import datetime as dt
+import zipfile
+
+import openpyxl
+import polars as pl
+import pytest
+
+from tool.file.WorkbookPatcher import WorkbookPatcher
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "报表.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.title = "明细"
+    wb.active.append(["旧", "数据"])
+    other = wb.create_sheet("汇总")
+    other.append(["保留", 1])
+    other["C1"] = "=B1*2"
+    wb.save(path)
+    return path
+
+
+def test_replace_sheet_keeps_other_sheets(workbook):
+    df = pl.DataFrame({"投诉标识": ["JJ-1", "JJ-2"], "次数": [3, 5]})
+    WorkbookPatcher(str(workbook)).replace_sheet("明细", df)
+
+    wb = openpyxl.load_workbook(workbook)
+    assert [list(row) for row in wb["明细"].iter_rows(values_only=True)] == [["投诉标识", "次数"], ["JJ-1", 3], ["JJ-2", 5]]
+    assert wb["汇总"]["A1"].value == "保留"
+    assert wb["汇总"]["C1"].value == "=B1*2"
+
+
+def test_untouched_parts_are_copied_raw(workbook, tmp_path):
+    output = tmp_path / "输出.xlsx"
+    WorkbookPatcher(str(workbook)).replace_sheet("明细", pl.DataFrame({"a": [1]}), str(output))
+
+    with zipfile.ZipFile(workbook) as src, zipfile.ZipFile(output) as dst:
+        parts = WorkbookPatcher(str(workbook)).sheet_parts()
+        for info in src.infolist():
+            if info.filename in (parts["明细"], "xl/calcChain.xml"):
+                continue
+            copied = dst.getinfo(info.filename)
+            assert (copied.CRC, copied.compress_size, copied.compress_type) == \
+                   (info.CRC, info.compress_size, info.compress_type)
+        assert dst.testzip() is None
+
+
+def test_non_finite_numbers_are_empty(workbook):
+    df = pl.DataFrame({"名称": ["a", "b", "c", "d"], "值": [1.5, float("inf"), float("-inf"), float("nan")]})
+    WorkbookPatcher(str(workbook)).replace_sheet("明细", df)
+
+    values = [row[1] for row in openpyxl.load_workbook(workbook)["明细"].iter_rows(values_only=True)]
+    assert values == ["值", 1.5, None, None, None]
+
+
+def test_dates_are_excel_serials(workbook):
+    df = pl.DataFrame({"日期": [dt.date(2025, 3, 1)], "时间": [dt.datetime(2025, 3, 1, 12, 30)]})
+    WorkbookPatcher(str(workbook)).replace_sheet("明细", df)
+
+    sheet = openpyxl.load_workbook(workbook)["明细"]
+    assert sheet["A2"].is_date and sheet["A2"].value == dt.datetime(2025, 3, 1)
+    assert sheet["B2"].is_date and sheet["B2"].value == dt.datetime(2025, 3, 1, 12, 30)
+
+
+def test_unknown_sheet(workbook):
+    with pytest.raises(KeyError):
+        WorkbookPatcher(str(workbook)).replace_sheet("不存在", pl.DataFrame({"a": [1]}))
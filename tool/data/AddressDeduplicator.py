@@ -0,0 +1,194 @@
+import re
+import time
+import logging
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+_NOISE = re.compile(r"[\s\W_]+")
+_DIGITS = re.compile(r"\d+")
+
+
+class AddressDeduplicator:
+    """
+    基于字符 n-gram TF-IDF 向量的地址去重
+
+    把一组地址规范化后切成字符 n-gram，构造稀疏 TF-IDF 矩阵，行向量归一化后相乘得到余弦相似度矩阵；
+    相似度不低于阈值或互相包含（父子关系，如“南昌大学”与“南昌大学前湖校区”）的地址连成一簇，
+    用连通分量得到全部簇。每簇按出现次数和具体程度选出代表地址，再按大模型提示词中的规则
+    （全部只出现1次时取1个最具体的地址，否则按频率取最多3个）输出结果。
+
+    相似度落在阈值下方的灰色区间、无法确定是否为同一地点（如别名“江西师大”与“江西师范大学”）的分组
+    标记为不确定，由调用方交给大模型处理；经由不含数字的上级地址连到一起、但楼栋号等数字不同的分组同样标记为不确定。
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = (1, 3), threshold: float = 0.6, ambiguous_threshold: float = 0.35,
+                 normalizer: Callable[[str], str] = None, top: int = 3):
+        """
+        :param ngram_range: 字符 n-gram 的长度范围
+        :param threshold: 余弦相似度阈值，不低于该值视为同一地点
+        :param ambiguous_threshold: 不同簇的地址相似度不低于该值时视为无法确定
+        :param normalizer: 地址规范化函数（如去除行政区划前缀和方位词），代表地址也以规范化后的形式输出
+        :param top: 最多输出的地址数
+        """
+        self.ngram_range = ngram_range
+        self.threshold = threshold
+        self.ambiguous_threshold = ambiguous_threshold
+        self.normalizer = normalizer
+        self.top = top
+        self.groups = 0
+        self.ambiguous_groups = 0
+        self.seconds = 0.0
+
+    def normalize(self, address: str) -> str:
+        address = str(address).strip()
+        if self.normalizer is not None:
+            address = self.normalizer(address) or address
+        return address
+
+    @staticmethod
+    def _key(address: str) -> str:
+        """比较用的形式：全半角统一，去除空白和标点"""
+        return _NOISE.sub("", unicodedata.normalize("NFKC", address)).lower()
+
+    def _ngrams(self, text: str) -> List[str]:
+        low, high = self.ngram_range
+        grams = []
+        for n in range(low, high + 1):
+            grams.extend(text[i:i + n] for i in range(len(text) - n + 1))
+        # 短于最小长度的地址整体作为一个特征
+        return grams or [text]
+
+    def _counts(self, texts: List[str]) -> csr_matrix:
+        """n-gram 词频稀疏矩阵，每行一个文本"""
+        vocabulary: Dict[str, int] = {}
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            for gram, count in Counter(self._ngrams(text)).items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(gram, len(vocabulary)))
+                values.append(count)
+        return csr_matrix((values, (rows, cols)), shape=(len(texts), len(vocabulary)), dtype=float)
+
+    def vectorize(self, texts: List[str], counts: csr_matrix = None) -> csr_matrix:
+        """构造行归一化的 TF-IDF 稀疏矩阵"""
+        matrix = (counts if counts is not None else self._counts(texts)).copy()
+        # 次线性词频，重复的字不会过度放大权重
+        matrix.data = 1.0 + np.log(matrix.data)
+
+        # 平滑 IDF：组内常见的 n-gram（如“南昌”“小区”）权重更低
+        document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0
+        matrix = matrix.multiply(idf).tocsr()
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return csr_matrix(matrix.multiply(1.0 / norms[:, None]))
+
+    @staticmethod
+    def _containment(keys: List[str], counts: csr_matrix) -> np.ndarray:
+        """
+        包含关系矩阵，[i, j] 为 True 表示 keys[i] 是 keys[j] 的子串（i != j，keys[i] 至少2个字）
+
+        先用稀疏矩阵乘法筛出 n-gram 集合被对方完全覆盖的候选对（子串的必要条件），只对候选对做字符串比较
+        """
+        binary = counts.copy()
+        binary.data[:] = 1.0
+        shared = (binary @ binary.T).toarray()
+        own = np.asarray(binary.sum(axis=1)).ravel()
+        lengths = np.array([len(key) for key in keys])
+        candidates = (shared >= own[:, None]) & (lengths[:, None] >= 2)
+        np.fill_diagonal(candidates, False)
+        contains = np.zeros_like(candidates)
+        for i, j in zip(*np.nonzero(candidates)):
+            contains[i, j] = keys[i] in keys[j]
+        return contains
+
+    def cluster(self, address_list: List[str]) -> Tuple[List[Dict], bool]:
+        """
+        对一组地址聚类
+
+        :param address_list: 地址列表（可包含重复值）
+        :return: (按出现次数从高到低排序的簇列表, 是否存在无法确定的相似地址)，
+                 每个簇包含 location（代表地址）、count（出现次数）、members（成员及次数）
+        """
+        counter = Counter(self.normalize(address) for address in address_list if address)
+        unique = [address for address in counter if self._key(address)]
+        if not unique:
+            return [], False
+        keys = [self._key(address) for address in unique]
+
+        counts = self._counts(keys)
+        vectors = self.vectorize(keys, counts)
+        similarity = (vectors @ vectors.T).toarray()
+
+        # 门牌号、楼栋号等数字不同的地址指向不同地点，相似度再高也不合并
+        signatures: Dict[Tuple[str, ...], int] = {(): 0}
+        digits = np.array([signatures.setdefault(tuple(_DIGITS.findall(key)), len(signatures)) for key in keys])
+        same_digits = digits[:, None] == digits[None, :]
+        # 互相包含视为父子关系：数字相同，或被包含的一方（上级地址）不含数字时才相连
+        contains = self._containment(keys, counts) & (same_digits | (digits == 0)[:, None])
+        adjacency = ((similarity >= self.threshold) & same_digits) | contains | contains.T
+        n_clusters, labels = connected_components(csr_matrix(adjacency), directed=False)
+
+        # 不同簇之间仍有较高相似度时无法确定是否为同一地点
+        different = labels[:, None] != labels[None, :]
+        ambiguous = bool(np.any(different & same_digits & (similarity >= self.ambiguous_threshold)))
+        # 经由不含数字的上级地址连到一起、但楼栋号等数字不同的簇，无法确定应保留哪个
+        numbered = np.unique(np.stack([labels, digits])[:, digits != 0], axis=1)
+        ambiguous = ambiguous or bool(np.any(np.bincount(numbered[0], minlength=n_clusters) > 1))
+
+        clusters = []
+        for label in range(n_clusters):
+            members = {unique[i]: counter[unique[i]] for i in np.flatnonzero(labels == label)}
+            # 出现次数不低于簇内最高次数一半的地址中，选最具体（最长）的作为代表
+            most = max(members.values())
+            candidates = [address for address, count in members.items() if count * 2 >= most]
+            representative = max(candidates, key=lambda address: (len(self._key(address)), members[address]))
+            clusters.append({"location": representative, "count": sum(members.values()), "members": members})
+        clusters.sort(key=lambda c: (c["count"], len(c["location"])), reverse=True)
+        return clusters, ambiguous
+
+    def deduplicate(self, address_list: List[str]) -> Tuple[List[str], bool]:
+        """
+        去重并选出代表地址
+
+        :return: (代表地址列表, 是否需要交给大模型确认)
+        """
+        started = time.perf_counter()
+        clusters, ambiguous = self.cluster(address_list)
+        if not clusters:
+            result = []
+        elif all(count == 1 for c in clusters for count in c["members"].values()):
+            # 所有地址都只出现1次时只取1个最具体的地址
+            result = [max((c["location"] for c in clusters), key=lambda address: len(self._key(address)))]
+        else:
+            result = [c["location"] for c in clusters[:self.top]]
+            # 截断位置上次数相同的簇无法按频率取舍
+            if len(clusters) > self.top and clusters[self.top]["count"] == clusters[self.top - 1]["count"]:
+                ambiguous = True
+
+        self.groups += 1
+        self.ambiguous_groups += ambiguous
+        self.seconds += time.perf_counter() - started
+        logging.debug(f"地址去重: {len(address_list)}个地址 -> {result}{'（不确定）' if ambiguous else ''}")
+        return result, ambiguous
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        local = self.groups - self.ambiguous_groups
+        return {
+            "groups": self.groups,
+            "local": local,
+            "ambiguous": self.ambiguous_groups,
+            "local_rate": local / self.groups if self.groups else 0.0,
+            "avg_milliseconds": self.seconds / self.groups * 1000 if self.groups else 0.0,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (f"本地地址去重统计: 共{s['groups']}组，本地确定{s['local']}组（{s['local_rate']:.1%}），"
+                f"交给大模型{s['ambiguous']}组，平均每组{s['avg_milliseconds']:.2f}毫秒")
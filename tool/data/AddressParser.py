@@ -1,10 +1,13 @@
 import re
 from typing import Dict, Optional
 
+from .Gazetteer import Gazetteer
+
 class AddressParser:
     def __init__(self):
         self.address_keywords = ['省', '市', '区', '县', '镇', '乡', '村', '社区', '街道']
         self.separators = ['|', ':', '：', ';', '；']
+        self.gazetteer = Gazetteer.default()
         
     def extract_address(self, text: str) -> str:
         """从文本中提取有效地址"""
@@ -49,28 +52,8 @@ class AddressParser:
         if not address:
             return ''
             
-        # 去除重复的省份信息
-        if address.count('省') > 1:
-            # 找到最后一个省的位置
-            last_province_idx = address.rfind('省')
-            # 从最后一个省之前的文本中删除其他省份信息
-            prefix = re.sub(r'[^省市区县]+?省', '', address[:last_province_idx])
-            address = prefix + address[last_province_idx:]
-        
-        # 去除重复的市信息
-        if address.count('市') > 1:
-            # 找到最后一个市的位置
-            last_city_idx = address.rfind('市')
-            # 从最后一个市之前的文本中删除其他市信息
-            prefix = re.sub(r'[^市区县]+?市', '', address[:last_city_idx])
-            address = prefix + address[last_city_idx:]
-            
-        # 去除重复的区县信息
-        for suffix in ['区', '县']:
-            if address.count(suffix) > 1:
-                last_idx = address.rfind(suffix)
-                prefix = re.sub(f'[^区县]+?{suffix}', '', address[:last_idx])
-                address = prefix + address[last_idx:]
+        # 通过地名库一次扫描去除重复的省、市、区县、乡镇信息
+        address = self.gazetteer.dedupe(address)
         
         # 移除多余的符号
         address = re.sub(r'[【】\[\]]', '', address)
@@ -0,0 +1,227 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# 江西省行政区划（省 -> 设区市 -> 县级 -> 乡镇）
+# 乡镇级只收录了业务中常见的部分，可通过 Gazetteer.add 补充
+JIANGXI_DIVISIONS: Dict[str, Dict[str, List[str]]] = {
+    "南昌市": {
+        "东湖区": [], "西湖区": [], "青云谱区": [], "青山湖区": ["罗家镇", "湖坊镇", "塘山镇", "京东镇"],
+        "新建区": ["长堎镇", "望城镇", "生米镇", "西山镇", "石埠镇", "乐化镇", "樵舍镇", "松湖镇",
+                 "石岗镇", "流湖镇", "联圩镇", "象山镇", "厚田乡", "昌邑乡", "南矶乡", "铁河乡"],
+        "红谷滩区": ["沙井街道", "卫东街道", "生米街道", "凤凰洲街道", "九龙湖街道"],
+        "湾里区": ["招贤镇", "梅岭镇", "罗亭镇", "太平乡"],
+        "南昌县": ["莲塘镇", "向塘镇", "三江镇", "塘南镇", "幽兰镇", "蒋巷镇", "武阳镇", "冈上镇",
+                 "广福镇", "小蓝经济技术开发区", "泾口乡", "南新乡", "八一乡", "黄马乡"],
+        "安义县": ["龙津镇", "万埠镇", "石鼻镇", "鼎湖镇", "长埠镇", "东阳镇", "黄洲镇", "乔乐乡"],
+        "进贤县": ["民和镇", "李渡镇", "温圳镇", "文港镇", "梅庄镇", "张公镇", "罗溪镇", "架桥镇",
+                 "前坊镇", "三里乡", "二塘乡", "钟陵乡", "池溪乡", "南台乡", "三阳集乡"],
+        "南昌经济技术开发区": [], "南昌高新技术产业开发区": [], "红谷滩新区": [],
+    },
+    "景德镇市": {"昌江区": [], "珠山区": [], "浮梁县": [], "乐平市": []},
+    "萍乡市": {"安源区": [], "湘东区": [], "莲花县": [], "上栗县": [], "芦溪县": []},
+    "九江市": {
+        "濂溪区": [], "浔阳区": [], "柴桑区": [], "武宁县": [], "修水县": [],
+        "永修县": ["涂埠镇", "吴城镇", "虬津镇", "艾城镇", "滩溪镇", "燕坊镇", "柘林镇", "马口镇", "三溪桥镇"],
+        "德安县": [], "都昌县": ["都昌镇", "蔡岭镇", "周溪镇", "徐埠镇", "土塘镇", "大港镇", "多宝乡"],
+        "湖口县": [], "彭泽县": [], "瑞昌市": [],
+        "共青城市": ["茶山街道", "甘露镇", "江益镇", "泽泉乡", "苏家垱乡", "金湖乡"],
+        "庐山市": [], "八里湖新区": [],
+    },
+    "新余市": {"渝水区": [], "分宜县": []},
+    "鹰潭市": {"月湖区": [], "余江区": [], "贵溪市": []},
+    "赣州市": {
+        "章贡区": [], "南康区": [], "赣县区": [], "信丰县": [], "大余县": [], "上犹县": [],
+        "崇义县": [], "安远县": [], "定南县": [], "全南县": [], "宁都县": [], "于都县": [],
+        "兴国县": [], "会昌县": [], "寻乌县": [], "石城县": [], "瑞金市": [], "龙南市": [],
+    },
+    "吉安市": {
+        "吉州区": [], "青原区": [], "吉安县": [], "吉水县": [], "峡江县": [], "新干县": [],
+        "永丰县": [], "泰和县": [], "遂川县": [], "万安县": [], "安福县": [], "永新县": [],
+        "井冈山市": [],
+    },
+    "宜春市": {
+        "袁州区": [], "奉新县": [], "万载县": [], "上高县": [], "宜丰县": [], "靖安县": [],
+        "铜鼓县": [], "丰城市": [], "樟树市": [], "高安市": [],
+    },
+    "抚州市": {
+        "临川区": [], "东乡区": [], "南城县": [], "黎川县": [], "南丰县": [], "崇仁县": [],
+        "乐安县": [], "宜黄县": [], "金溪县": [], "资溪县": [], "广昌县": [],
+    },
+    "上饶市": {
+        "信州区": [], "广丰区": [], "广信区": [], "玉山县": [], "铅山县": [], "横峰县": [],
+        "弋阳县": [], "余干县": [], "鄱阳县": [], "万年县": [], "婺源县": [], "德兴市": [],
+    },
+}
+
+# 常见简称，只有紧跟其他行政区划时才会被识别，避免误伤"南昌大学"之类的地名
+JIANGXI_ALIASES: Dict[str, str] = {
+    "江西": "江西省",
+    "南昌": "南昌市", "景德镇": "景德镇市", "萍乡": "萍乡市", "九江": "九江市", "新余": "新余市",
+    "鹰潭": "鹰潭市", "赣州": "赣州市", "吉安": "吉安市", "宜春": "宜春市", "抚州": "抚州市",
+    "上饶": "上饶市",
+    "经开区": "南昌经济技术开发区", "南昌经开区": "南昌经济技术开发区",
+    "高新区": "南昌高新技术产业开发区", "南昌高新区": "南昌高新技术产业开发区",
+    "小蓝经开区": "小蓝经济技术开发区",
+}
+
+
+class Division(NamedTuple):
+    """行政区划条目"""
+    name: str               # 规范名称，如"南昌市"
+    level: int              # 层级，见 Gazetteer.PROVINCE 等常量
+    parent: Optional[str]   # 上级行政区划的规范名称
+    is_alias: bool = False  # 是否为简称
+
+
+class _TrieNode:
+    __slots__ = ("children", "division")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.division: Optional[Division] = None
+
+
+class Gazetteer:
+    """
+    江西省行政区划地名库
+
+    将省、市、县、乡镇名称（含常用简称）装入前缀树，单次从左到右扫描即可识别、去重和剥离地址中的行政区划，
+    供各个地址处理模块共用。
+    """
+
+    PROVINCE, CITY, COUNTY, TOWN = 1, 2, 3, 4
+
+    _default = None
+
+    def __init__(self, divisions: Dict[str, Dict[str, List[str]]] = None,
+                 aliases: Dict[str, str] = None, province: str = "江西省"):
+        self._root = _TrieNode()
+        self._divisions: Dict[str, Division] = {}
+
+        self.add(province, self.PROVINCE)
+        for city, counties in (divisions or {}).items():
+            self.add(city, self.CITY, province)
+            for county, towns in counties.items():
+                self.add(county, self.COUNTY, city)
+                for town in towns:
+                    self.add(town, self.TOWN, county)
+
+        for alias, name in (aliases or {}).items():
+            self.add_alias(alias, name)
+
+    @classmethod
+    def default(cls) -> "Gazetteer":
+        """获取内置的江西省地名库（全局共享一个实例）"""
+        if cls._default is None:
+            cls._default = cls(JIANGXI_DIVISIONS, JIANGXI_ALIASES)
+        return cls._default
+
+    def add(self, name: str, level: int, parent: str = None) -> Division:
+        """添加一个行政区划"""
+        division = Division(name, level, parent)
+        self._divisions[name] = division
+        self._insert(name, division)
+        return division
+
+    def add_alias(self, alias: str, name: str):
+        """为已有的行政区划添加简称"""
+        target = self._divisions.get(name)
+        if target is None:
+            raise KeyError(f"未知的行政区划: {name}")
+        self._insert(alias, target._replace(is_alias=True))
+
+    def get(self, name: str) -> Optional[Division]:
+        """按规范名称查询行政区划"""
+        return self._divisions.get(name)
+
+    def _insert(self, key: str, division: Division):
+        node = self._root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+        node.division = division
+
+    def _longest(self, text: str, start: int) -> Tuple[int, Optional[Division]]:
+        """从start位置开始做最长前缀匹配，返回(结束位置, 条目)"""
+        node = self._root
+        candidates = []
+        for i in range(start, len(text)):
+            node = node.children.get(text[i])
+            if node is None:
+                break
+            if node.division is not None:
+                candidates.append((i + 1, node.division))
+        # 从最长的候选开始，简称必须紧跟另一个行政区划才算数
+        for cand_end, division in reversed(candidates):
+            if not division.is_alias or self._has_full_match(text, cand_end):
+                return cand_end, division
+        return start, None
+
+    def _has_full_match(self, text: str, start: int) -> bool:
+        node = self._root
+        for i in range(start, len(text)):
+            node = node.children.get(text[i])
+            if node is None:
+                return False
+            if node.division is not None:
+                return True
+        return False
+
+    def match(self, text: str, start: int = 0) -> Optional[Tuple[int, Division]]:
+        """匹配start位置处的行政区划，返回(结束位置, 条目)，没有匹配返回None"""
+        end, division = self._longest(text, start)
+        return (end, division) if division is not None else None
+
+    def split_prefix(self, address: str) -> Tuple[List[Division], str]:
+        """
+        拆分地址开头的行政区划前缀
+
+        :param address: 原始地址
+        :return: (识别到的行政区划列表, 剩余部分)
+        """
+        if not address:
+            return [], address or ""
+        units = []
+        pos = 0
+        while pos < len(address):
+            while pos < len(address) and address[pos].isspace():
+                pos += 1
+            end, division = self._longest(address, pos)
+            if division is None:
+                break
+            units.append(division)
+            pos = end
+        return units, address[pos:]
+
+    def strip_prefix(self, address: str) -> str:
+        """去除地址开头的省、市、区县、乡镇前缀；如果剥离后为空则保留原地址"""
+        _, rest = self.split_prefix(address)
+        return rest if rest.strip() else address
+
+    def dedupe(self, address: str) -> str:
+        """
+        去除地址开头的行政区划前缀中重复出现的行政区划，保留首次出现的位置
+
+        只处理开头连续的行政区划，遇到第一个非行政区划的文字即停止，之后的部分原样保留，
+        避免误伤"东湖区政府"之类的地名。如果首次出现的是简称、后面出现了全称，则用全称替换首次出现的简称。
+        """
+        if not address:
+            return ''
+        pieces: List[str] = []
+        seen: Dict[str, int] = {}
+        pos = 0
+        while pos < len(address):
+            start = pos
+            while pos < len(address) and address[pos].isspace():
+                pos += 1
+            end, division = self._longest(address, pos)
+            if division is None:
+                pos = start
+                break
+            pieces.append(address[start:pos])
+            index = seen.get(division.name)
+            if index is None:
+                seen[division.name] = len(pieces)
+                pieces.append(address[pos:end])
+            elif not division.is_alias and pieces[index] != division.name:
+                pieces[index] = division.name
+            pos = end
+        return ''.join(pieces) + address[pos:]
@@ -0,0 +1,89 @@
+import logging
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+class LocationCluster:
+    """
+    基于相似度矩阵的位置模糊聚类
+
+    使用 rapidfuzz 的多线程 cdist 一次性计算所有去重位置之间的相似度，
+    相似度不低于阈值的位置通过并查集合并为同一簇，返回规模最大的簇的代表位置及其出现次数。
+    """
+
+    def __init__(self, threshold: float = 80, workers: int = -1, debug: bool = False):
+        """
+        :param threshold: 相似度阈值（0-100），不低于该值视为同一位置
+        :param workers: cdist 使用的线程数，-1 表示使用全部 CPU 核心
+        :param debug: 是否输出调试日志
+        """
+        self.threshold = threshold
+        self.workers = workers
+        self.debug = debug
+
+    def cluster(self, locations: List[str]) -> List[Dict]:
+        """
+        对位置列表聚类
+
+        :param locations: 位置列表（可包含重复值）
+        :return: 按出现次数从高到低排序的簇列表，每个簇包含 location（代表位置）、count（出现次数）、members（成员及次数）
+        """
+        counter = Counter(str(loc) for loc in locations)
+        unique = list(counter)
+        if not unique:
+            return []
+
+        parent = list(range(len(unique)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        if len(unique) > 1:
+            # 低于阈值的相似度直接记为0，只需要上三角部分
+            matrix = process.cdist(unique, unique, scorer=fuzz.ratio,
+                                   score_cutoff=self.threshold, workers=self.workers)
+            rows, cols = np.nonzero(np.triu(matrix >= self.threshold, k=1))
+            for i, j in zip(rows.tolist(), cols.tolist()):
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[root_j] = root_i
+
+        groups: Dict[int, List[str]] = {}
+        for idx, loc in enumerate(unique):
+            groups.setdefault(find(idx), []).append(loc)
+
+        clusters = []
+        for members in groups.values():
+            # 簇内出现次数最多的位置作为代表，次数相同取更长（更具体）的位置
+            representative = max(members, key=lambda loc: (counter[loc], len(loc)))
+            clusters.append({
+                "location": representative,
+                "count": sum(counter[loc] for loc in members),
+                "members": {loc: counter[loc] for loc in members},
+            })
+        clusters.sort(key=lambda c: (c["count"], len(c["location"])), reverse=True)
+
+        if self.debug:
+            for c in clusters:
+                logging.debug(f"位置簇 '{c['location']}' ({c['count']}次): {c['members']}")
+        return clusters
+
+    def most_frequent(self, locations: List[str]) -> Dict:
+        """
+        找出相似度高且出现次数最多的位置
+
+        :return: {"location": 代表位置, "count": 出现次数}
+        """
+        clusters = self.cluster(locations)
+        if not clusters:
+            return {"location": "无数据", "count": 0}
+        best = clusters[0]
+        if self.debug:
+            logging.debug(f"最终选择的位置: {best['location']}, 出现次数: {best['count']}")
+        return {"location": best["location"], "count": best["count"]}
@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional, Tuple
+
+
+class SuffixAutomaton:
+    """
+    广义后缀自动机
+
+    对一组字符串在线性时间内构建后缀自动机，并统计每个状态（即一类子串）出现在多少个不同的字符串中，
+    用于查找被最多字符串共享的最长公共子串，结果与输入顺序无关。
+    """
+
+    def __init__(self, strings: List[str] = None):
+        self.strings: List[str] = []
+        # 每个状态的：最长子串长度、后缀链接、转移、首次出现的(字符串序号, 结束位置)
+        self._length: List[int] = [0]
+        self._link: List[int] = [-1]
+        self._next: List[Dict[str, int]] = [{}]
+        self._endpos: List[Tuple[int, int]] = [(-1, -1)]
+        self._count: Optional[List[int]] = None
+
+        for s in strings or []:
+            self.add(s)
+
+    def _new_state(self, length: int, link: int, transitions: Dict[str, int], endpos: Tuple[int, int]) -> int:
+        self._length.append(length)
+        self._link.append(link)
+        self._next.append(transitions)
+        self._endpos.append(endpos)
+        return len(self._length) - 1
+
+    def _clone(self, p: int, q: int, char: str) -> int:
+        """把状态q拆分出长度为len(p)+1的克隆状态，并重定向p及其后缀链接上指向q的转移"""
+        clone = self._new_state(self._length[p] + 1, self._link[q], dict(self._next[q]), self._endpos[q])
+        while p != -1 and self._next[p].get(char) == q:
+            self._next[p][char] = clone
+            p = self._link[p]
+        self._link[q] = clone
+        return clone
+
+    def _extend(self, last: int, char: str, endpos: Tuple[int, int]) -> int:
+        # 转移已存在（其他字符串已经包含该子串），只可能需要拆分状态
+        if char in self._next[last]:
+            q = self._next[last][char]
+            if self._length[last] + 1 == self._length[q]:
+                return q
+            return self._clone(last, q, char)
+
+        cur = self._new_state(self._length[last] + 1, 0, {}, endpos)
+        p = last
+        while p != -1 and char not in self._next[p]:
+            self._next[p][char] = cur
+            p = self._link[p]
+        if p != -1:
+            q = self._next[p][char]
+            if self._length[p] + 1 == self._length[q]:
+                self._link[cur] = q
+            else:
+                self._link[cur] = self._clone(p, q, char)
+        return cur
+
+    def add(self, s: str):
+        """向自动机中加入一个字符串"""
+        index = len(self.strings)
+        self.strings.append(s)
+        last = 0
+        for pos, char in enumerate(s):
+            last = self._extend(last, char, (index, pos))
+        self._count = None
+
+    def _document_counts(self) -> List[int]:
+        """统计每个状态出现在多少个不同的字符串中"""
+        if self._count is not None:
+            return self._count
+        count = [0] * len(self._length)
+        marker = [-1] * len(self._length)
+        for index, s in enumerate(self.strings):
+            state = 0
+            for char in s:
+                state = self._next[state][char]
+                # 沿后缀链接向上标记，遇到已被本字符串标记的状态即可停止
+                v = state
+                while v > 0 and marker[v] != index:
+                    marker[v] = index
+                    count[v] += 1
+                    v = self._link[v]
+        self._count = count
+        return count
+
+    def most_shared_substring(self, min_length: int = 1) -> Optional[Tuple[str, int]]:
+        """
+        查找被最多字符串共享的最长子串
+
+        :param min_length: 子串的最小长度
+        :return: (子串, 包含该子串的字符串数量)，不存在满足长度要求的子串时返回None
+        """
+        count = self._document_counts()
+        best_state, best_key = -1, (0, 0)
+        for state in range(1, len(self._length)):
+            length = self._length[state]
+            if length < min_length:
+                continue
+            key = (count[state], length)
+            if key > best_key:
+                best_state, best_key = state, key
+        if best_state == -1:
+            return None
+
+        index, end = self._endpos[best_state]
+        length = self._length[best_state]
+        return self.strings[index][end - length + 1:end + 1], count[best_state]
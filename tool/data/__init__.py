@@ -1,2 +1,6 @@
 from .DataUtils import DataUtils
 from .AddressParser import AddressParser
+from .Gazetteer import Gazetteer
+from .LocationCluster import LocationCluster
+from .SuffixAutomaton import SuffixAutomaton
+from .AddressDeduplicator import AddressDeduplicator
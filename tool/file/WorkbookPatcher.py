@@ -0,0 +1,276 @@
+import os
+import re
+import copy
+import math
+import struct
+import logging
+import datetime as dt
+import posixpath
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+from numbers import Number
+from typing import Dict, Iterable, List
+from xml.sax.saxutils import escape
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# XML 1.0 不允许出现的控制字符
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# zip 本地文件头的固定长度，文件名长度和扩展字段长度位于最后 4 个字节
+_LOCAL_HEADER_SIZE = 30
+# Excel 日期序列号的起点（1900 日期系统）
+_EXCEL_EPOCH = dt.datetime(1899, 12, 30)
+# 内置数字格式：14 为日期，22 为日期时间
+_DATE_FORMAT_IDS = (14, 22)
+_CELL_XFS = re.compile(r"<((?:\w+:)?)cellXfs\b([^>]*)>(.*?)</\1cellXfs>", re.S)
+
+
+class WorkbookPatcher:
+    """
+    xlsx 工作簿补丁工具，只替换目标工作表的 XML 部件。
+
+    xlsx 本质上是一个 zip 包，每个工作表是其中一个独立的 XML 文件。替换某个工作表时，
+    其余工作表、共享字符串等部件直接复制压缩后的原始字节，不解压也不重新压缩，因此耗时只取决于被替换的工作表。
+    日期写成 Excel 序列号并在样式表中追加日期格式，只有这时才改写样式表。
+    """
+
+    def __init__(self, source_path: str):
+        self.source_path = source_path
+        # 日期、日期时间单元格使用的样式序号，没有日期列时为 None
+        self._date_styles = None
+
+    def sheet_parts(self) -> Dict[str, str]:
+        """返回 {工作表名称: zip 内部件路径} 的映射"""
+        with zipfile.ZipFile(self.source_path) as archive:
+            return self._read_sheet_parts(archive)
+
+    @staticmethod
+    def _read_sheet_parts(archive: zipfile.ZipFile) -> Dict[str, str]:
+        workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+        rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{{{_PKG_REL_NS}}}Relationship")}
+
+        parts = {}
+        for sheet in workbook.iter(f"{{{_MAIN_NS}}}sheet"):
+            target = targets.get(sheet.get(f"{{{_REL_NS}}}id"))
+            if target is None:
+                continue
+            # Target 可能是相对 xl/ 的路径，也可能是以 / 开头的绝对路径
+            if target.startswith("/"):
+                part = target.lstrip("/")
+            else:
+                part = posixpath.normpath(posixpath.join("xl", target))
+            parts[sheet.get("name")] = part
+        return parts
+
+    def replace_sheet(self, sheet_name: str, df, output_path: str = None) -> str:
+        """
+        用 DataFrame 的内容替换指定工作表，其余部件原样复制
+
+        :param sheet_name: 要替换的工作表名称
+        :param df: Polars 或 pandas DataFrame，第一行写入列名
+        :param output_path: 输出路径，为空时原地替换源文件
+        :return: 输出文件路径
+        """
+        target_path = output_path or self.source_path
+        out_dir = os.path.dirname(os.path.abspath(target_path))
+        fd, temp_path = tempfile.mkstemp(suffix=".xlsx", dir=out_dir)
+        os.close(fd)
+
+        try:
+            with zipfile.ZipFile(self.source_path) as src, open(self.source_path, "rb") as raw, \
+                    zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as dst:
+                parts = self._read_sheet_parts(src)
+                if sheet_name not in parts:
+                    raise KeyError(f"工作簿中不存在工作表: {sheet_name}")
+                sheet_part = parts[sheet_name]
+                sheet_rels = posixpath.join(posixpath.dirname(sheet_part), "_rels",
+                                            posixpath.basename(sheet_part) + ".rels")
+                names = set(src.namelist())
+                has_calc_chain = "xl/calcChain.xml" in names
+
+                styles = None
+                self._date_styles = None
+                if "xl/styles.xml" in names and self._has_dates(df):
+                    styles = self._add_date_styles(src.read("xl/styles.xml"))
+
+                for info in src.infolist():
+                    name = info.filename
+                    if name == sheet_part:
+                        with dst.open(self._new_info(info), "w") as stream:
+                            self._write_sheet_xml(stream, df)
+                    elif name == sheet_rels or name == "xl/calcChain.xml":
+                        # 旧工作表的关系和公式计算链已失效，交给 Excel 重新生成
+                        continue
+                    elif has_calc_chain and name in ("[Content_Types].xml", "xl/_rels/workbook.xml.rels"):
+                        dst.writestr(self._new_info(info), self._drop_calc_chain(src.read(name)))
+                    elif name == "xl/styles.xml" and styles is not None:
+                        dst.writestr(self._new_info(info), styles)
+                    else:
+                        self._copy_raw(raw, dst, info)
+
+            os.replace(temp_path, target_path)
+            logging.info(f"已替换工作表 {sheet_name}，路径：{target_path}")
+            return target_path
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def _copy_raw(raw, dst: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """把部件压缩后的原始字节原样写入目标 zip，不解压、不重新压缩"""
+        raw.seek(info.header_offset)
+        header = raw.read(_LOCAL_HEADER_SIZE)
+        name_length, extra_length = struct.unpack("<2H", header[-4:])
+        raw.seek(name_length + extra_length, os.SEEK_CUR)
+
+        new_info = copy.copy(info)
+        # 大小和 CRC 直接写在本地文件头中，不再使用数据描述符
+        new_info.flag_bits &= ~0x08
+        new_info.extra = b""
+        new_info.header_offset = dst.fp.tell()
+        dst.fp.write(new_info.FileHeader())
+        remaining = info.compress_size
+        while remaining > 0:
+            chunk = raw.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                raise zipfile.BadZipFile(f"部件数据不完整: {info.filename}")
+            dst.fp.write(chunk)
+            remaining -= len(chunk)
+        dst.filelist.append(new_info)
+        dst.NameToInfo[new_info.filename] = new_info
+        dst.start_dir = dst.fp.tell()
+
+    @staticmethod
+    def _has_dates(df) -> bool:
+        """是否包含日期或日期时间列"""
+        if hasattr(df, "schema"):  # Polars
+            return any(str(dtype).startswith(("Date", "Datetime")) for dtype in df.schema.values())
+        for column in df.columns:  # pandas
+            series = df[column]
+            if str(series.dtype).startswith("datetime"):
+                return True
+            if series.dtype == object and any(isinstance(value, dt.date) for value in series):
+                return True
+        return False
+
+    def _add_date_styles(self, data: bytes) -> bytes:
+        """在样式表的 cellXfs 末尾追加日期和日期时间格式，记下它们的样式序号"""
+        text = data.decode("utf-8")
+        match = _CELL_XFS.search(text)
+        if match is None:
+            return data
+        prefix, attrs, body = match.groups()
+        # 样式序号按已有 xf 元素的个数计算，不依赖 count 属性
+        count = len(re.findall(rf"<{prefix}xf\b", body))
+        self._date_styles = (count, count + 1)
+        xfs = "".join(f'<{prefix}xf numFmtId="{fmt}" fontId="0" fillId="0" borderId="0" applyNumberFormat="1"/>'
+                      for fmt in _DATE_FORMAT_IDS)
+        attrs = re.sub(r'\bcount="\d+"', f'count="{count + len(_DATE_FORMAT_IDS)}"', attrs)
+        replacement = f"<{prefix}cellXfs{attrs}>{body}{xfs}</{prefix}cellXfs>"
+        return (text[:match.start()] + replacement + text[match.end():]).encode("utf-8")
+
+    @staticmethod
+    def _new_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+        new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        new_info.compress_type = zipfile.ZIP_DEFLATED
+        new_info.external_attr = info.external_attr
+        return new_info
+
+    @staticmethod
+    def _drop_calc_chain(data: bytes) -> bytes:
+        text = data.decode("utf-8")
+        text = re.sub(r'<Override[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', "", text)
+        text = re.sub(r'<Relationship[^>]*Target="[^"]*calcChain\.xml"[^>]*/>', "", text)
+        return text.encode("utf-8")
+
+    @staticmethod
+    def _iter_rows(df) -> Iterable[tuple]:
+        if hasattr(df, "iter_rows"):  # Polars
+            return df.iter_rows()
+        return df.itertuples(index=False, name=None)  # pandas
+
+    def _write_sheet_xml(self, stream, df):
+        columns: List[str] = [str(col) for col in df.columns]
+        letters = [self._column_letter(i) for i in range(1, len(columns) + 1)]
+
+        write = stream.write
+        write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n')
+        write(f'<worksheet xmlns="{_MAIN_NS}"><sheetData>'.encode("utf-8"))
+
+        write(self._row_xml(1, letters, columns).encode("utf-8"))
+        buffer = []
+        for row_idx, row in enumerate(self._iter_rows(df), 2):
+            buffer.append(self._row_xml(row_idx, letters, row))
+            if len(buffer) >= 1000:
+                write("".join(buffer).encode("utf-8"))
+                buffer = []
+        if buffer:
+            write("".join(buffer).encode("utf-8"))
+
+        write(b"</sheetData></worksheet>")
+
+    def _row_xml(self, row_idx: int, letters: List[str], values) -> str:
+        cells = []
+        for letter, value in zip(letters, values):
+            cell = self._cell_xml(f"{letter}{row_idx}", value)
+            if cell:
+                cells.append(cell)
+        return f'<row r="{row_idx}">{"".join(cells)}</row>'
+
+    def _cell_xml(self, ref: str, value) -> str:
+        # 空值（None、NaN、NaT）和无穷大不写入单元格
+        if self._is_missing(value):
+            return ""
+        if isinstance(value, bool):
+            return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, Number):
+            try:
+                if not math.isfinite(value):
+                    return ""
+            except TypeError:  # 复数等无法转换为浮点数的值按文本写入
+                pass
+            else:
+                return f'<c r="{ref}"><v>{value}</v></c>'
+        if isinstance(value, dt.date):
+            if self._date_styles is not None:
+                return self._date_cell_xml(ref, value)
+            if isinstance(value, dt.datetime):
+                value = value.strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                value = value.strftime("%Y-%m-%d")
+        text = _ILLEGAL_XML_CHARS.sub("", str(value))
+        space = ' xml:space="preserve"' if text != text.strip() else ""
+        return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+    def _date_cell_xml(self, ref: str, value: dt.date) -> str:
+        """日期写成 Excel 序列号，并使用日期格式的样式"""
+        if isinstance(value, dt.datetime):
+            serial = (value.replace(tzinfo=None) - _EXCEL_EPOCH).total_seconds() / 86400
+            style = self._date_styles[1]
+        else:
+            serial = (value - _EXCEL_EPOCH.date()).days
+            style = self._date_styles[0]
+        return f'<c r="{ref}" s="{style}"><v>{serial!r}</v></c>'
+
+    @staticmethod
+    def _is_missing(value) -> bool:
+        if value is None:
+            return True
+        try:
+            return bool(value != value)
+        except TypeError:  # pandas.NA 不能参与布尔判断
+            return True
+
+    @staticmethod
+    def _column_letter(index: int) -> str:
+        letters = ""
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(65 + remainder) + letters
+        return letters
@@ -1,2 +1,3 @@
 from .FileManager import FileManager
-from .ExcelManager import ExcelManager
\ No newline at end of file
+from .ExcelManager import ExcelManager
+from .WorkbookPatcher import WorkbookPatcher
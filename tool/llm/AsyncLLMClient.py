@@ -0,0 +1,309 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from .Backends import Backend, DASHSCOPE_BASE_URL, DEFAULT_API_KEY, get_backend
+from .Cassette import Cassette
+from .Hedging import HedgePolicy
+from .RateLimiter import TokenBucket
+from .Resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from .ResponseCache import ResponseCache
+from .SingleFlight import SingleFlight
+from .StreamCollector import StreamCollector
+from .Telemetry import Telemetry
+
+# 默认限额参照百炼平台的默认配额，可通过环境变量按账号的实际限额调整
+DEFAULT_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 20))
+DEFAULT_RPM = float(os.getenv("LLM_RPM", 600))
+DEFAULT_TPM = float(os.getenv("LLM_TPM", 1000000))
+
+
+class AsyncLLMClient:
+    """
+    统一的异步大模型客户端
+
+    所有请求共享同一个 HTTP 连接池，并发数由信号量控制，请求数和 token 数分别由令牌桶按每分钟配额限流，
+    取代各个工具里各自创建客户端、用固定 sleep 控速的做法。
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = None, backend=None,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_minute: float = DEFAULT_RPM,
+                 tokens_per_minute: float = DEFAULT_TPM,
+                 cache: ResponseCache = None, timeout: float = 600, single_flight: SingleFlight = None,
+                 telemetry: Telemetry = None, retry_policy: RetryPolicy = None,
+                 circuit_breaker: CircuitBreaker = None, cassette: Cassette = None,
+                 hedge_policy: HedgePolicy = None):
+        """
+        :param api_key: API密钥，不提供时使用服务配置中的密钥
+        :param base_url: OpenAI 兼容接口地址，不提供时使用服务配置中的地址
+        :param backend: 服务名称（dashscope/deepseek/ollama/mock）或 Backend 实例，不提供时读取环境变量 LLM_BACKEND
+        :param concurrency: 同时进行中的请求上限
+        :param requests_per_minute: 每分钟请求数上限
+        :param tokens_per_minute: 每分钟 token 数上限
+        :param cache: 响应缓存，可选
+        :param timeout: 单个请求的整体超时时间（秒）
+        :param single_flight: 进行中请求合并器，可选，提供后同时到达的相同请求只向上游发起一次
+        :param telemetry: 调用遥测，不提供时使用进程内共享的实例
+        :param retry_policy: 重试策略，不提供时使用默认策略
+        :param circuit_breaker: 熔断器，不提供时每个客户端单独创建一个
+        :param cassette: 录制/回放磁带，不提供时按环境变量 LLM_CASSETTE 创建，未设置则不使用
+        :param hedge_policy: 对冲请求策略，不提供时按环境变量 LLM_HEDGE_PERCENTILE 创建，未设置则不对冲
+        """
+        self.backend: Backend = get_backend(backend)
+        self.api_key = api_key or self.backend.api_key
+        self.base_url = base_url or self.backend.base_url
+        self.cache = cache
+        self.single_flight = single_flight
+        self.telemetry = telemetry or Telemetry.default()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.cassette = cassette if cassette is not None else Cassette.from_env()
+        self.hedge_policy = hedge_policy if hedge_policy is not None else HedgePolicy.from_env()
+
+        # 连接池大小与并发数一致，长连接在请求之间复用
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=timeout
+        )
+        # 重试由 retry_policy 统一处理，关闭 SDK 自带的重试
+        self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=self._http_client,
+                                  max_retries=0)
+
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.request_limiter = TokenBucket(requests_per_minute)
+        self.token_limiter = TokenBucket(tokens_per_minute)
+
+    @staticmethod
+    def build_messages(prompt: str, system_prompt: str = None) -> List[Dict[str, str]]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """粗略估算 token 数（中文约一字一个 token），用于发送前的限流"""
+        return len(text or "")
+
+    async def stream(self, prompt: str, model: str = "qwq-32b", system_prompt: str = None,
+                     timeout: float = None, **params) -> AsyncIterator:
+        """
+        发送流式请求，逐个产出原始的响应块
+
+        :param timeout: 等待接口开始响应的超时时间（秒），可选
+        :param params: 透传给 chat.completions.create 的其他参数
+        """
+        model = self.backend.resolve_model(model)
+        if self.single_flight is None:
+            upstream = self._stream_upstream(prompt, model, system_prompt, timeout, params)
+        else:
+            key = self.single_flight.make_key(model, system_prompt, prompt, params)
+            upstream = self.single_flight.stream(
+                key, lambda: self._stream_upstream(prompt, model, system_prompt, timeout, params))
+        async for chunk in upstream:
+            yield chunk
+
+    async def _stream_upstream(self, prompt: str, model: str, system_prompt: Optional[str],
+                               timeout: Optional[float], params: Dict) -> AsyncIterator:
+        """
+        向上游服务发起流式请求，可重试的错误按重试策略重试，并经过熔断器
+
+        已经产出响应块之后的失败不再重试，避免调用方收到重复内容；重试等待期间不占用并发名额
+        """
+        attempt = 0
+        circuit_waits = 0
+        while True:
+            streamed = False
+            settled = False
+            try:
+                self.circuit_breaker.before_call()
+                async for chunk in self._stream_once(prompt, model, system_prompt, timeout, params):
+                    streamed = True
+                    yield chunk
+                settled = True
+                self.circuit_breaker.record_success()
+                return
+            except Exception as e:
+                settled = True
+                circuit_open = isinstance(e, CircuitOpenError)
+                if self.retry_policy.is_upstream_failure(e):
+                    self.circuit_breaker.record_failure()
+                elif not circuit_open:
+                    # 参数错误等说明上游本身可用
+                    self.circuit_breaker.record_success()
+                # 等待熔断冷却不占用重试次数，另有上限
+                if circuit_open:
+                    exhausted = circuit_waits >= self.retry_policy.max_circuit_waits
+                else:
+                    exhausted = attempt + 1 >= self.retry_policy.max_attempts
+                if streamed or exhausted or not self.retry_policy.is_retryable(e):
+                    self.retry_policy.record_give_up(e)
+                    raise
+                delay = self.retry_policy.delay(attempt, e)
+                self.retry_policy.record_retry(e)
+                if circuit_open:
+                    circuit_waits += 1
+                else:
+                    attempt += 1
+                    logging.warning(f"大模型请求失败({type(e).__name__}: {e})，{delay:.1f}秒后第{attempt}次重试")
+            finally:
+                if not settled:
+                    # 调用方取消或提前关闭，没有结果
+                    self.circuit_breaker.release()
+            await asyncio.sleep(delay)
+
+    async def _stream_once(self, prompt: str, model: str, system_prompt: Optional[str],
+                           timeout: Optional[float], params: Dict) -> AsyncIterator:
+        """向上游服务发起一次流式请求，受并发数和限流配额约束"""
+        prompt_tokens = self.estimate_tokens(prompt) + self.estimate_tokens(system_prompt)
+        async with self._semaphore:
+            await self.request_limiter.acquire(1)
+            await self.token_limiter.acquire(prompt_tokens)
+
+            with self.telemetry.track(model) as call:
+                key = None
+                response = None
+                if self.cassette is not None:
+                    key = self.cassette.make_key(model, system_prompt, prompt, params)
+                if key is not None and self.cassette.should_replay(key):
+                    # 回放录制的响应，同样受并发和限流约束，便于离线比较流水线的调度
+                    completion = self.cassette.replay(key)
+                else:
+                    started = time.perf_counter()
+                    # 阿里云模型只支持流式请求
+                    request = self.client.chat.completions.create(
+                        model=model,
+                        messages=self.build_messages(prompt, system_prompt),
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **params
+                    )
+                    response = await (asyncio.wait_for(request, timeout) if timeout else request)
+                    completion = response
+                    if key is not None:
+                        completion = self.cassette.record(key, model, started, response)
+
+                try:
+                    async for chunk in completion:
+                        call.observe(chunk)
+                        usage = getattr(chunk, "usage", None)
+                        if usage is not None and getattr(usage, "completion_tokens", None):
+                            # 回复消耗的 token 事后补扣
+                            self.token_limiter.consume(usage.completion_tokens)
+                        yield chunk
+                finally:
+                    if response is not None:
+                        # 被取消（如对冲中落后的请求）时及时断开连接，上游停止生成
+                        await response.close()
+
+    async def chat(self, prompt: str, model: str = "qwq-32b", system_prompt: str = None,
+                   timeout: float = None, on_reasoning=None, on_content=None, return_metrics: bool = False,
+                   cache: ResponseCache = None, **params) -> Tuple:
+        """
+        发送请求并收集完整结果
+
+        :param on_reasoning: 收到思考过程增量时的回调，可选
+        :param on_content: 收到回复内容增量时的回调，可选
+        :param return_metrics: 是否同时返回计时指标
+        :param cache: 本次调用使用的响应缓存，不提供时使用客户端的缓存
+        :return: (思考过程, 回复内容)，return_metrics为True时为(思考过程, 回复内容, 计时指标)
+        """
+        cache = cache if cache is not None else self.cache
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(self.backend.resolve_model(model), system_prompt, prompt, params)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                if return_metrics:
+                    return cached["reasoning"], cached["answer"], {"cached": True}
+                return cached["reasoning"], cached["answer"]
+
+        if self.hedge_policy is not None and on_reasoning is None and on_content is None:
+            # 有增量回调时调用方要实时看到内容，不对冲，避免两个请求的增量交错
+            collector = await self.hedge_policy.run(
+                lambda hedge: self._collect(prompt, model, system_prompt, timeout, params, hedge))
+        else:
+            collector = await self._collect(prompt, model, system_prompt, timeout, params,
+                                            on_reasoning=on_reasoning, on_content=on_content)
+        reasoning_content, answer_content = collector.reasoning, collector.answer
+
+        if cache_key is not None:
+            cache.set(cache_key, {"reasoning": reasoning_content, "answer": answer_content})
+        if return_metrics:
+            return reasoning_content, answer_content, collector.metrics()
+        return reasoning_content, answer_content
+
+    async def _collect(self, prompt: str, model: str, system_prompt: Optional[str], timeout: Optional[float],
+                       params: Dict, hedge: bool = False, on_reasoning=None, on_content=None) -> StreamCollector:
+        """发送请求并收集完整的流式响应，hedge 为 True 表示对冲的备份请求"""
+        collector = StreamCollector(on_reasoning, on_content)
+        if hedge:
+            # 备份请求绕过请求合并，否则会合并到仍在进行中的原请求上
+            chunks = self._stream_upstream(prompt, self.backend.resolve_model(model), system_prompt, timeout, params)
+        else:
+            chunks = self.stream(prompt, model, system_prompt, timeout=timeout, **params)
+        async for chunk in chunks:
+            collector.feed(chunk)
+        collector.finish()
+        return collector
+
+    async def aclose(self):
+        await self._http_client.aclose()
+
+
+class SyncLLMClient:
+    """
+    AsyncLLMClient 的同步门面
+
+    在后台线程中运行一个常驻事件循环，所有同步调用都提交到这个循环执行，
+    因此多个线程共享同一个连接池和同一套限流配额。
+    """
+
+    def __init__(self, **kwargs):
+        """参数与 AsyncLLMClient 相同"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client-loop", daemon=True)
+        self._thread.start()
+        self.client: AsyncLLMClient = self._run(self._create(kwargs))
+
+    @staticmethod
+    async def _create(kwargs) -> AsyncLLMClient:
+        # 在事件循环内创建，保证连接池和信号量都绑定在这个循环上
+        return AsyncLLMClient(**kwargs)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    @staticmethod
+    async def _next(iterator):
+        return await iterator.__anext__()
+
+    def stream(self, prompt: str, model: str = "qwq-32b", system_prompt: str = None, **params) -> Iterator:
+        """同步迭代流式响应块"""
+        iterator = self.client.stream(prompt, model, system_prompt, **params)
+        try:
+            while True:
+                try:
+                    yield self._run(self._next(iterator))
+                except StopAsyncIteration:
+                    break
+        finally:
+            self._run(iterator.aclose())
+
+    def chat(self, prompt: str, model: str = "qwq-32b", system_prompt: str = None, **params) -> Tuple:
+        """同步发送请求并返回(思考过程, 回复内容)，参数同 AsyncLLMClient.chat"""
+        return self._run(self.client.chat(prompt, model, system_prompt, **params))
+
+    def close(self):
+        self._run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,76 @@
+import os
+from typing import Dict, NamedTuple, Optional, Tuple
+
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+DEFAULT_API_KEY = "sk-c8464e16fdc844fd8ca1399062d3c1d7"
+# 阿里云百炼批处理接口支持的模型，qwq-32b 等只支持流式调用的模型不在其中
+DASHSCOPE_BATCH_MODELS = ("qwen-max", "qwen-plus", "qwen-turbo", "qwen-long")
+
+DEEPSEEK_BASE_URL = "https://maas-cn-southwest-2.modelarts-maas.com/deepseek-v3/v1"
+
+OLLAMA_BASE_URL = "http://127.0.0.1:11434/v1"
+MOCK_BASE_URL = "http://127.0.0.1:8765/v1"
+
+
+class Backend(NamedTuple):
+    """
+    OpenAI 兼容的大模型服务
+
+    passthrough 为 True 时直接使用调用方指定的模型名；为 False 时调用方写死的模型名（如 qwq-32b）
+    在该服务上不存在，统一替换为 default_model。batch_models 为服务上支持 OpenAI 兼容批处理接口（/v1/batches）的模型，
+    可由环境变量 LLM_BATCH_MODELS（逗号分隔）覆盖。
+    """
+    name: str
+    base_url: str
+    api_key: str
+    default_model: str
+    passthrough: bool = False
+    batch_models: Tuple[str, ...] = ()
+
+    def resolve_model(self, model: Optional[str]) -> str:
+        """得到实际发送给服务的模型名，环境变量 LLM_MODEL 优先"""
+        override = os.getenv("LLM_MODEL")
+        if override:
+            return override
+        if self.passthrough and model:
+            return model
+        return self.default_model
+
+    def supports_batch(self, model: Optional[str]) -> bool:
+        """实际使用的模型能否通过批处理接口调用"""
+        override = os.getenv("LLM_BATCH_MODELS")
+        batch_models = [m.strip() for m in override.split(",") if m.strip()] if override else self.batch_models
+        return self.resolve_model(model) in batch_models
+
+
+BACKENDS: Dict[str, Backend] = {
+    # 阿里云百炼，各工具原来使用的服务
+    "dashscope": Backend("dashscope", DASHSCOPE_BASE_URL,
+                         os.getenv("DASHSCOPE_API_KEY", DEFAULT_API_KEY), "qwq-32b", passthrough=True,
+                         batch_models=DASHSCOPE_BATCH_MODELS),
+    # 华为云 DeepSeek，密钥从环境变量 DEEPSEEK_API_KEY 读取
+    "deepseek": Backend("deepseek", DEEPSEEK_BASE_URL, os.getenv("DEEPSEEK_API_KEY", ""), "DeepSeek-V3"),
+    # 本地 Ollama 的 OpenAI 兼容接口
+    "ollama": Backend("ollama", os.getenv("OLLAMA_BASE_URL", OLLAMA_BASE_URL), "ollama", "deepseek-r1:8b"),
+    # 本地模拟服务（python -m tool.llm.MockServer），用于离线运行和吞吐量测试
+    "mock": Backend("mock", os.getenv("MOCK_LLM_BASE_URL", MOCK_BASE_URL), "mock", "mock", passthrough=True),
+}
+
+
+def register_backend(backend: Backend):
+    """注册或覆盖一个服务"""
+    BACKENDS[backend.name] = backend
+
+
+def get_backend(backend=None) -> Backend:
+    """
+    获取服务配置
+
+    :param backend: 服务名称或 Backend 实例，不提供时读取环境变量 LLM_BACKEND，默认 dashscope
+    """
+    if isinstance(backend, Backend):
+        return backend
+    name = (backend or os.getenv("LLM_BACKEND") or "dashscope").lower()
+    if name not in BACKENDS:
+        raise ValueError(f"未知的大模型服务: {name}，可选: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
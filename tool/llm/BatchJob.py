@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .SlidingWindowExecutor import SlidingWindowExecutor
+
+# 批处理任务的终止状态
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchJob:
+    """
+    离线批处理任务
+
+    把全部提示词写成 OpenAI 批处理格式的 JSONL 请求文件（每行一个 custom_id），提交给支持批处理接口的服务，
+    轮询直到任务结束，再按 custom_id 把输出合并回来并写入响应缓存。之后各工具照常逐条调用时全部命中缓存，
+    大批量任务不再和交互式请求争抢并发和限流配额。
+
+    服务或模型不支持批处理接口时（如本地 Ollama、模拟服务、只支持流式调用的 qwq-32b）使用本地替代实现：
+    在后台以较低的并发处理同一个请求文件，生成格式相同的输出文件。远程任务的编号保存在状态文件中，进程中断后以相同的请求重新运行会继续轮询原任务。
+    """
+
+    def __init__(self, client, folder: str = "批处理", poll_interval: float = 30, completion_window: str = "24h",
+                 local: Optional[bool] = None, local_concurrency: int = None):
+        """
+        :param client: AsyncLLMClient，提供服务配置、OpenAI 客户端和响应缓存
+        :param folder: 请求文件、输出文件和状态文件的保存目录
+        :param poll_interval: 轮询任务状态的间隔（秒）
+        :param completion_window: 批处理任务的完成时限
+        :param local: 是否使用本地替代实现，不提供时在首次运行时按服务是否支持该模型的批处理接口决定
+        :param local_concurrency: 本地替代实现的并发数，默认为客户端并发上限的四分之一，给交互式请求留出余量
+        """
+        self.client = client
+        self.folder = folder
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.local = local
+        self.local_concurrency = local_concurrency or max(1, client.concurrency // 4)
+        self._local_tasks: Dict[str, asyncio.Task] = {}
+
+        self.submitted = 0
+        self.cached = 0
+        self.succeeded = 0
+        self.failed = 0
+
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+    @staticmethod
+    def build_request(custom_id: str, model: str, messages) -> Dict[str, Any]:
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": model, "messages": messages},
+        }
+
+    def write_requests(self, path: str, prompts: Dict[str, str], model: str, system_prompt: str = None) -> str:
+        """写入请求文件，返回文件内容的哈希值"""
+        digest = hashlib.sha256()
+        with open(path, "w", encoding="utf-8") as f:
+            for custom_id, prompt in prompts.items():
+                messages = self.client.build_messages(prompt, system_prompt)
+                line = json.dumps(self.build_request(custom_id, model, messages), ensure_ascii=False) + "\n"
+                f.write(line)
+                digest.update(line.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def parse_output(record: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, str]]]:
+        """解析输出文件的一行，返回 (custom_id, {"reasoning", "answer"})，请求失败时结果为 None"""
+        custom_id = record.get("custom_id")
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            return custom_id, None
+        try:
+            message = response["body"]["choices"][0]["message"]
+        except (KeyError, IndexError, TypeError):
+            return custom_id, None
+        return custom_id, {"reasoning": message.get("reasoning_content") or "", "answer": message.get("content") or ""}
+
+    @classmethod
+    def read_outputs(cls, text: str) -> Dict[str, Optional[Dict[str, str]]]:
+        outputs = {}
+        for line in text.splitlines():
+            line = line.strip()
+            if line:
+                custom_id, result = cls.parse_output(json.loads(line))
+                outputs[custom_id] = result
+        return outputs
+
+    async def _run_local(self, input_path: str, output_path: str):
+        """本地替代实现：逐条调用服务处理请求文件，写出批处理格式的输出文件"""
+        with open(input_path, "r", encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+
+        async def worker(request):
+            messages = request["body"]["messages"]
+            system_prompt = next((m["content"] for m in messages if m["role"] == "system"), None)
+            return await self.client.chat(messages[-1]["content"], model=request["body"]["model"],
+                                          system_prompt=system_prompt)
+
+        executor = SlidingWindowExecutor(self.local_concurrency)
+        with open(output_path, "w", encoding="utf-8") as out:
+            async for request, result in executor.run(requests, worker):
+                if isinstance(result, Exception):
+                    record = {"custom_id": request["custom_id"], "response": None,
+                              "error": {"code": type(result).__name__, "message": str(result)}}
+                else:
+                    reasoning, answer = result
+                    message = {"role": "assistant", "content": answer, "reasoning_content": reasoning}
+                    record = {"custom_id": request["custom_id"], "error": None,
+                              "response": {"status_code": 200, "body": {"choices": [{"index": 0, "message": message}]}}}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def submit(self, input_path: str, output_path: str) -> str:
+        """提交请求文件，返回任务编号；本地替代实现把输出写到 output_path"""
+        if self.local:
+            batch_id = f"local-{int(time.time() * 1000)}"
+            self._local_tasks[batch_id] = asyncio.create_task(self._run_local(input_path, output_path))
+            return batch_id
+
+        uploaded = await self.client.client.files.create(file=Path(input_path), purpose="batch")
+        batch = await self.client.client.batches.create(input_file_id=uploaded.id, endpoint="/v1/chat/completions",
+                                                        completion_window=self.completion_window)
+        return batch.id
+
+    async def wait(self, batch_id: str, output_path: str) -> Optional[str]:
+        """轮询直到任务结束，输出文件保存到 output_path 并返回其内容，任务没有产生输出时返回 None"""
+        if batch_id in self._local_tasks:
+            await self._local_tasks.pop(batch_id)
+            with open(output_path, "r", encoding="utf-8") as f:
+                return f.read()
+
+        while True:
+            batch = await self.client.client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            if counts is not None:
+                logging.info(f"批处理任务 {batch_id} 状态: {batch.status}，已完成 {counts.completed}/{counts.total}，"
+                             f"失败 {counts.failed}")
+            if batch.status in FINAL_STATUSES:
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        if batch.status != "completed":
+            logging.warning(f"批处理任务 {batch_id} 结束状态为 {batch.status}")
+        if not batch.output_file_id:
+            return None
+        content = await self.client.client.files.content(batch.output_file_id)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(content.text)
+        return content.text
+
+    async def run(self, prompts: Dict[str, str], name: str = "batch", model: str = "qwq-32b",
+                  system_prompt: str = None) -> Dict[str, str]:
+        """
+        批量处理提示词
+
+        已在响应缓存中的提示词不再提交；批处理成功的结果写入响应缓存，键与逐条调用时相同。
+
+        :param prompts: {custom_id: 提示词}
+        :param name: 任务名称，用于请求、输出和状态文件的命名
+        :return: {custom_id: 回复内容}，只包含成功的请求，失败的请求由调用方按原方式逐条重试
+        """
+        if self.local is None:
+            self.local = not self.client.backend.supports_batch(model)
+        model = self.client.backend.resolve_model(model)
+        cache = self.client.cache
+        answers = {}
+        pending = {}
+        keys = {}
+        for custom_id, prompt in prompts.items():
+            if cache is not None:
+                keys[custom_id] = cache.make_key(model, system_prompt, prompt)
+                cached = cache.get(keys[custom_id])
+                if cached is not None:
+                    answers[custom_id] = cached["answer"]
+                    self.cached += 1
+                    continue
+            pending[custom_id] = prompt
+        if not pending:
+            return answers
+
+        input_path = os.path.join(self.folder, f"{name}_requests.jsonl")
+        output_path = os.path.join(self.folder, f"{name}_outputs.jsonl")
+        state_path = os.path.join(self.folder, f"{name}_batch.json")
+        digest = self.write_requests(input_path, pending, model, system_prompt)
+
+        # 相同请求文件的远程任务已提交过时继续轮询原任务
+        batch_id = None
+        if not self.local and os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("digest") == digest:
+                batch_id = state["id"]
+                logging.info(f"继续轮询已提交的批处理任务 {batch_id}")
+        if batch_id is None:
+            batch_id = await self.submit(input_path, output_path)
+            if not self.local:
+                with open(state_path, "w", encoding="utf-8") as f:
+                    json.dump({"id": batch_id, "digest": digest, "requests": len(pending),
+                               "submitted_at": time.strftime("%Y-%m-%d %H:%M:%S")}, f, ensure_ascii=False)
+            self.submitted += len(pending)
+            logging.info(f"已提交批处理任务 {batch_id}，共 {len(pending)} 个请求")
+
+        text = await self.wait(batch_id, output_path)
+        outputs = self.read_outputs(text) if text else {}
+        for custom_id in pending:
+            result = outputs.get(custom_id)
+            if result is None:
+                self.failed += 1
+                continue
+            self.succeeded += 1
+            answers[custom_id] = result["answer"]
+            if cache is not None:
+                cache.set(keys[custom_id], result)
+
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return answers
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "submitted": self.submitted,
+            "cached": self.cached,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        mode = "本地替代" if self.local else "批处理接口"
+        return (f"批处理统计({mode}): 提交{s['submitted']}个请求，缓存命中{s['cached']}个，"
+                f"成功{s['succeeded']}个，失败{s['failed']}个（失败的请求改为逐条调用）")
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from openai.types.chat import ChatCompletionChunk
+
+from .ResponseCache import ResponseCache
+
+MODES = ("record", "replay", "auto")
+
+
+class CassetteMissError(LookupError):
+    """回放模式下磁带中没有对应的录制"""
+
+
+class Cassette:
+    """
+    大模型请求的录制与回放
+
+    录制模式下把每个流式请求的全部响应块连同到达时间（相对发出请求的秒数）追加写入 JSONL 磁带文件，
+    键与响应缓存相同；回放模式下不访问网络，按录制的时间间隔（可按倍速缩放）在本地重新产出同样的响应块。
+    同一套提示词可以离线、可重复地运行整条流水线，只比较调度和 I/O 的差异，不受上游延迟波动影响。
+
+    auto 模式下已录制的请求回放，未录制的请求照常调用上游并录制。
+    """
+
+    def __init__(self, path: str, mode: str = "replay", speed: float = 1.0):
+        """
+        :param path: 磁带文件路径（JSONL）
+        :param mode: record（录制）、replay（回放）或 auto（有录制时回放，否则录制）
+        :param speed: 回放倍速，2 表示用一半的时间回放，0 表示不等待
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知的磁带模式: {mode}，可选: {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._tapes: Dict[str, Dict[str, Any]] = {}
+
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+
+        if mode == "record":
+            # 重新录制时覆盖旧的磁带
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            open(path, "w", encoding="utf-8").close()
+        elif os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        tape = json.loads(line)
+                        self._tapes[tape["key"]] = tape
+            logging.info(f"已加载磁带 {path}，共 {len(self._tapes)} 条录制")
+        elif mode == "replay":
+            raise FileNotFoundError(f"磁带文件不存在: {path}")
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """按环境变量 LLM_CASSETTE（磁带路径）、LLM_CASSETTE_MODE、LLM_CASSETTE_SPEED 创建，未设置路径时返回 None"""
+        path = os.getenv("LLM_CASSETTE")
+        if not path:
+            return None
+        return cls(path, os.getenv("LLM_CASSETTE_MODE", "replay"), float(os.getenv("LLM_CASSETTE_SPEED", 1)))
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], prompt: str, params: Dict[str, Any] = None) -> str:
+        return ResponseCache.make_key(model, system_prompt, prompt, params)
+
+    def has(self, key: str) -> bool:
+        return key in self._tapes
+
+    def should_replay(self, key: str) -> bool:
+        """该请求是否从磁带回放，回放模式下没有录制时抛出 CassetteMissError"""
+        if self.mode == "record":
+            return False
+        if self.has(key):
+            return True
+        if self.mode == "replay":
+            self.missed += 1
+            raise CassetteMissError(f"磁带中没有该请求的录制: {key[:12]}")
+        return False
+
+    async def replay(self, key: str) -> AsyncIterator[ChatCompletionChunk]:
+        """按录制的时间间隔产出响应块"""
+        tape = self._tapes[key]
+        started = time.perf_counter()
+        for offset, data in tape["chunks"]:
+            if self.speed > 0:
+                delay = offset / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield ChatCompletionChunk.model_validate(data)
+        self.replayed += 1
+
+    async def record(self, key: str, model: str, started: float,
+                     completion: AsyncIterator) -> AsyncIterator[ChatCompletionChunk]:
+        """
+        透传上游的响应块并记录，完整结束的请求才写入磁带
+
+        :param started: 发出请求时的 time.perf_counter()，首个响应块的时间包含首 token 延迟
+        """
+        chunks: List = []
+        async for chunk in completion:
+            chunks.append([round(time.perf_counter() - started, 4), chunk.model_dump(mode="json")])
+            yield chunk
+
+        tape = {"key": key, "model": model, "chunks": chunks}
+        line = json.dumps(tape, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._tapes[key] = tape
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "speed": self.speed,
+            "tapes": len(self._tapes),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "missed": self.missed,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (f"磁带统计({s['mode']}，{s['speed']}倍速): 共{s['tapes']}条录制，本次录制{s['recorded']}条，"
+                f"回放{s['replayed']}条，未找到{s['missed']}条")
@@ -0,0 +1,88 @@
+import os
+import json
+import logging
+from typing import Any, Dict, Hashable, Iterator, Tuple
+
+
+class CheckpointJournal:
+    """
+    只追加的断点续跑日志
+
+    每完成一条记录就以 JSON 行的形式追加写入并立即落盘，崩溃后最多丢失正在处理中的记录。
+    续跑时读取已有日志跳过已完成的记录，最终结果由日志一次性汇总生成，
+    取代每个批次把全部累计结果重写成一个新的中间文件的做法。
+    """
+
+    def __init__(self, path: str, resume: bool = False, fsync: bool = False):
+        """
+        :param path: 日志文件路径（JSONL）
+        :param resume: 是否从已有日志续跑，为 False 时清空旧日志重新开始
+        :param fsync: 每条记录是否强制同步到磁盘，默认只刷新文件缓冲
+        """
+        self.path = path
+        self.fsync = fsync
+        self.done: Dict[Hashable, Any] = {}
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, "a", encoding="utf-8")
+            # 补齐不完整的最后一行，避免新记录接在半行后面
+            if self._file.tell() > 0 and not self._ends_with_newline():
+                self._file.write("\n")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 崩溃时最后一行可能只写了一半，跳过即可，该记录会重新处理
+                    logging.warning(f"断点日志 {self.path} 第{line_no}行不完整，已跳过")
+                    continue
+                key = entry["id"]
+                self.done[tuple(key) if isinstance(key, list) else key] = entry["value"]
+        logging.info(f"从断点日志 {self.path} 恢复 {len(self.done)} 条已完成记录")
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.done
+
+    def __len__(self) -> int:
+        return len(self.done)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.done.get(key, default)
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        return iter(self.done.items())
+
+    def record(self, key: Hashable, value: Any):
+        """记录一条已完成的结果并立即落盘，value 需可 JSON 序列化"""
+        self.done[key] = value
+        self._file.write(json.dumps({"id": key, "value": value}, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
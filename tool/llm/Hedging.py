@@ -0,0 +1,150 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """最近若干次调用的延迟，按最近邻秩计算分位数"""
+
+    def __init__(self, window: int = 1000):
+        """
+        :param window: 保留的最近样本数，延迟分布随时间变化时只看最近的调用
+        """
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """分位数（q 取 0-100），没有样本时返回 None"""
+        if not self.samples:
+            return None
+        values = sorted(self.samples)
+        index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+        return values[index]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": len(self.samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class HedgePolicy:
+    """
+    对冲请求策略
+
+    调用耗时超过最近延迟的指定分位数后，再发一个相同的备份请求，取先成功的结果并取消另一个，
+    削减少数慢请求拖长的整体耗时。备份请求数受全局预算约束（不超过调用总数的一定比例），
+    样本数不足时不对冲，避免冷启动阶段按不可靠的分位数大量发出重复请求。
+    """
+
+    def __init__(self, percentile: float = 95, budget: float = 0.05, min_samples: int = 20,
+                 min_delay: float = 1.0, window: int = 1000):
+        """
+        :param percentile: 触发对冲的延迟分位数（0-100）
+        :param budget: 备份请求数占调用总数的比例上限
+        :param min_samples: 开始对冲前至少需要的延迟样本数
+        :param min_delay: 触发对冲的最短等待（秒），本来就很快的调用不对冲
+        :param window: 计算分位数使用的最近样本数
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.tracker = LatencyTracker(window)
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["HedgePolicy"]:
+        """按环境变量 LLM_HEDGE_PERCENTILE、LLM_HEDGE_BUDGET 创建，未设置分位数时返回 None（不对冲）"""
+        percentile = os.getenv("LLM_HEDGE_PERCENTILE")
+        if not percentile:
+            return None
+        return cls(float(percentile), float(os.getenv("LLM_HEDGE_BUDGET", 0.05)))
+
+    def trigger_delay(self) -> Optional[float]:
+        """当前的对冲等待时间，样本不足时返回 None"""
+        if len(self.tracker) < self.min_samples:
+            return None
+        return max(self.min_delay, self.tracker.percentile(self.percentile))
+
+    def _acquire(self) -> bool:
+        """申请一个备份请求名额"""
+        if self.hedged + 1 > self.budget * self.calls:
+            self.over_budget += 1
+            return False
+        self.hedged += 1
+        return True
+
+    async def run(self, attempt: Callable[[bool], Awaitable[T]]) -> T:
+        """
+        执行一次调用，超过等待时间后发出备份请求
+
+        :param attempt: attempt(hedge) 发起一次请求，hedge 为 True 表示备份请求
+        :return: 先成功的请求的结果，全部失败时抛出原请求的错误
+        """
+        self.calls += 1
+        started = time.perf_counter()
+        tasks: List[asyncio.Future] = [asyncio.ensure_future(attempt(False))]
+        try:
+            delay = self.trigger_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._acquire():
+                    logging.debug(f"请求超过 {delay:.1f} 秒未完成，发出备份请求")
+                    tasks.append(asyncio.ensure_future(attempt(True)))
+            winner = await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        if winner is not tasks[0]:
+            self.hedge_wins += 1
+        self.tracker.observe(time.perf_counter() - started)
+        return winner.result()
+
+    @staticmethod
+    async def _first_success(tasks: List[asyncio.Future]) -> asyncio.Future:
+        """等待最先成功的任务，全部失败时抛出第一个任务的错误"""
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task
+        raise tasks[0].exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "over_budget": self.over_budget,
+            "trigger_delay": self.trigger_delay(),
+            "latency": self.tracker.stats(),
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        latency = s["latency"]
+        percentiles = "，".join(f"{name} {latency[name]:.2f}秒" for name in ("p50", "p95", "p99")
+                                if latency[name] is not None) or "无样本"
+        return (f"对冲统计(p{self.percentile:g}触发，预算{self.budget:.0%}): 共{s['calls']}次调用，"
+                f"备份请求{s['hedged']}次，其中先完成{s['hedge_wins']}次，超出预算{s['over_budget']}次；"
+                f"延迟 {percentiles}")
@@ -0,0 +1,236 @@
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+class MockLLMServer:
+    """
+    本地模拟的 OpenAI 兼容大模型服务
+
+    只依赖标准库，提供 /v1/chat/completions（流式和非流式）和 /v1/models 接口。
+    回复内容可以按关键词预置，也可以传入自定义的生成函数；按设定的首 token 延迟、
+    生成速度和长尾延迟模拟真实服务的耗时，用于离线运行各个工具和测试流水线吞吐量。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765,
+                 replies: Dict[str, str] = None, default_reply: str = "解析地址失败",
+                 responder: Callable[[List[Dict], str], str] = None,
+                 reasoning: str = "", first_token_latency: float = 0.2, tokens_per_second: float = 50,
+                 tail_probability: float = 0.0, tail_latency: float = 0.0, chunk_size: int = 2):
+        """
+        :param replies: {关键词: 回复}，提示词包含关键词时返回对应回复
+        :param default_reply: 没有匹配的关键词时的回复
+        :param responder: 自定义生成函数，输入(messages, model)返回回复，优先于 replies
+        :param reasoning: 模拟的思考过程内容，以 reasoning_content 字段流式返回
+        :param first_token_latency: 首个 token 的延迟（秒）
+        :param tokens_per_second: 生成速度，0 表示不限速
+        :param tail_probability: 出现长尾延迟的概率
+        :param tail_latency: 长尾延迟额外增加的秒数
+        :param chunk_size: 每个流式块包含的字符数
+        """
+        self.host = host
+        self.port = port
+        self.replies = replies or {}
+        self.default_reply = default_reply
+        self.responder = responder
+        self.reasoning = reasoning
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.tail_probability = tail_probability
+        self.tail_latency = tail_latency
+        self.chunk_size = max(1, chunk_size)
+
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def reply_for(self, messages: List[Dict], model: str) -> str:
+        """根据请求内容生成回复"""
+        if self.responder is not None:
+            return self.responder(messages, model)
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        for keyword, reply in self.replies.items():
+            if keyword in prompt:
+                return reply
+        return self.default_reply
+
+    def first_token_delay(self) -> float:
+        delay = self.first_token_latency
+        if self.tail_probability and random.random() < self.tail_probability:
+            delay += self.tail_latency
+        return delay
+
+    def chunk_delay(self, text: str) -> float:
+        return len(text) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def split(self, text: str) -> List[str]:
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logging.debug("模拟服务: " + format % args)
+
+            def _send_json(self, status: int, payload: Dict):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _write_chunk(self, data: bytes):
+                # HTTP/1.1 分块传输，保持长连接可复用
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_event(self, payload):
+                data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+                self._write_chunk(f"data: {data}\n\n".encode("utf-8"))
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/v1/models":
+                    self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "invalid json"}})
+                    return
+
+                with server._lock:
+                    server.request_count += 1
+                    request_id = f"chatcmpl-mock-{server.request_count}"
+                model = request.get("model", "mock")
+                messages = request.get("messages", [])
+                reply = server.reply_for(messages, model)
+                usage = {
+                    "prompt_tokens": sum(len(str(m.get("content", ""))) for m in messages),
+                    "completion_tokens": len(server.reasoning) + len(reply),
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+                time.sleep(server.first_token_delay())
+                if not request.get("stream"):
+                    time.sleep(server.chunk_delay(server.reasoning + reply))
+                    self._send_json(200, {
+                        "id": request_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": reply,
+                                                 "reasoning_content": server.reasoning or None}}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def chunk(delta, finish_reason=None):
+                    return {"id": request_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                            "model": model,
+                            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+                try:
+                    for piece in server.split(server.reasoning):
+                        self._send_event(chunk({"role": "assistant", "content": "", "reasoning_content": piece}))
+                        time.sleep(server.chunk_delay(piece))
+                    for piece in server.split(reply):
+                        self._send_event(chunk({"role": "assistant", "content": piece}))
+                        time.sleep(server.chunk_delay(piece))
+                    self._send_event(chunk({}, "stop"))
+                    if (request.get("stream_options") or {}).get("include_usage"):
+                        self._send_event({"id": request_id, "object": "chat.completion.chunk",
+                                          "created": int(time.time()), "model": model, "choices": [], "usage": usage})
+                    self._send_event("[DONE]")
+                    self._write_chunk(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端提前断开（如超时取消），直接结束
+                    pass
+
+        return Handler
+
+    def start(self) -> "MockLLMServer":
+        """在后台线程启动服务"""
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        # 端口为0时由系统分配
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        logging.info(f"模拟大模型服务已启动: {self.base_url}")
+        return self
+
+    def serve_forever(self):
+        """在当前线程运行服务，直到中断"""
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self._server.serve_forever()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的 OpenAI 兼容大模型服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--replies", help="预置回复的 JSON 文件，格式为 {关键词: 回复}")
+    parser.add_argument("--default-reply", default="解析地址失败", help="没有匹配关键词时的回复")
+    parser.add_argument("--reasoning", default="", help="模拟的思考过程内容")
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="首个 token 的延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="生成速度，0 表示不限速")
+    parser.add_argument("--tail-probability", type=float, default=0.0, help="出现长尾延迟的概率")
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="长尾延迟额外增加的秒数")
+    args = parser.parse_args()
+
+    replies = None
+    if args.replies:
+        with open(args.replies, "r", encoding="utf-8") as f:
+            replies = json.load(f)
+
+    server = MockLLMServer(args.host, args.port, replies=replies, default_reply=args.default_reply,
+                           reasoning=args.reasoning, first_token_latency=args.first_token_latency,
+                           tokens_per_second=args.tokens_per_second, tail_probability=args.tail_probability,
+                           tail_latency=args.tail_latency)
+    print(f"模拟大模型服务: {server.base_url}（设置环境变量 LLM_BACKEND=mock 让各工具使用该服务）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import re
+import logging
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_WORD = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_NOISE = re.compile(r"[\s\W_]+")
+_DIGITS = re.compile(r"\d+")
+
+_encoders = {}
+
+
+def count_tokens(text: str, encoding: str = "cl100k_base") -> int:
+    """
+    本地估算文本的 token 数
+
+    安装了 tiktoken 时使用对应编码精确计数；否则按汉字每字1个、英文单词每4个字母1个、
+    数字每3位1个、其他符号每个1个估算，对中文为主的提示词略偏保守。
+    """
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if encoding not in _encoders:
+            _encoders[encoding] = tiktoken.get_encoding(encoding)
+        return len(_encoders[encoding].encode(text))
+
+    tokens = 0
+    for piece in _WORD.findall(text):
+        if _CJK.match(piece) or not piece.isalnum():
+            tokens += 1
+        elif piece.isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += (len(piece) + 3) // 4
+    return tokens
+
+
+class PromptBudget:
+    """
+    提示词预算
+
+    把带出现次数的条目列表渲染进提示词前，先在本地计算 token 数，超出预算时依次压缩，
+    每一步压缩后重新计算，满足预算即停止：
+    1. 合并规范化后相同的条目（全半角、空白和标点差异）
+    2. 用调用方提供的聚类函数合并近似条目，出现次数累加到代表条目（未提供时跳过）
+    3. 截断过长的条目
+    4. 按出现次数保留高频条目，省略低频尾部
+    未超出预算的提示词保持原样，不影响已有的缓存。
+    """
+
+    def __init__(self, max_tokens: int = 3000, cluster: Callable[[List[str]], List[Dict[str, Any]]] = None,
+                 max_item_chars: int = 40, encoding: str = "cl100k_base"):
+        """
+        :param max_tokens: 提示词的 token 预算
+        :param cluster: 近似条目的聚类函数，输入条目列表（按出现次数重复），返回包含 location（代表条目）和
+                        count（出现次数）的簇列表，如 LocationCluster().cluster；不提供时不合并近似条目
+        :param max_item_chars: 截断步骤中每个条目保留的最大字数
+        :param encoding: tiktoken 编码名称，未安装 tiktoken 时忽略
+        """
+        self.max_tokens = max_tokens
+        self.max_item_chars = max_item_chars
+        self.encoding = encoding
+        self.cluster = cluster
+        self.prompts = 0
+        self.compacted = 0
+        self.original_tokens = 0
+        self.final_tokens = 0
+        self.omitted_items = 0
+        self.steps: Counter = Counter()
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.encoding)
+
+    @staticmethod
+    def _merge_exact(items: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        """合并规范化后相同的条目，保留出现次数最多的写法"""
+        groups: Dict[str, List[Tuple[str, int]]] = {}
+        for text, count in items:
+            key = _NOISE.sub("", unicodedata.normalize("NFKC", text)).lower()
+            groups.setdefault(key or text, []).append((text, count))
+        merged = [(max(group, key=lambda x: (x[1], len(x[0])))[0], sum(c for _, c in group))
+                  for group in groups.values()]
+        return sorted(merged, key=lambda x: (x[1], len(x[0])), reverse=True)
+
+    def _merge_near(self, items: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        """合并近似条目；门牌号等数字不同的条目指向不同地点，只在数字相同的条目间合并"""
+        by_digits: Dict[Tuple[str, ...], List[str]] = {}
+        for text, count in items:
+            by_digits.setdefault(tuple(_DIGITS.findall(text)), []).extend([text] * count)
+        merged = [(c["location"], c["count"]) for group in by_digits.values() for c in self.cluster(group)]
+        return sorted(merged, key=lambda x: (x[1], len(x[0])), reverse=True)
+
+    def _truncate(self, items: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        return [(text[:self.max_item_chars], count) for text, count in items]
+
+    def fit(self, counts: Dict[str, int],
+            render: Callable[[List[Tuple[str, int]], int, int], str]) -> Tuple[str, List[Tuple[str, int]]]:
+        """
+        把条目渲染为不超过预算的提示词
+
+        :param counts: {条目: 出现次数}
+        :param render: render(条目列表, 省略条目数, 省略次数) -> 提示词，条目列表按出现次数从高到低排列
+        :return: (提示词, 实际写入提示词的条目列表)
+        """
+        # 稳定排序，次数相同的条目保持原有顺序，与 Counter.most_common 一致
+        items = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+        prompt = render(items, 0, 0)
+        tokens = self.count(prompt)
+        self.prompts += 1
+        self.original_tokens += tokens
+        if tokens <= self.max_tokens:
+            self.final_tokens += tokens
+            return prompt, items
+
+        self.compacted += 1
+        original = tokens
+        steps = [("exact", self._merge_exact), ("near", self._merge_near), ("truncate", self._truncate)]
+        if self.cluster is None:
+            # 没有聚类函数时不合并近似条目，也不计入压缩步骤
+            steps.pop(1)
+        for step, compact in steps:
+            items = compact(items)
+            prompt = render(items, 0, 0)
+            tokens = self.count(prompt)
+            self.steps[step] += 1
+            if tokens <= self.max_tokens:
+                break
+        else:
+            # 二分查找能放下的最多高频条目数，至少保留1个
+            total = sum(count for _, count in items)
+            low, high = 1, len(items)
+            while low < high:
+                middle = (low + high + 1) // 2
+                kept = items[:middle]
+                if self.count(render(kept, len(items) - middle, total - sum(c for _, c in kept))) <= self.max_tokens:
+                    low = middle
+                else:
+                    high = middle - 1
+            self.steps["top"] += 1
+            self.omitted_items += len(items) - low
+            kept = items[:low]
+            prompt = render(kept, len(items) - low, total - sum(c for _, c in kept))
+            tokens = self.count(prompt)
+            items = kept
+
+        logging.debug(f"提示词从 {original} token 压缩到 {tokens} token，保留 {len(items)} 个条目")
+        self.final_tokens += tokens
+        return prompt, items
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        saved = self.original_tokens - self.final_tokens
+        return {
+            "prompts": self.prompts,
+            "compacted": self.compacted,
+            "original_tokens": self.original_tokens,
+            "final_tokens": self.final_tokens,
+            "saved_tokens": saved,
+            "saved_ratio": saved / self.original_tokens if self.original_tokens else 0.0,
+            "omitted_items": self.omitted_items,
+            "steps": dict(self.steps),
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        counter = "tiktoken" if tiktoken is not None else "本地估算"
+        return (f"提示词预算统计({counter}): 共{s['prompts']}个提示词，超出预算{s['compacted']}个，"
+                f"token {s['original_tokens']} → {s['final_tokens']}，节省{s['saved_tokens']}"
+                f"（{s['saved_ratio']:.1%}），省略低频条目{s['omitted_items']}个")
@@ -0,0 +1,217 @@
+import re
+import json
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from .SlidingWindowExecutor import SlidingWindowExecutor
+
+Record = Tuple[Hashable, str]
+
+
+class PromptPacker:
+    """
+    多记录打包请求
+
+    把 K 条记录编号后放进同一个提示词，要求模型返回以编号为键的 JSON 数组，校验后映射回各条记录。
+    整包解析失败时对半拆分重试，只缺少部分记录时把缺少的记录重新打包，拆到单条仍失败的记录返回失败值。
+    每条记录单独请求时，固定的提示词开销和推理模型的思考过程占了大部分耗时，打包后这部分开销按 K 条分摊。
+    """
+
+    def __init__(self, instruction: str, pack_size: int = 10, field: str = "result",
+                 failure_value: str = "解析地址失败"):
+        """
+        :param instruction: 任务说明，说明对单条记录要做什么
+        :param pack_size: 每个请求打包的记录数
+        :param field: 返回的 JSON 对象中存放结果的字段名
+        :param failure_value: 无法得到结果的记录返回的值
+        """
+        self.instruction = instruction
+        self.pack_size = max(1, pack_size)
+        self.field = field
+        self.failure_value = failure_value
+
+        self.requests = 0
+        self.records = 0
+        self.splits = 0
+        self.failures = 0
+        self.request_seconds = 0.0
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def build_prompt(self, texts: Sequence[str]) -> str:
+        """把一组文本编号后拼成一个提示词，编号从1开始"""
+        # 记录内的换行压成空格，保证每条记录占一行
+        lines = [f"[{n}] {' '.join(str(text).split())}" for n, text in enumerate(texts, 1)]
+        return f"""{self.instruction.strip()}
+
+下面共有 {len(texts)} 条记录，请逐条按上述要求处理：
+{chr(10).join(lines)}
+
+输出要求：
+只输出一个 JSON 数组，不要任何解释或 Markdown 代码块。数组中每条记录对应一个对象，格式为
+{{"id": 记录编号, "{self.field}": "处理结果"}}
+必须包含全部 {len(texts)} 条记录，id 与上面方括号中的编号一致。
+"""
+
+    def parse(self, answer: str, count: int) -> Dict[int, str]:
+        """
+        解析模型返回的 JSON 数组
+
+        :param answer: 模型回复
+        :param count: 本包的记录数
+        :return: {记录编号(从1开始): 结果}，只包含校验通过的记录
+        """
+        if not answer:
+            return {}
+        # 去掉可能的代码块标记，截取最外层的数组
+        text = re.sub(r"```(?:json)?", "", answer)
+        start, end = text.find("["), text.rfind("]")
+        if start == -1 or end <= start:
+            return {}
+        try:
+            items = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(items, list):
+            return {}
+
+        parsed = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                n = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            value = item.get(self.field)
+            if 1 <= n <= count and isinstance(value, str) and value.strip() and n not in parsed:
+                parsed[n] = value.strip()
+        return parsed
+
+    def _packs(self, records: Sequence[Record]) -> List[List[Record]]:
+        return [list(records[i:i + self.pack_size]) for i in range(0, len(records), self.pack_size)]
+
+    def _settle(self, pack: List[Record], answer: Optional[str]) -> Tuple[Dict[Hashable, str], List[List[Record]]]:
+        """
+        根据一次请求的结果确定已完成的记录和需要重试的子包
+
+        :return: (已完成的 {记录键: 结果}, 需要重试的子包列表)
+        """
+        parsed = self.parse(answer, len(pack)) if answer is not None else {}
+        done = {pack[n - 1][0]: value for n, value in parsed.items()}
+        missing = [record for n, record in enumerate(pack, 1) if n not in parsed]
+        if not missing:
+            return done, []
+
+        if len(missing) < len(pack):
+            # 部分缺失：缺少的记录重新打包
+            return done, [missing]
+        if len(pack) == 1:
+            # 单条仍失败，不再重试
+            self.failures += 1
+            logging.warning(f"记录 {pack[0][0]} 打包请求失败，返回失败值")
+            return {pack[0][0]: self.failure_value}, []
+        # 整包失败：对半拆分，缩小问题记录的影响范围
+        self.splits += 1
+        middle = len(pack) // 2
+        return done, [pack[:middle], pack[middle:]]
+
+    async def _run_pack_async(self, pack: List[Record], chat: Callable[[str], Awaitable[str]]) -> Dict[Hashable, str]:
+        answer = None
+        started = time.perf_counter()
+        try:
+            answer = await chat(self.build_prompt([text for _, text in pack]))
+        except Exception as e:
+            logging.warning(f"打包请求出错（{len(pack)}条记录）: {e}")
+        finally:
+            self.requests += 1
+            self.request_seconds += time.perf_counter() - started
+
+        done, retries = self._settle(pack, answer)
+        if retries:
+            for sub_result in await asyncio.gather(*(self._run_pack_async(sub, chat) for sub in retries)):
+                done.update(sub_result)
+        return done
+
+    def _run_pack(self, pack: List[Record], chat: Callable[[str], str]) -> Dict[Hashable, str]:
+        answer = None
+        started = time.perf_counter()
+        try:
+            answer = chat(self.build_prompt([text for _, text in pack]))
+        except Exception as e:
+            logging.warning(f"打包请求出错（{len(pack)}条记录）: {e}")
+        finally:
+            self.requests += 1
+            self.request_seconds += time.perf_counter() - started
+
+        done, retries = self._settle(pack, answer)
+        for sub in retries:
+            done.update(self._run_pack(sub, chat))
+        return done
+
+    async def iter_async(self, records: Sequence[Record], chat: Callable[[str], Awaitable[str]],
+                         concurrency: int = 20) -> AsyncIterator[Tuple[Hashable, str]]:
+        """
+        异步处理全部记录，按包的完成顺序逐条产出结果
+
+        :param records: (记录键, 文本) 列表
+        :param chat: 发送提示词并返回回复内容的协程函数
+        :param concurrency: 同时在途的包数
+        :return: 异步迭代 (记录键, 结果)
+        """
+        records = list(records)
+        self.records += len(records)
+        self._started = self._started or time.perf_counter()
+        executor = SlidingWindowExecutor(concurrency)
+        async for pack, result in executor.run(self._packs(records), lambda p: self._run_pack_async(p, chat)):
+            if isinstance(result, Exception):
+                logging.warning(f"打包任务出错: {result}")
+                result = {key: self.failure_value for key, _ in pack}
+            for key, _ in pack:
+                yield key, result.get(key, self.failure_value)
+        self._finished = time.perf_counter()
+
+    async def run_async(self, records: Sequence[Record], chat: Callable[[str], Awaitable[str]],
+                        concurrency: int = 20) -> Dict[Hashable, str]:
+        """异步处理全部记录，返回 {记录键: 结果}"""
+        return {key: value async for key, value in self.iter_async(records, chat, concurrency)}
+
+    def iter(self, records: Sequence[Record], chat: Callable[[str], str]) -> Iterator[Tuple[Hashable, str]]:
+        """同步逐包处理全部记录，逐条产出 (记录键, 结果)"""
+        records = list(records)
+        self.records += len(records)
+        self._started = self._started or time.perf_counter()
+        for pack in self._packs(records):
+            result = self._run_pack(pack, chat)
+            for key, _ in pack:
+                yield key, result.get(key, self.failure_value)
+        self._finished = time.perf_counter()
+
+    def run(self, records: Sequence[Record], chat: Callable[[str], str]) -> Dict[Hashable, str]:
+        """同步处理全部记录，返回 {记录键: 结果}"""
+        return dict(self.iter(records, chat))
+
+    def stats(self) -> Dict[str, Any]:
+        """请求数和耗时统计"""
+        elapsed = (self._finished or time.perf_counter()) - self._started if self._started else 0.0
+        return {
+            "records": self.records,
+            "requests": self.requests,
+            "saved_requests": self.records - self.requests,
+            "request_reduction": 1 - self.requests / self.records if self.records else 0.0,
+            "splits": self.splits,
+            "failures": self.failures,
+            "avg_request_seconds": self.request_seconds / self.requests if self.requests else 0.0,
+            "seconds_per_record": elapsed / self.records if self.records else 0.0,
+            "elapsed": elapsed,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (f"打包请求统计: {s['records']}条记录共发送{s['requests']}次请求"
+                f"（逐条请求需{s['records']}次，减少{s['request_reduction']:.1%}），"
+                f"拆分重试{s['splits']}次，失败{s['failures']}条；"
+                f"平均每次请求{s['avg_request_seconds']:.2f}秒，"
+                f"平均每条记录{s['seconds_per_record']:.2f}秒，总耗时{s['elapsed']:.1f}秒")
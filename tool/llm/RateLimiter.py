@@ -0,0 +1,46 @@
+import time
+import asyncio
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+
+    按每分钟的配额匀速补充令牌，桶容量默认为一分钟的配额。acquire 在令牌不足时异步等待，
+    consume 用于事后扣除实际用量（允许透支，透支部分由后续请求等待补足）。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        """
+        :param rate_per_minute: 每分钟补充的令牌数
+        :param capacity: 桶容量，默认等于每分钟配额
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1):
+        """获取指定数量的令牌，不足时等待"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # 单次请求超过桶容量时按桶容量计，否则永远无法满足
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def consume(self, amount: float):
+        """直接扣除令牌，不等待"""
+        self._refill()
+        self.tokens -= amount
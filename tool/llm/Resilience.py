@@ -0,0 +1,175 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import httpx
+import openai
+
+# 可重试的 HTTP 状态码：请求超时、冲突、限流和服务端错误
+RETRYABLE_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 4))
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发送"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"上游服务暂不可用，熔断中，{retry_after:.1f}秒后重试")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败达到阈值后打开，打开期间所有请求立即失败、不再发往上游；冷却时间过后进入半开状态，
+    只放行一个探测请求，成功则关闭，失败则重新打开。只统计可重试的失败（超时、限流、5xx 等），
+    参数错误之类的失败说明上游本身正常，不计入。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        :param failure_threshold: 打开熔断的连续失败次数
+        :param reset_timeout: 打开后的冷却时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def remaining(self) -> float:
+        """打开状态下距离可以探测的剩余秒数"""
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self):
+        """发送请求前检查，不允许发送时抛出 CircuitOpenError"""
+        if self.state == self.OPEN:
+            if self.remaining() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.remaining())
+            self.state = self.HALF_OPEN
+            logging.info("熔断冷却结束，放行探测请求")
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(min(1.0, self.reset_timeout))
+            self._probing = True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logging.info("探测请求成功，熔断关闭")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+                logging.warning(f"上游连续失败{self.failures}次，熔断{self.reset_timeout}秒")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        """请求被取消、没有结果时释放探测名额"""
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    可重试的错误（连接错误、超时、限流、5xx）按带随机抖动的指数退避重试，限流响应带 Retry-After 时按其等待；
+    熔断打开时等到冷却结束再重试（wait_on_open 为 False 时立即失败，适合交互式请求）。
+    按错误类型分别统计重试次数和放弃次数。
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = 1.0, max_delay: float = 60.0,
+                 wait_on_open: bool = True, max_circuit_waits: int = 10):
+        """
+        :param max_attempts: 最多尝试次数（含第一次）
+        :param base_delay: 第一次重试前的基础等待（秒），之后每次翻倍
+        :param max_delay: 单次等待的上限（秒）
+        :param wait_on_open: 熔断打开时是否等待冷却后重试
+        :param max_circuit_waits: 最多等待熔断冷却的次数，不计入 max_attempts
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.wait_on_open = wait_on_open
+        self.max_circuit_waits = max_circuit_waits
+        self.retries: Dict[str, int] = defaultdict(int)
+        self.gave_up: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def is_upstream_failure(error: BaseException) -> bool:
+        """是否为上游不健康导致的失败（计入熔断）"""
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, asyncio.TimeoutError,
+                              httpx.TransportError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in RETRYABLE_STATUSES
+        return False
+
+    def is_retryable(self, error: BaseException) -> bool:
+        if isinstance(error, CircuitOpenError):
+            return self.wait_on_open
+        return self.is_upstream_failure(error)
+
+    @staticmethod
+    def retry_after(error: BaseException) -> Optional[float]:
+        """从错误中读取服务端要求的等待时间"""
+        if isinstance(error, CircuitOpenError):
+            return error.retry_after
+        response = getattr(error, "response", None)
+        value = response.headers.get("retry-after") if response is not None else None
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        """第 attempt 次重试（从0开始）前的等待秒数"""
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            # 加少量抖动，避免冷却结束时所有等待的请求同时涌向上游
+            return min(self.max_delay, retry_after + random.uniform(0, self.base_delay))
+        # 完全抖动：在 [0, base * 2^attempt] 内随机
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def record_retry(self, error: BaseException):
+        self.retries[type(error).__name__] += 1
+
+    def record_give_up(self, error: BaseException):
+        self.gave_up[type(error).__name__] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"retries": dict(self.retries), "gave_up": dict(self.gave_up)}
+
+    def report(self) -> str:
+        retries = "，".join(f"{k} {v}次" for k, v in self.retries.items()) or "无"
+        gave_up = "，".join(f"{k} {v}次" for k, v in self.gave_up.items()) or "无"
+        return f"重试统计: 重试 {retries}；放弃 {gave_up}"
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    """
+    大模型响应缓存
+
+    以 (model, system_prompt, prompt, 参数) 为键，内存中保留一个 LRU 层，磁盘上用 SQLite 持久化，
+    两层都按 TTL 过期。相同的提示词重复运行时直接返回缓存结果，不再发起请求。
+    """
+
+    # LLM_CACHE_PATH 可指定其他缓存文件，设为 :memory: 时只在本次运行内缓存（如回放磁带做基准测试时）
+    DEFAULT_PATH = os.getenv("LLM_CACHE_PATH") or os.path.join("缓存", "llm_cache.sqlite3")
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATH, ttl: float = 7 * 24 * 3600, max_memory_items: int = 1024):
+        """
+        :param path: SQLite 缓存文件路径，为 None 时只使用内存缓存
+        :param ttl: 缓存有效期（秒），为 None 时永不过期
+        :param max_memory_items: 内存 LRU 层最多保留的条目数
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], prompt: str, params: Dict[str, Any] = None) -> str:
+        """根据请求内容生成缓存键"""
+        payload = json.dumps([model, system_prompt, prompt, params or {}], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        """查询缓存，未命中或已过期返回 None"""
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                value, created = item
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, created = json.loads(row[0]), row[1]
+                    if not self._expired(created):
+                        self._remember(key, value, created)
+                        self.disk_hits += 1
+                        return value
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        """写入缓存，value 需要可以序列化为 JSON"""
+        created = time.time()
+        with self._lock:
+            self._remember(key, value, created)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), created)
+                )
+                self._conn.commit()
+
+    def _remember(self, key: str, value: Any, created: float):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+    def report(self) -> str:
+        """返回本次运行的缓存命中统计"""
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (f"缓存命中率: {self.hit_rate * 100:.2f}% (共{total}次查询，内存命中{self.memory_hits}次，"
+                f"磁盘命中{self.disk_hits}次，未命中{self.misses}次)")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,116 @@
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+
+class _Flight:
+    """一次正在进行中的上游请求，缓存已收到的响应块供所有订阅者读取"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.condition = asyncio.Condition()
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class SingleFlight:
+    """
+    进行中请求合并
+
+    相同的请求（模型、系统提示词、提示词和参数都相同）同时到达时只向上游发起一次流式请求，
+    后到的请求订阅同一个响应流，从第一个响应块开始依次收到全部内容。请求结束后立即移除，
+    不缓存结果；所有订阅者都取消时上游请求也随之取消。
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], prompt: str, params: Dict[str, Any] = None) -> str:
+        """根据请求内容生成合并键"""
+        payload = json.dumps([model, system_prompt, prompt, params or {}], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def _pump(self, key: str, flight: _Flight, iterator: AsyncIterator):
+        """读取上游响应流并通知所有订阅者"""
+        try:
+            async for chunk in iterator:
+                async with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.condition.notify_all()
+        except asyncio.CancelledError:
+            # 通知订阅者后继续向上传播取消，任务状态保持为已取消
+            flight.error = ConnectionAbortedError("上游请求已取消")
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """
+        订阅一个请求的响应流，没有相同的请求在进行时调用 factory 发起上游请求
+
+        :param key: 合并键
+        :param factory: 返回上游异步迭代器的函数，只在需要发起新请求时调用
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            self.upstream_calls += 1
+            flight.task = asyncio.create_task(self._pump(key, flight, factory()))
+        else:
+            self.coalesced_calls += 1
+            logging.debug(f"合并进行中的相同请求 {key[:8]}，当前订阅数 {flight.subscribers + 1}")
+        flight.subscribers += 1
+
+        index = 0
+        try:
+            while True:
+                async with flight.condition:
+                    await flight.condition.wait_for(lambda: index < len(flight.chunks) or flight.done)
+                    pending = flight.chunks[index:]
+                    finished = flight.done and index + len(pending) >= len(flight.chunks)
+                index += len(pending)
+                for chunk in pending:
+                    yield chunk
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # 没有订阅者了，取消上游请求；先移除，避免新请求加入一个正在取消的请求
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.upstream_calls + self.coalesced_calls
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "saved_ratio": self.coalesced_calls / total if total else 0.0,
+            "in_flight": self.in_flight,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (f"请求合并统计: 上游请求{s['upstream_calls']}次，合并{s['coalesced_calls']}次"
+                f"（节省{s['saved_ratio']:.1%}），进行中{s['in_flight']}个")
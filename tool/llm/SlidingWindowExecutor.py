@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Tuple
+
+
+class SlidingWindowExecutor:
+    """
+    滑动窗口任务执行器
+
+    固定数量的工作协程从同一个任务队列中取任务，任何一个请求完成后立即补上下一个，
+    始终保持 concurrency 个请求在途，并按完成顺序流式返回结果。
+    与按固定批次 gather 相比，慢请求不会拖住同批次的其他空位。
+    """
+
+    def __init__(self, concurrency: int = 20):
+        self.concurrency = max(1, concurrency)
+
+    async def run(self, items: Iterable, worker: Callable[[Any], Awaitable]) -> AsyncIterator[Tuple[Any, Any]]:
+        """
+        执行任务并按完成顺序产出结果
+
+        :param items: 任务参数序列，按顺序派发
+        :param worker: 处理单个任务的协程函数
+        :return: 异步迭代 (任务参数, 结果)，任务抛出的异常会作为结果返回而不是中断执行
+        """
+        iterator = iter(items)
+        results: asyncio.Queue = asyncio.Queue()
+        finished = object()
+
+        async def consume():
+            # 所有工作协程共享同一个迭代器，谁空闲谁取下一个任务
+            for item in iterator:
+                try:
+                    result = await worker(item)
+                except Exception as e:
+                    result = e
+                await results.put((item, result))
+
+        async def watch(tasks):
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await results.put(finished)
+
+        tasks = [asyncio.create_task(consume()) for _ in range(self.concurrency)]
+        watcher = asyncio.create_task(watch(tasks))
+        try:
+            while True:
+                entry = await results.get()
+                if entry is finished:
+                    break
+                yield entry
+        finally:
+            # 调用方提前退出时取消仍在进行的任务
+            for task in tasks:
+                task.cancel()
+            watcher.cancel()
@@ -0,0 +1,91 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class StreamCollector:
+    """
+    流式响应收集器
+
+    把响应块中的思考过程和回复内容追加到列表，结束时一次性拼接，避免逐块字符串拼接的二次复杂度；
+    每个增量可以通过回调交给调用方处理（如实时显示）。同时记录首 token 时间、首个回复 token 时间、
+    生成速度和 token 用量。
+    """
+
+    def __init__(self, on_reasoning: Callable[[str], Any] = None, on_content: Callable[[str], Any] = None):
+        """
+        :param on_reasoning: 收到思考过程增量时的回调
+        :param on_content: 收到回复内容增量时的回调
+        """
+        self.on_reasoning = on_reasoning
+        self.on_content = on_content
+        self._reasoning: List[str] = []
+        self._content: List[str] = []
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.first_answer_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.chunks = 0
+        self.usage: Optional[Dict[str, int]] = None
+
+    def feed(self, chunk):
+        """处理一个响应块"""
+        usage = getattr(chunk, "usage", None)
+        if usage is not None:
+            self.usage = {
+                "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                "completion_tokens": getattr(usage, "completion_tokens", None),
+                "total_tokens": getattr(usage, "total_tokens", None),
+            }
+        if not chunk.choices:
+            return
+
+        delta = chunk.choices[0].delta
+        reasoning = getattr(delta, "reasoning_content", None)
+        content = delta.content
+        if not reasoning and not content:
+            return
+
+        now = time.perf_counter()
+        self.chunks += 1
+        if self.first_token_at is None:
+            self.first_token_at = now
+        if reasoning:
+            self._reasoning.append(reasoning)
+            if self.on_reasoning is not None:
+                self.on_reasoning(reasoning)
+        if content:
+            if self.first_answer_at is None:
+                self.first_answer_at = now
+            self._content.append(content)
+            if self.on_content is not None:
+                self.on_content(content)
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def reasoning(self) -> str:
+        return "".join(self._reasoning)
+
+    @property
+    def answer(self) -> str:
+        return "".join(self._content)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        计时指标（秒）
+
+        ttft: 首个 token（含思考过程）的到达时间；ttfa: 首个回复 token 的到达时间；
+        tokens_per_second: 从首个 token 到结束的生成速度，没有用量信息时按响应块数估算
+        """
+        finished = self.finished_at or time.perf_counter()
+        completion_tokens = (self.usage or {}).get("completion_tokens") or self.chunks
+        generation = finished - self.first_token_at if self.first_token_at is not None else 0.0
+        return {
+            "ttft": self.first_token_at - self.started if self.first_token_at is not None else None,
+            "ttfa": self.first_answer_at - self.started if self.first_answer_at is not None else None,
+            "total_seconds": finished - self.started,
+            "tokens_per_second": completion_tokens / generation if generation > 0 else None,
+            "chunks": self.chunks,
+            "usage": self.usage,
+        }
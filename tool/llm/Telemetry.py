@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# 延迟直方图的桶边界（秒），覆盖从短回复到长思考过程的范围
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+class Histogram:
+    """固定桶边界的直方图，按 Prometheus 的累计桶格式输出"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶内线性插值估算分位数（q取0-1）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class CallRecord:
+    """一次上游调用的观测记录，由 Telemetry.track 创建"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.usage: Optional[Any] = None
+        self.reasoning_chars = 0
+
+    def observe(self, chunk):
+        """记录一个响应块"""
+        usage = getattr(chunk, "usage", None)
+        if usage is not None:
+            self.usage = usage
+        if not chunk.choices:
+            return
+        delta = chunk.choices[0].delta
+        reasoning = getattr(delta, "reasoning_content", None)
+        if (reasoning or delta.content) and self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        if reasoning:
+            self.reasoning_chars += len(reasoning)
+
+    def tokens(self) -> Dict[str, int]:
+        """prompt/completion/reasoning token 数，接口没有返回思考 token 数时按思考内容字数估算"""
+        usage = self.usage
+        details = getattr(usage, "completion_tokens_details", None)
+        reasoning = getattr(details, "reasoning_tokens", None) if details is not None else None
+        return {
+            "prompt": getattr(usage, "prompt_tokens", None) or 0,
+            "completion": getattr(usage, "completion_tokens", None) or 0,
+            "reasoning": reasoning if reasoning is not None else self.reasoning_chars,
+        }
+
+
+class _Tracker:
+    """同步/异步两用的上下文管理器，进入时增加进行中计数，退出时记录结果"""
+
+    def __init__(self, telemetry: "Telemetry", model: str):
+        self.telemetry = telemetry
+        self.record = CallRecord(model)
+
+    def __enter__(self) -> CallRecord:
+        self.telemetry._begin()
+        return self.record
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.telemetry._finish(self.record, exc_type)
+        return False
+
+
+class Telemetry:
+    """
+    大模型调用遥测
+
+    在客户端内记录每次上游调用的总延迟、首 token 时间、prompt/completion/思考 token 数、
+    按类型统计的错误数以及进行中的请求数，可输出 Prometheus 文本格式，也可写成运行摘要 JSON。
+    """
+
+    _default: Optional["Telemetry"] = None
+
+    def __init__(self, prices: Dict[str, Tuple[float, float]] = None):
+        """
+        :param prices: {模型: (每千输入token价格, 每千输出token价格)}，用于估算费用，可选
+        """
+        self.prices = prices or {}
+        self.created = time.time()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.tokens: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.latency: Dict[str, Histogram] = {}
+        self.ttft: Dict[str, Histogram] = {}
+
+    @classmethod
+    def default(cls) -> "Telemetry":
+        """进程内共享的实例，客户端未指定时使用"""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def track(self, model: str) -> _Tracker:
+        """
+        跟踪一次调用
+
+        用法: with telemetry.track(model) as call: ... call.observe(chunk) ...
+        """
+        return _Tracker(self, model)
+
+    def _begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def _finish(self, record: CallRecord, exc_type):
+        elapsed = time.perf_counter() - record.started
+        if exc_type is None:
+            status = "success"
+        elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            status = "cancelled"
+        else:
+            status = "error"
+
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(record.model, status)] += 1
+            if status == "error":
+                self.errors[exc_type.__name__] += 1
+            if status != "success":
+                return
+            self.latency.setdefault(record.model, Histogram()).observe(elapsed)
+            if record.first_token_at is not None:
+                self.ttft.setdefault(record.model, Histogram()).observe(record.first_token_at - record.started)
+            for kind, count in record.tokens().items():
+                self.tokens[(record.model, kind)] += count
+
+    def estimated_cost(self) -> Optional[float]:
+        """按配置的单价估算费用，没有配置单价时返回 None"""
+        if not self.prices:
+            return None
+        cost = 0.0
+        for (model, kind), count in self.tokens.items():
+            if model in self.prices and kind in ("prompt", "completion"):
+                input_price, output_price = self.prices[model]
+                cost += count / 1000 * (input_price if kind == "prompt" else output_price)
+        return cost
+
+    def summary(self) -> Dict[str, Any]:
+        """汇总统计"""
+        with self._lock:
+            models = sorted({model for model, _ in self.requests})
+            per_model = {}
+            for model in models:
+                latency = self.latency.get(model)
+                ttft = self.ttft.get(model)
+                per_model[model] = {
+                    "requests": {status: count for (m, status), count in self.requests.items() if m == model},
+                    "tokens": {kind: count for (m, kind), count in self.tokens.items() if m == model},
+                    "latency_seconds": {
+                        "sum": latency.sum if latency else 0.0,
+                        "p50": latency.quantile(0.5) if latency else None,
+                        "p95": latency.quantile(0.95) if latency else None,
+                        "p99": latency.quantile(0.99) if latency else None,
+                    },
+                    "ttft_seconds": {
+                        "p50": ttft.quantile(0.5) if ttft else None,
+                        "p95": ttft.quantile(0.95) if ttft else None,
+                    },
+                }
+            return {
+                "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created)),
+                "wall_seconds": time.time() - self.created,
+                "in_flight": self.in_flight,
+                "requests": sum(self.requests.values()),
+                "errors": dict(self.errors),
+                "models": per_model,
+                "estimated_cost": self.estimated_cost(),
+            }
+
+    def write_summary(self, path: str, extra: Dict[str, Any] = None) -> str:
+        """把运行摘要写成 JSON 文件，extra 中的内容一并写入"""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        summary = self.summary()
+        if extra:
+            summary.update(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+    def prometheus_text(self) -> str:
+        """按 Prometheus 文本格式输出全部指标"""
+        lines = []
+        with self._lock:
+            lines.append("# HELP llm_requests_total 上游调用次数")
+            lines.append("# TYPE llm_requests_total counter")
+            for (model, status), count in sorted(self.requests.items()):
+                lines.append(f"llm_requests_total{self._labels(model=model, status=status)} {count}")
+
+            lines.append("# HELP llm_tokens_total 消耗的 token 数")
+            lines.append("# TYPE llm_tokens_total counter")
+            for (model, kind), count in sorted(self.tokens.items()):
+                lines.append(f"llm_tokens_total{self._labels(model=model, type=kind)} {count}")
+
+            lines.append("# HELP llm_errors_total 按异常类型统计的错误数")
+            lines.append("# TYPE llm_errors_total counter")
+            for error_type, count in sorted(self.errors.items()):
+                lines.append(f"llm_errors_total{self._labels(type=error_type)} {count}")
+
+            lines.append("# HELP llm_in_flight_requests 进行中的上游调用数")
+            lines.append("# TYPE llm_in_flight_requests gauge")
+            lines.append(f"llm_in_flight_requests {self.in_flight}")
+
+            for name, help_text, histograms in (
+                    ("llm_request_duration_seconds", "上游调用总耗时", self.latency),
+                    ("llm_time_to_first_token_seconds", "首 token 到达时间", self.ttft)):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for model, histogram in sorted(histograms.items()):
+                    for bound, total in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{self._labels(model=model, le=le)} {total}")
+                    lines.append(f"{name}_sum{self._labels(model=model)} {histogram.sum}")
+                    lines.append(f"{name}_count{self._labels(model=model)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> str:
+        s = self.summary()
+        parts = [f"调用遥测: 共{s['requests']}次上游调用"]
+        for model, m in s["models"].items():
+            p50 = m["latency_seconds"]["p50"]
+            p95 = m["latency_seconds"]["p95"]
+            ttft = m["ttft_seconds"]["p50"]
+            tokens = m["tokens"]
+            parts.append(f"{model}: P50 {p50 or 0:.2f}秒/P95 {p95 or 0:.2f}秒，首token P50 {ttft or 0:.2f}秒，"
+                         f"输入{tokens.get('prompt', 0)}/输出{tokens.get('completion', 0)}"
+                         f"/思考{tokens.get('reasoning', 0)} token")
+        if s["errors"]:
+            parts.append("错误: " + "，".join(f"{k} {v}次" for k, v in s["errors"].items()))
+        if s["estimated_cost"] is not None:
+            parts.append(f"估算费用{s['estimated_cost']:.2f}元")
+        return "；".join(parts)
@@ -0,0 +1,152 @@
+import re
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 规则结果中出现这些标记说明取到的是基站名称而不是用户位置
+BASE_STATION_MARKERS = ["JJG", "NCH", "_", "基站", "弱电间", "室分", "PRB", "负荷"]
+# 结果中出现这些描述问题的词说明截取范围过长，混入了投诉描述
+COMPLAINT_WORDS = ["网络", "无法", "正常", "信号", "上网", "卡顿", "测试", "覆盖", "使用", "投诉"]
+# 用户实际位置常见的地点类型
+PLACE_SUFFIXES = ["宿舍", "公寓", "楼", "栋", "院", "校区", "小区", "大学", "学院", "财大", "财校", "科院", "学校",
+                  "工业园", "工业区", "集中区", "园区", "公司", "工厂", "化工", "路", "大道", "街", "号", "村", "镇",
+                  "广场", "中心", "园"]
+# 文本中描述用户所在位置的指示词
+USER_LOCATION_CUES = ["用户", "客户", "您投", "投诉"]
+
+
+class TieredExtractor:
+    """
+    规则优先、大模型兜底的分层提取流水线
+
+    每条文本先交给规则层（正则/关键词提取，耗时毫秒级），结果通过置信度检查即直接采用；
+    规则层没有结果或结果不可信时才交给大模型层，大模型调用只落在规则覆盖不到的长尾记录上。
+    分别统计每一层的命中率、耗时和大模型调用量。
+    """
+
+    def __init__(self, rule_extractor: Callable[[str], Optional[str]],
+                 llm_extractor: Optional[Callable[[str], Any]] = None,
+                 is_confident: Callable[[str, str], bool] = None,
+                 failure_value: str = "解析地址失败"):
+        """
+        :param rule_extractor: 规则提取函数，输入文本，返回提取结果或 None
+        :param llm_extractor: 大模型提取函数，可以是普通函数或协程函数，返回提取结果
+        :param is_confident: 置信度检查函数，输入(结果, 原文)，默认使用 looks_confident
+        :param failure_value: 提取失败时的返回值
+        """
+        self.rule_extractor = rule_extractor
+        self.llm_extractor = llm_extractor
+        self.is_confident = is_confident or self.looks_confident
+        self.failure_value = failure_value
+        self.metrics: Dict[str, Dict[str, float]] = {
+            tier: {"calls": 0, "hits": 0, "seconds": 0.0, "chars": 0} for tier in ("rule", "llm")
+        }
+
+    @staticmethod
+    def looks_confident(address: Optional[str], text: str) -> bool:
+        """默认的置信度检查：结果长度合理、不含基站标记和投诉描述、包含地点类型，且原文中有用户位置指示词"""
+        if not address:
+            return False
+        address = address.strip()
+        if not 4 <= len(address) <= 40:
+            return False
+        if any(marker in address for marker in BASE_STATION_MARKERS) or re.search(r"\d{6,}", address):
+            return False
+        if any(word in address for word in COMPLAINT_WORDS):
+            return False
+        if not any(suffix in address for suffix in PLACE_SUFFIXES):
+            return False
+        return any(cue in (text or "") for cue in USER_LOCATION_CUES)
+
+    def _record(self, tier: str, seconds: float, hit: bool, text: str):
+        metric = self.metrics[tier]
+        metric["calls"] += 1
+        metric["seconds"] += seconds
+        metric["chars"] += len(text)
+        if hit:
+            metric["hits"] += 1
+
+    def try_rules(self, text: str) -> Optional[str]:
+        """只执行规则层，结果可信时返回结果，否则返回 None"""
+        started = time.perf_counter()
+        try:
+            address = self.rule_extractor(text)
+        except Exception as e:
+            logging.warning(f"规则提取出错: {e}")
+            address = None
+        confident = self.is_confident(address, text)
+        self._record("rule", time.perf_counter() - started, confident, text)
+        return address.strip() if confident else None
+
+    def record_llm(self, text: str, address: Optional[str], seconds: float = 0.0):
+        """
+        记录一条在流水线外由大模型完成的提取（如打包请求、批处理），计入大模型层统计
+
+        :param seconds: 该条记录分摊的耗时
+        """
+        self._record("llm", seconds, self._llm_result(address) != self.failure_value, text)
+
+    def _llm_result(self, address: Optional[str]) -> str:
+        address = (address or "").strip()
+        return address or self.failure_value
+
+    def extract(self, text: str) -> Tuple[str, str]:
+        """
+        同步分层提取
+
+        :return: (提取结果, 命中的层级 rule/llm/none)
+        """
+        address = self.try_rules(text)
+        if address:
+            return address, "rule"
+        if self.llm_extractor is None:
+            return self.failure_value, "none"
+
+        started = time.perf_counter()
+        address = self._llm_result(self.llm_extractor(text))
+        self._record("llm", time.perf_counter() - started, address != self.failure_value, text)
+        return address, "llm"
+
+    async def extract_async(self, text: str) -> Tuple[str, str]:
+        """
+        异步分层提取，规则层在当前线程直接执行，大模型层 await 调用
+
+        :return: (提取结果, 命中的层级 rule/llm/none)
+        """
+        address = self.try_rules(text)
+        if address:
+            return address, "rule"
+        if self.llm_extractor is None:
+            return self.failure_value, "none"
+
+        started = time.perf_counter()
+        result = self.llm_extractor(text)
+        if asyncio.iscoroutine(result):
+            result = await result
+        address = self._llm_result(result)
+        self._record("llm", time.perf_counter() - started, address != self.failure_value, text)
+        return address, "llm"
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各层的调用数、命中数、命中率、总耗时和平均耗时"""
+        stats = {}
+        for tier, metric in self.metrics.items():
+            calls = metric["calls"]
+            stats[tier] = {
+                **metric,
+                "hit_rate": metric["hits"] / calls if calls else 0.0,
+                "avg_seconds": metric["seconds"] / calls if calls else 0.0,
+            }
+        return stats
+
+    def report(self) -> str:
+        s = self.stats()
+        rule, llm = s["rule"], s["llm"]
+        total = rule["calls"]
+        llm_share = llm["calls"] / total if total else 0.0
+        return (f"分层提取统计: 共{total}条文本；"
+                f"规则层命中{rule['hits']}条（{rule['hit_rate']:.1%}），平均{rule['avg_seconds'] * 1000:.2f}毫秒；"
+                f"大模型层调用{llm['calls']}次（占{llm_share:.1%}，约{llm['chars']}字输入），"
+                f"命中{llm['hits']}条（{llm['hit_rate']:.1%}），平均{llm['avg_seconds']:.2f}秒；"
+                f"节省大模型调用{rule['hits']}次")
@@ -0,0 +1,18 @@
+from .ResponseCache import ResponseCache
+from .RateLimiter import TokenBucket
+from .AsyncLLMClient import AsyncLLMClient, SyncLLMClient
+from .SlidingWindowExecutor import SlidingWindowExecutor
+from .CheckpointJournal import CheckpointJournal
+from .PromptPacker import PromptPacker
+from .TieredExtractor import TieredExtractor
+from .Backends import Backend, get_backend, register_backend
+from .MockServer import MockLLMServer
+from .StreamCollector import StreamCollector
+from .SingleFlight import SingleFlight
+from .Telemetry import Telemetry
+from .PromptBudget import PromptBudget, count_tokens
+from .BatchJob import BatchJob
+from .Resilience import RetryPolicy, CircuitBreaker, CircuitOpenError
+from .Cassette import Cassette, CassetteMissError
+from .Hedging import HedgePolicy, LatencyTracker
+from .LongestJobFirst import LongestJobFirst
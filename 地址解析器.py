@@ -1,16 +1,33 @@
 # coding=utf-8
 import polars as pl
 import os
+import argparse
 from aliyun_llm import AliyunLLM
-import time
+from tool.llm.ResponseCache import ResponseCache
+from tool.llm.PromptPacker import PromptPacker
 from datetime import datetime
 
+# 地址提取的任务说明和示例，逐条请求和打包请求共用
+ADDRESS_INSTRUCTION = """请从以下文本中提取地址信息。只需返回地址，不要包含任何其他内容。
+如果无法识别出地址，请只回复"解析地址失败"，不要有任何其他解释。
+"""
+
+ADDRESS_EXAMPLES = """例如：
+1. 如果文本是"答复口径：用户反映江西省南昌市西湖区丰和北大道与长春路交界处移动信号差"，则只返回"江西省南昌市西湖区丰和北大道与长春路交界处"
+2. 如果文本是"答复口径：中国移动南昌红谷滩10086营业厅用户反馈网络问题"，则只返回"南昌红谷滩"
+3. 如果文本是"投诉内容：南昌青山湖区政务中心无法办理业务"，则只返回"南昌青山湖区政务中心"
+
+请注意，我只需要提取出准确的地址信息，不需要额外的说明或解释。如果文本中包含多个地址，请提取最主要的一个地址。
+如果无法识别出任何地址，只返回"解析地址失败"四个字。
+"""
+
 class AddressExtractor:
     """投诉热点明细地址提取工具"""
     
     def __init__(self, api_key=None):
         """初始化地址提取器"""
-        self.llm = AliyunLLM(api_key=api_key)
+        self.cache = ResponseCache()
+        self.llm = AliyunLLM(api_key=api_key, cache=self.cache)
         self.results_folder = "地址解析结果"
         
         # 创建结果文件夹（如果不存在）
@@ -40,19 +57,10 @@ class AddressExtractor:
             return "解析地址失败"
             
         prompt = f"""
-请从以下文本中提取地址信息。只需返回地址，不要包含任何其他内容。
-如果无法识别出地址，请只回复"解析地址失败"，不要有任何其他解释。
-
+{ADDRESS_INSTRUCTION}
 文本: {text}
 
-例如：
-1. 如果文本是"答复口径：用户反映江西省南昌市西湖区丰和北大道与长春路交界处移动信号差"，则只返回"江西省南昌市西湖区丰和北大道与长春路交界处"
-2. 如果文本是"答复口径：中国移动南昌红谷滩10086营业厅用户反馈网络问题"，则只返回"南昌红谷滩"
-3. 如果文本是"投诉内容：南昌青山湖区政务中心无法办理业务"，则只返回"南昌青山湖区政务中心"
-
-请注意，我只需要提取出准确的地址信息，不需要额外的说明或解释。如果文本中包含多个地址，请提取最主要的一个地址。
-如果无法识别出任何地址，只返回"解析地址失败"四个字。
-"""
+{ADDRESS_EXAMPLES}"""
         # 使用大模型解析地址
         try:
             result = self.llm.chat_without_streaming_display(prompt)
@@ -61,8 +69,8 @@ class AddressExtractor:
             print(f"地址解析出错: {e}")
             return "解析地址失败"
     
-    def batch_extract_addresses(self, data, text_column, limit=None):
-        """批量提取地址"""
+    def batch_extract_addresses(self, data, text_column, limit=None, pack_size=1):
+        """批量提取地址，pack_size大于1时每个请求打包多条记录"""
         if data is None or len(data) == 0:
             print("没有数据可供分析")
             return
@@ -75,6 +83,9 @@ class AddressExtractor:
             print(f"已设置解析上限: {limit} 条")
             data = data.slice(0, limit)
         
+        if pack_size > 1:
+            return self._batch_extract_packed(data, text_column, pack_size)
+        
         # 创建结果列表
         results = []
         
@@ -107,9 +118,6 @@ class AddressExtractor:
                 # 每5条保存一次中间结果
                 if (i+1) % 5 == 0:
                     self._save_interim_results(results)
-                    
-                # 避免API请求过快
-                time.sleep(1)
                 
             except Exception as e:
                 print(f"解析第 {i+1} 条记录时出错: {e}")
@@ -119,8 +127,67 @@ class AddressExtractor:
         
         # 保存最终结果
         self._save_final_results(results)
+        print(self.cache.report())
+        self._save_run_summary(results)
         return results
     
+    def _batch_extract_packed(self, data, text_column, pack_size):
+        """打包模式批量提取地址，每个请求包含pack_size条记录"""
+        packer = PromptPacker(ADDRESS_INSTRUCTION + "\n" + ADDRESS_EXAMPLES, pack_size,
+                              field="address", failure_value="解析地址失败")
+        rows = list(data.iter_rows(named=True))
+        total = len(rows)
+        
+        # 空内容不发送请求
+        records = []
+        for i, row in enumerate(rows):
+            text = row.get(text_column, "")
+            if text is not None and str(text).strip() != "":
+                records.append((i, str(text)))
+        print(f"打包模式: 每个请求包含 {pack_size} 条记录，有效记录 {len(records)} 条")
+        
+        addresses = {}
+        for i, address in packer.iter(records, self.llm.chat_without_streaming_display):
+            addresses[i] = address
+            print(f"[{i+1}/{total}] 提取结果: {address}")
+        
+        results = []
+        for i, row in enumerate(rows):
+            result_row = {**row}
+            result_row["提取的地址"] = addresses.get(i, "解析地址失败")
+            results.append(result_row)
+        
+        # 保存最终结果
+        self._save_final_results(results)
+        print(packer.report())
+        print(self.cache.report())
+        self._save_run_summary(results, {"packing": packer.stats()})
+        return results
+    
+    def _save_run_summary(self, results, extra=None):
+        """保存运行摘要：调用延迟、token用量和错误统计"""
+        client = self.llm.client.client
+        telemetry = client.telemetry
+        print(telemetry.report())
+        print(client.retry_policy.report())
+        if client.cassette is not None:
+            print(client.cassette.report())
+        if client.hedge_policy is not None:
+            print(client.hedge_policy.report())
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        summary = {
+            "records": len(results),
+            "succeeded": sum(1 for row in results if row["提取的地址"] != "解析地址失败"),
+            "cache_hit_rate": self.cache.hit_rate,
+            "retries": client.retry_policy.stats(),
+            "circuit_breaker": client.circuit_breaker.stats(),
+            "cassette": client.cassette.stats() if client.cassette is not None else None,
+            "hedge": client.hedge_policy.stats() if client.hedge_policy is not None else None,
+        }
+        summary.update(extra or {})
+        summary_file = telemetry.write_summary(f"{self.results_folder}/运行摘要_{timestamp}.json", summary)
+        print(f"运行摘要已保存至: {summary_file}")
+    
     def _save_interim_results(self, results):
         """保存中间结果"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -156,6 +223,10 @@ class AddressExtractor:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="投诉热点明细地址解析工具")
+    parser.add_argument("--pack-size", type=int, default=1, help="每个请求打包的记录数，大于1时启用打包模式")
+    args = parser.parse_args()
+    
     print("=" * 50)
     print("投诉热点明细地址解析工具")
     print("=" * 50)
@@ -199,7 +270,7 @@ def main():
     limit = int(limit_input) if limit_input.strip() else None
     
     # 执行批量解析
-    results = extractor.batch_extract_addresses(data, text_column, limit)
+    results = extractor.batch_extract_addresses(data, text_column, limit, args.pack_size)
     
     print("\n解析完成！")
 
@@ -2,65 +2,27 @@
 import polars as pl
 import re
 import os
-from openai import AsyncOpenAI
 import asyncio
 import time
 from datetime import datetime
 import platform
+import argparse
 from tqdm import tqdm
 import sys
 from collections import Counter
+from tool.data.Gazetteer import Gazetteer
+from tool.data.AddressDeduplicator import AddressDeduplicator
+from tool.data.LocationCluster import LocationCluster
+from tool.llm.AsyncLLMClient import AsyncLLMClient
+from tool.llm.SlidingWindowExecutor import SlidingWindowExecutor
+from tool.llm.ResponseCache import ResponseCache
+from tool.llm.CheckpointJournal import CheckpointJournal
+from tool.llm.PromptBudget import PromptBudget
+from tool.llm.BatchJob import BatchJob
+from tool.llm.LongestJobFirst import LongestJobFirst
 
-class AliyunLLM:
-    """阿里云大语言模型API接口"""
-    
-    def __init__(self, api_key=None):
-        """初始化API客户端"""
-        # 优先使用传入的API密钥，否则使用默认值
-        self.api_key = api_key or "sk-c8464e16fdc844fd8ca1399062d3c1d7"
-        self.base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
-        
-        # 初始化客户端
-        self.client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-        )
-    
-    def normalize_address(self, address):
-        """规范化地址，去除不必要的后缀和突兀的表达"""
-        if not address:
-            return address
-            
-        # 去除结尾的方位词
-        unwanted_suffixes = ["内", "中", "处", "边", "旁", "附近", "左右", "上", "里", "下"]
-        for suffix in unwanted_suffixes:
-            if address.endswith(suffix):
-                address = address[:-len(suffix)]
-                
-        # 去除开头的行政区划（省、市、区、县等）
-        address = re.sub(r'^(江西省|江西|南昌市|南昌|九江市|九江|赣州市|赣州|上饶市|上饶|吉安市|吉安|抚州市|抚州|宜春市|宜春|景德镇市|景德镇|萍乡市|萍乡|新余市|新余|鹰潭市|鹰潭)?\s*', '', address)
-        address = re.sub(r'^([\w]+(?:省|市|区|县|镇|乡))\s*', '', address)
-        
-        # 清理额外空格
-        address = re.sub(r'\s+', '', address)
-        
-        return address
-    
-    async def analyze_addresses(self, address_list, timeout=30):
-        """分析地址列表，找出最多3个最常见/最具代表性的地址"""
-        if not address_list:
-            return ["无有效地址"]
-        
-        # 准备原始地址列表和频率统计
-        counter = Counter(address_list)
-        
-        # 打印原始地址列表
-        print("\n==================== 原始地址列表 ====================")
-        for addr, count in counter.most_common():
-            print(f"  {addr} (出现{count}次)")
-        
-        # 使用AI进行分析
-        prompt = f"""
+# 地址汇总分析的提示词，{addresses}为带出现次数的地址列表，{omitted}为省略的低频地址说明
+ADDRESS_SUMMARY_PROMPT = """
 请严格按照以下规则分析投诉地址列表：
 
 ## 基本任务
@@ -90,26 +52,118 @@ class AliyunLLM:
 - 已去除行政区划前缀和方位词后缀
 
 原始投诉地址列表（标注原始出现次数）：
-{', '.join([f"{addr} (出现{count}次)" for addr, count in counter.most_common()])}
+{addresses}{omitted}
 
 请记住：当所有地址都只出现1次时，只输出1个最具体的地址。
 """
-        # 使用超时机制确保请求不会卡住
-        stream_response = await asyncio.wait_for(
-            self.client.chat.completions.create(
-                model="qwq-32b",
-                messages=[{"role": "user", "content": prompt}],
-                stream=True
-            ),
-            timeout=timeout
-        )
+
+# 估算分析耗时的权重（折算为token数）：每次调用的固定开销，以及每个不同地址在思考过程中大约产生的token数
+BASE_CALL_TOKENS = 300
+REASONING_TOKENS_PER_ADDRESS = 60
+# 提示词超出预算时合并近似地址的相似度阈值
+NEAR_ADDRESS_THRESHOLD = 90
+
+
+def make_prompt_budget(max_tokens=3000):
+    """地址分析提示词的预算，超出时用位置聚类合并近似地址"""
+    return PromptBudget(max_tokens=max_tokens, cluster=LocationCluster(threshold=NEAR_ADDRESS_THRESHOLD).cluster)
+
+
+class AliyunLLM:
+    """阿里云大语言模型API接口"""
+    
+    def __init__(self, api_key=None, cache=None, prompt_budget=None, use_dedup=True):
+        """
+        初始化API客户端，cache为可选的响应缓存(ResponseCache)，prompt_budget为提示词预算(PromptBudget)，
+        use_dedup为True时先在本地去重，只有存在不确定的相似地址时才调用大模型
+        """
+        # 使用统一的异步客户端，共享连接池和限流配额
+        self.llm = AsyncLLMClient(api_key=api_key, cache=cache)
+        self.budget = prompt_budget or make_prompt_budget()
+        self.gazetteer = Gazetteer.default()
+        self.deduplicator = AddressDeduplicator(normalizer=self.normalize_address) if use_dedup else None
+    
+    def normalize_address(self, address):
+        """规范化地址，去除不必要的后缀和突兀的表达"""
+        if not address:
+            return address
+            
+        # 去除结尾的方位词
+        unwanted_suffixes = ["内", "中", "处", "边", "旁", "附近", "左右", "上", "里", "下"]
+        for suffix in unwanted_suffixes:
+            if address.endswith(suffix):
+                address = address[:-len(suffix)]
+                
+        # 通过地名库一次扫描去除开头的行政区划（省、市、区、县、镇等）
+        stripped = self.gazetteer.strip_prefix(address)
+        if stripped == address:
+            # 地名库中没有收录的地方（如外省地址）按通用规则去除开头的行政区划
+            stripped = re.sub(r'^([\w]+(?:省|市|区|县|镇|乡))\s*', '', address) or address
+        address = stripped
         
-        # 收集内容
-        result = ""
-        async for chunk in stream_response:
-            if chunk.choices and len(chunk.choices) > 0 and chunk.choices[0].delta.content:
-                result += chunk.choices[0].delta.content
+        # 清理额外空格
+        address = re.sub(r'\s+', '', address)
+        
+        return address
+    
+    def build_prompt(self, address_list):
+        """生成地址分析的提示词，逐条请求和批处理共用"""
+        # 准备原始地址列表和频率统计
+        counter = Counter(address_list)
         
+        # 打印原始地址列表
+        print("\n==================== 原始地址列表 ====================")
+        for addr, count in counter.most_common():
+            print(f"  {addr} (出现{count}次)")
+        
+        # 使用AI进行分析，地址列表超出提示词预算时先在本地压缩
+        def render(items, omitted_items, omitted_count):
+            omitted = f"\n（另有{omitted_items}个低频地址共出现{omitted_count}次，已省略）" if omitted_items else ""
+            addresses = ', '.join([f"{addr} (出现{count}次)" for addr, count in items])
+            return ADDRESS_SUMMARY_PROMPT.format(addresses=addresses, omitted=omitted)
+        
+        prompt, kept = self.budget.fit(counter, render)
+        if len(kept) < len(counter):
+            print(f"地址列表超出提示词预算，压缩为 {len(kept)} 个地址")
+        return prompt
+    
+    def estimate_cost(self, address_list):
+        """估算分析一组地址的耗时（折算为token数）：提示词token数加上随不同地址数增长的思考量，用于调度"""
+        if not address_list:
+            return 0.0
+        counter = Counter(address_list)
+        addresses = ', '.join(f"{addr} (出现{count}次)" for addr, count in counter.items())
+        # 超出预算的提示词会被压缩，按预算封顶
+        prompt_tokens = min(self.budget.max_tokens,
+                            self.budget.count(ADDRESS_SUMMARY_PROMPT.format(addresses=addresses, omitted="")))
+        return BASE_CALL_TOKENS + prompt_tokens + REASONING_TOKENS_PER_ADDRESS * len(counter)
+    
+    def deduplicate_locally(self, address_list):
+        """本地去重，能确定结果时返回代表地址，存在不确定的相似地址时返回None"""
+        if self.deduplicator is None:
+            return None
+        addresses, ambiguous = self.deduplicator.deduplicate(address_list)
+        if ambiguous or not addresses:
+            return None
+        print(f"本地去重结果: {'、'.join(addresses)}")
+        return addresses
+    
+    async def analyze_addresses(self, address_list, timeout=30):
+        """分析地址列表，找出最多3个最常见/最具代表性的地址"""
+        if not address_list:
+            return ["无有效地址"]
+        
+        # 本地去重能确定的分组不再调用大模型
+        addresses = self.deduplicate_locally(address_list)
+        if addresses:
+            return addresses
+        
+        # 使用超时机制确保请求不会卡住
+        _, result = await self.llm.chat(self.build_prompt(address_list), model="qwq-32b", timeout=timeout)
+        return self.parse_addresses(result)
+    
+    def parse_addresses(self, result):
+        """从AI回复中解析出最多3个地址"""
         # 打印AI回复的完整内容
         print("\n==================== AI回复内容 ====================")
         print(result.strip())
@@ -139,10 +193,14 @@ class AliyunLLM:
 class ComplaintAddressProcessor:
     """投诉地址处理工具"""
     
-    def __init__(self):
-        """初始化工具"""
+    def __init__(self, max_prompt_tokens=3000, use_dedup=True):
+        """初始化工具，max_prompt_tokens为地址分析提示词的token预算，use_dedup为False时全部分组都调用大模型"""
         self.results_folder = "处理结果"
-        self.ai = AliyunLLM()
+        self.cache = ResponseCache()
+        self.ai = AliyunLLM(cache=self.cache, prompt_budget=make_prompt_budget(max_prompt_tokens),
+                            use_dedup=use_dedup)
+        # 最近一次运行的调度对比（模拟的完成时间），写入运行摘要
+        self.schedule_stats = None
         
         # 创建结果文件夹（如果不存在）
         if not os.path.exists(self.results_folder):
@@ -170,46 +228,44 @@ class ComplaintAddressProcessor:
             return match.group(1)
         return identifier  # 如果没有数字，则返回原标识
     
-    async def process_address_batch(self, id_address_map, progress=None):
-        """批量处理地址分析任务"""
-        tasks = []
-        results = {}
-        task_map = {}  # 跟踪每个任务对应的ID
-        
-        # 创建所有任务
-        for complaint_id, addresses in id_address_map.items():
-            if addresses:
-                task = self._analyze_address_task(complaint_id, addresses)
-                tasks.append(task)
-                task_map[id(task)] = complaint_id
-            else:
-                results[complaint_id] = ["无有效地址"]
-                if progress:
-                    progress.update(1)
-        
-        # 如果没有任务，直接返回
-        if not tasks:
-            return results
-            
-        # 使用as_completed并行执行任务，可以立即处理完成的任务
-        for task in asyncio.as_completed(tasks):
-            complaint_id, result = await task
-            results[complaint_id] = result
-            
-            # 每完成一个任务就更新进度
-            if progress:
-                progress.update(1)
-                
-        return results
-    
     async def _analyze_address_task(self, complaint_id, address_list):
         """单个地址分析任务"""
+        if not address_list:
+            return ["无有效地址"]
         print(f"\n处理投诉标识编号: {complaint_id} ====================")
-        top_addresses = await self.ai.analyze_addresses(address_list)
-        return complaint_id, top_addresses
+        return await self.ai.analyze_addresses(address_list)
+    
+    async def _analyze_batch(self, pending_ids, id_address_map, journal):
+        """批处理模式：全部分析提示词写入请求文件统一提交，结果写入断点日志，返回仍需逐个请求的标识"""
+        job = BatchJob(self.ai.llm, folder=f"{self.results_folder}/批处理")
+        prompts = {}
+        for complaint_id in pending_ids:
+            address_list = id_address_map[complaint_id]
+            if not address_list:
+                journal.record(complaint_id, ["无有效地址"])
+                continue
+            addresses = self.ai.deduplicate_locally(address_list)
+            if addresses:
+                journal.record(complaint_id, addresses)
+            else:
+                prompts[f"id-{complaint_id}"] = self.ai.build_prompt(address_list)
+        
+        print(f"\n批处理模式: 提交 {len(prompts)} 个投诉标识的地址分析，完成后按custom_id合并结果")
+        answers = await job.run(prompts, name="地址汇总", model="qwq-32b")
+        for custom_id, answer in answers.items():
+            journal.record(custom_id[len("id-"):], self.ai.parse_addresses(answer))
+        print(job.report())
+        return [complaint_id for complaint_id in pending_ids if complaint_id not in journal]
     
-    async def process_by_identifier(self, df, id_column="投诉标识", address_column="投诉位置", batch_size=20):
-        """按投诉标识分组，处理地址并添加最终投诉位置"""
+    async def process_by_identifier(self, df, id_column="投诉标识", address_column="投诉位置", concurrency=20,
+                                    journal_path=None, resume=False, batch=False, longest_first=True):
+        """
+        按投诉标识分组，处理地址并添加最终投诉位置
+        
+        每个投诉标识分析完成后追加写入断点日志，resume为True时跳过日志中已完成的标识；
+        batch为True时先通过批处理接口离线分析，批处理失败的标识再逐个请求；
+        longest_first为True时按估算耗时从大到小派发分析任务，为False时按原顺序派发
+        """
         print(f"开始按{id_column}分组处理地址...")
         
         # 检查必要的列是否存在
@@ -254,28 +310,67 @@ class ComplaintAddressProcessor:
             # 保存完整地址列表（不去重）
             id_address_map[complaint_id] = addresses
         
+        # 断点日志以标识编号为键，记录AI分析出的代表性地址
+        journal_path = journal_path or f"{self.results_folder}/地址汇总_断点日志.jsonl"
+        journal = CheckpointJournal(journal_path, resume=resume)
+        pending_ids = [complaint_id for complaint_id in id_list if complaint_id not in journal]
+        if len(journal):
+            print(f"从断点日志恢复 {len(journal)} 个已完成的投诉标识，剩余 {len(pending_ids)} 个")
+        
+        if batch and pending_ids:
+            pending_ids = await self._analyze_batch(pending_ids, id_address_map, journal)
+        
+        # 最长任务优先：地址多、提示词长的分组最先派发，小分组在后面填补空出的并发位置，
+        # 避免几个大分组恰好排在最后拖长整体完成时间
+        scheduler = LongestJobFirst(lambda cid: self.ai.estimate_cost(id_address_map[cid]))
+        ordered_ids = scheduler.order(pending_ids)
+        estimated = LongestJobFirst.compare(pending_ids, scheduler.costs, concurrency)
+        if pending_ids:
+            print(f"按估算耗时模拟的完成时间(token): {LongestJobFirst.format(estimated)}")
+        dispatch_ids = ordered_ids if longest_first else pending_ids
+        
         # 批量处理地址
-        print("\n开始AI分析地址...")
-        top_addresses_dict = {}
+        print(f"\n开始AI分析地址（{'最长任务优先' if longest_first else '原顺序'}派发）...")
         
         # 使用简洁的进度条设置
-        progress_bar = tqdm(total=len(id_list), desc="处理进度")
+        progress_bar = tqdm(total=len(pending_ids), desc="处理进度")
         
-        # 使用更大的批处理大小
-        for i in range(0, len(id_list), batch_size):
-            batch_ids = id_list[i:i+batch_size]
-            batch_map = {id: id_address_map[id] for id in batch_ids}
-            
-            batch_results = await self.process_address_batch(batch_map, progress_bar)
-            top_addresses_dict.update(batch_results)
-            
-            # 只在每5个批次后保存一次中间结果，减少输出干扰
-            if (i // batch_size) % 5 == 4:
-                self._save_interim_results(top_addresses_dict, id_list[:i+len(batch_ids)], 
-                                        df, id_column, id_address_map, silent=True)
+        # 记录每个分组的实际耗时，运行结束后用实测值对比两种派发顺序
+        durations = {}
+        
+        async def timed_task(cid):
+            started = time.perf_counter()
+            try:
+                return await self._analyze_address_task(cid, id_address_map[cid])
+            finally:
+                durations[cid] = time.perf_counter() - started
+        
+        # 滑动窗口调度：始终保持concurrency个分析任务在途，完成一个立即补上下一个
+        executor = SlidingWindowExecutor(concurrency)
+        run_started = time.perf_counter()
+        try:
+            async for complaint_id, result in executor.run(dispatch_ids, timed_task):
+                if isinstance(result, Exception):
+                    # 出错的标识不写入日志，续跑时会重新分析
+                    print(f"分析投诉标识编号 {complaint_id} 时出错: {result}")
+                else:
+                    journal.record(complaint_id, result)
+                progress_bar.update(1)
+        finally:
+            journal.close()
         
         progress_bar.close()
         
+        if durations:
+            wall = time.perf_counter() - run_started
+            measured = LongestJobFirst.compare(pending_ids, durations, concurrency)
+            print(f"实际完成时间: {wall:.1f}秒；按实测耗时模拟: {LongestJobFirst.format(measured, '秒')}")
+            self.schedule_stats = {"longest_first": longest_first, "estimated": estimated, "measured": measured,
+                                   "wall_seconds": wall}
+        
+        # 由断点日志一次性得到全部分析结果
+        top_addresses_dict = dict(journal.items())
+        
         # 打印每个投诉标识的高频地址
         print("\n各投诉标识的代表性地址:")
         for complaint_id, addresses in top_addresses_dict.items():
@@ -366,41 +461,6 @@ class ComplaintAddressProcessor:
         
         return results, pl.DataFrame(summary_data)
     
-    def _save_interim_results(self, top_addresses_dict, processed_ids, df, id_column, id_address_map, silent=False):
-        """保存中间结果，防止长时间处理中断导致全部丢失"""
-        try:
-            # 创建中间汇总表
-            interim_summary = []
-            for complaint_id in processed_ids:
-                if complaint_id in top_addresses_dict:
-                    # 获取原始的投诉标识
-                    original_id_series = df.filter(pl.col("complaint_id") == complaint_id).get_column(id_column)
-                    original_id = original_id_series[0] if len(original_id_series) > 0 else complaint_id
-                    
-                    # 获取该编号的所有地址（原始列表）
-                    addresses = id_address_map.get(complaint_id, [])
-                    
-                    # 获取AI分析的代表性地址
-                    top_addresses = top_addresses_dict[complaint_id]
-                    
-                    interim_summary.append({
-                        "投诉标识": original_id,
-                        "最终投诉位置": "、".join(top_addresses),
-                        "标识编号": complaint_id,
-                        "地址数量": len(addresses)
-                    })
-            
-            # 保存临时结果
-            if interim_summary:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                temp_file = f"{self.results_folder}/临时结果_{timestamp}.xlsx"
-                pl.DataFrame(interim_summary).write_excel(temp_file)
-                if not silent:
-                    print(f"已保存中间结果: {temp_file} ({len(interim_summary)}条记录)")
-        except Exception as e:
-            if not silent:
-                print(f"保存中间结果时出错: {e}")
-    
     def save_results(self, df, output_name=None):
         """保存处理结果"""
         if df is None or df.height == 0:
@@ -421,15 +481,18 @@ class ComplaintAddressProcessor:
         except Exception as e:
             print(f"保存结果时出错: {e}")
 
-async def main_process():
-    """主程序流程"""
+async def main_process(resume=False, max_prompt_tokens=3000, batch=False, use_dedup=True, longest_first=True):
+    """
+    主程序流程，resume为True时从上次中断处继续，batch为True时使用批处理模式，use_dedup为False时不做本地去重，
+    longest_first为False时按原顺序派发分析任务
+    """
     start_time = time.time()
     print("=" * 50)
     print("投诉地址汇总分析工具")
     print("=" * 50)
     
     # 创建工具实例
-    processor = ComplaintAddressProcessor()
+    processor = ComplaintAddressProcessor(max_prompt_tokens=max_prompt_tokens, use_dedup=use_dedup)
     
     # 固定参数 - 直接使用硬编码的文件路径和列名，无需用户输入
     file_path = "D:\\NanChangWork\\202403-202502投诉热点明细表-修改后.xlsx"
@@ -449,8 +512,13 @@ async def main_process():
     
     # 处理并生成结果
     print(f"\n开始批量处理地址数据...")
-    # 使用较大批处理大小
-    results, summary = await processor.process_by_identifier(data, id_column, address_column, batch_size=20)
+    # 同时保持20个分析请求在途
+    # 断点日志按输入文件命名，同一文件续跑时复用
+    journal_path = f"{processor.results_folder}/地址汇总_{os.path.splitext(os.path.basename(file_path))[0]}.jsonl"
+    print(f"断点日志: {journal_path}{'（续跑）' if resume else ''}")
+    results, summary = await processor.process_by_identifier(data, id_column, address_column, concurrency=20,
+                                                              journal_path=journal_path, resume=resume, batch=batch,
+                                                              longest_first=longest_first)
     
     # 保存结果
     processor.save_results(results, "更新后明细表")
@@ -461,21 +529,59 @@ async def main_process():
     print("   - AI识别并合并了相似地址，计算总频率")
     print("   - 按合并后的频率从高到低排序，并去除冗余地址")
     print("这些文件保存在'处理结果'文件夹中，可以直接打开查看和使用。")
+    print(processor.cache.report())
+    print(processor.ai.budget.report())
+    if processor.ai.deduplicator is not None:
+        print(processor.ai.deduplicator.report())
+    print(processor.ai.llm.telemetry.report())
+    print(processor.ai.llm.retry_policy.report())
+    if processor.ai.llm.cassette is not None:
+        print(processor.ai.llm.cassette.report())
+    if processor.ai.llm.hedge_policy is not None:
+        print(processor.ai.llm.hedge_policy.report())
     
     # 计算执行时间
     elapsed_time = time.time() - start_time
     minutes = int(elapsed_time // 60)
     seconds = int(elapsed_time % 60)
+    
+    # 运行摘要：调用延迟、token用量和错误统计
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    summary_file = processor.ai.llm.telemetry.write_summary(
+        f"{processor.results_folder}/运行摘要_{timestamp}.json",
+        {
+            "identifiers": summary.height if summary is not None else 0,
+            "cache_hit_rate": processor.cache.hit_rate,
+            "prompt_budget": processor.ai.budget.stats(),
+            "dedup": processor.ai.deduplicator.stats() if processor.ai.deduplicator is not None else None,
+            "retries": processor.ai.llm.retry_policy.stats(),
+            "circuit_breaker": processor.ai.llm.circuit_breaker.stats(),
+            "cassette": processor.ai.llm.cassette.stats() if processor.ai.llm.cassette is not None else None,
+            "schedule": processor.schedule_stats,
+            "hedge": processor.ai.llm.hedge_policy.stats() if processor.ai.llm.hedge_policy is not None else None,
+            "elapsed_seconds": elapsed_time,
+        })
+    print(f"运行摘要已保存至: {summary_file}")
     print(f"\n处理完成！总耗时: {minutes}分{seconds}秒")
 
 def run():
     """启动程序的入口函数"""
+    parser = argparse.ArgumentParser(description="投诉地址汇总分析工具")
+    parser.add_argument("--resume", action="store_true", help="从断点日志继续，跳过已完成的投诉标识")
+    parser.add_argument("--max-prompt-tokens", type=int, default=3000,
+                        help="地址分析提示词的token预算，超出时合并重复地址并省略低频地址")
+    parser.add_argument("--batch", action="store_true",
+                        help="批处理模式：全部请求写入文件通过批处理接口提交，不占用交互式请求的配额")
+    parser.add_argument("--llm-only", action="store_true", help="不做本地去重，全部投诉标识都调用大模型分析")
+    parser.add_argument("--fifo", action="store_true", help="按原顺序派发分析任务，用于对比最长任务优先调度的效果")
+    args = parser.parse_args()
+    
     # 设置事件循环策略（在Windows上需要）
     if platform.system() == 'Windows':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
     
     # 运行异步主函数
-    asyncio.run(main_process())
+    asyncio.run(main_process(args.resume, args.max_prompt_tokens, args.batch, not args.llm_only, not args.fifo))
 
 if __name__ == "__main__":
     run() 
\ No newline at end of file
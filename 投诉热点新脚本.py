@@ -3,6 +3,7 @@ import re
 import openpyxl
 import pandas as pd
 import os
+from tool.file.WorkbookPatcher import WorkbookPatcher
 
 def extract_address(text):
     """
@@ -365,19 +366,9 @@ def main():
         print(f"  提取地址: {extract_address(case)}")
         print("-" * 80)
     
-    # 使用pandas直接保存到Excel，保留其他工作表
+    # 只替换明细工作表的XML部件，其余工作表按原样复制，不再整本读写
     print("正在保存结果到Excel文件...")
-    
-    # 首先读取原始Excel的所有工作表
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        original_excel = pd.ExcelFile(file_path)
-        for sheet_name in original_excel.sheet_names:
-            if sheet_name != "明细":  # 跳过明细工作表，使用更新后的数据
-                sheet_df = pd.read_excel(file_path, sheet_name=sheet_name)
-                sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
-        
-        # 写入更新后的明细工作表
-        pandas_df.to_excel(writer, sheet_name="明细", index=False)
+    WorkbookPatcher(file_path).replace_sheet("明细", pandas_df, output_path)
     
     print(f"已更新投诉位置并保存到: {output_path}")
     
@@ -387,18 +378,6 @@ def main():
     print(f"总行数: {total_rows}")
     print(f"成功填充地址的行数: {filled_rows}")
     print(f"填充率: {filled_rows / total_rows * 100:.2f}%")
-    
-    # 验证保存是否成功
-    try:
-        test_df = pd.read_excel(output_path, sheet_name="明细")
-        test_filled = test_df["投诉位置"].notna().sum()
-        print(f"验证: 输出文件中成功填充地址的行数: {test_filled}")
-        if test_filled == filled_rows:
-            print("验证通过: 文件保存成功!")
-        else:
-            print("警告: 保存的文件中填充的地址行数与处理结果不一致!")
-    except Exception as e:
-        print(f"验证文件时出错: {e}")
 
 if __name__ == "__main__":
     main()
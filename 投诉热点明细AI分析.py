@@ -1,109 +1,28 @@
 # coding=utf-8
 import polars as pl
 import os
-from openai import AsyncOpenAI
 import asyncio
 import time
 from datetime import datetime
 import platform
 import json
+import hashlib
+import argparse
+from tool.llm.AsyncLLMClient import AsyncLLMClient
+from tool.llm.SlidingWindowExecutor import SlidingWindowExecutor
+from tool.llm.ResponseCache import ResponseCache
+from tool.llm.CheckpointJournal import CheckpointJournal
+from tool.llm.PromptPacker import PromptPacker
+from tool.llm.TieredExtractor import TieredExtractor
+from tool.llm.BatchJob import BatchJob
+from 投诉热点新脚本 import extract_address
 
-class AsyncAliyunLLM:
-    """阿里云大语言模型异步API封装类"""
-    
-    def __init__(self, api_key=None):
-        """初始化异步API客户端"""
-        # 优先使用传入的API密钥，否则尝试从环境变量获取
-        self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY", "sk-c8464e16fdc844fd8ca1399062d3c1d7")
-        self.base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
-        
-        # 初始化异步客户端
-        self.client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-        )
-    
-    async def chat_async(self, prompt, model="qwq-32b", system_prompt=None):
-        """异步调用模型，使用流式处理"""
-        # 构建消息列表
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-        
-        try:
-            # 使用流式模式调用API
-            stream_response = await self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                stream=True  # 启用流式模式
-            )
-            
-            # 收集流式响应
-            collected_content = ""
-            reasoning_content = ""
-            
-            async for chunk in stream_response:
-                # 处理流式响应的每个块
-                if chunk.choices and len(chunk.choices) > 0:
-                    delta = chunk.choices[0].delta
-                    
-                    # 处理思考过程（如果有）
-                    if hasattr(delta, 'reasoning_content') and delta.reasoning_content:
-                        reasoning_content += delta.reasoning_content
-                    
-                    # 处理实际内容
-                    if delta.content:
-                        collected_content += delta.content
-            
-            # 返回收集到的完整内容
-            return collected_content.strip()
-            
-        except Exception as e:
-            print(f"API调用错误: {str(e)}")
-            raise e
-
-class ComplaintAnalyzer:
-    """投诉热点明细AI分析工具"""
-    
-    def __init__(self, api_key=None):
-        """初始化分析器"""
-        self.llm = AsyncAliyunLLM(api_key=api_key)
-        self.results_folder = "分析结果"
-        
-        # 创建结果文件夹（如果不存在）
-        if not os.path.exists(self.results_folder):
-            os.makedirs(self.results_folder)
-    
-    def load_data(self, file_path, sheet_name="明细"):
-        """加载投诉数据文件"""
-        try:
-            # 尝试自动检测文件类型并加载
-            file_ext = os.path.splitext(file_path)[1].lower()
-            
-            if file_ext == '.csv':
-                return pl.read_csv(file_path)
-            elif file_ext in ['.xlsx', '.xls']:
-                return pl.read_excel(file_path, sheet_name=sheet_name)
-            else:
-                print(f"不支持的文件格式: {file_ext}")
-                return None
-        except Exception as e:
-            print(f"加载数据时出错: {e}")
-            return None
-    
-    async def extract_address_async(self, text):
-        """从文本中异步提取地址"""
-        if not text or (isinstance(text, str) and text.strip() == "") or pl.Series([text]).is_null().all():
-            return "解析地址失败"
-            
-        prompt = f"""
-只提取文本中明确提及的用户实际位置，忽略基站信息。仅返回地址，无说明。
+# 地址提取的任务说明和规则，逐条请求和打包请求共用
+ADDRESS_INSTRUCTION = """只提取文本中明确提及的用户实际位置，忽略基站信息。仅返回地址，无说明。
 注意：如果只提到基站而没有明确用户实际位置，返回"解析地址失败"。
+"""
 
-文本: {text}
-
-规则:
+ADDRESS_RULES = """规则:
 1. 必须明确提及用户在哪里，如"用户在XX地点"、"用户所在XX区域"、"客户反映在XX地点"
 2. 如果有冒号，如"用户反映在青山湖区:南池路"，去除冒号并连接，输出为"青山湖区南池路"
 3. 如果有中括号【】，请忽略中括号内的内容，只保留中括号前的地址
@@ -140,20 +59,85 @@ class ComplaintAnalyzer:
 
 如果无法确定用户实际位置，必须返回"解析地址失败"。
 """
+
+class ComplaintAnalyzer:
+    """投诉热点明细AI分析工具"""
+    
+    def __init__(self, api_key=None, use_rules=True):
+        """初始化分析器，use_rules为True时先用规则提取，只有规则无法确定的记录才调用大模型"""
+        self.cache = ResponseCache()
+        self.llm = AsyncLLMClient(api_key=api_key, cache=self.cache)
+        self.tiered = TieredExtractor(extract_address, self.extract_address_async) if use_rules else None
+        self.results_folder = "分析结果"
+        
+        # 创建结果文件夹（如果不存在）
+        if not os.path.exists(self.results_folder):
+            os.makedirs(self.results_folder)
+    
+    def load_data(self, file_path, sheet_name="明细"):
+        """加载投诉数据文件"""
+        try:
+            # 尝试自动检测文件类型并加载
+            file_ext = os.path.splitext(file_path)[1].lower()
+            
+            if file_ext == '.csv':
+                return pl.read_csv(file_path)
+            elif file_ext in ['.xlsx', '.xls']:
+                return pl.read_excel(file_path, sheet_name=sheet_name)
+            else:
+                print(f"不支持的文件格式: {file_ext}")
+                return None
+        except Exception as e:
+            print(f"加载数据时出错: {e}")
+            return None
+    
+    @staticmethod
+    def build_prompt(text):
+        """单条地址提取的提示词，逐条请求和批处理共用"""
+        return f"""
+{ADDRESS_INSTRUCTION}
+文本: {text}
+
+{ADDRESS_RULES}"""
+    
+    @staticmethod
+    def clean_answer(result):
+        """整理模型回复"""
+        result = result.strip()
+        # 如果结果不是"解析地址失败"但内容很长，可能是AI添加了额外说明
+        if result and result != "解析地址失败" and len(result) > 100:
+            # 尝试只保留第一行内容
+            first_line = result.strip().split('\n')[0]
+            if len(first_line) < 100:
+                return first_line
+        return result.strip()
+    
+    @staticmethod
+    def record_key(row):
+        """记录内容的哈希，作为断点日志的键；输入文件增删行或重新排序后续跑，结果仍对应原记录"""
+        content = json.dumps(row, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+    
+    async def extract_address_async(self, text):
+        """从文本中异步提取地址"""
+        if not text or (isinstance(text, str) and text.strip() == "") or pl.Series([text]).is_null().all():
+            return "解析地址失败"
+        
         # 异步调用LLM模型
         try:
-            result = await self.llm.chat_async(prompt)
-            # 如果结果不是"解析地址失败"但内容很长，可能是AI添加了额外说明
-            if result and result != "解析地址失败" and len(result) > 100:
-                # 尝试只保留第一行内容
-                first_line = result.strip().split('\n')[0]
-                if len(first_line) < 100:
-                    return first_line
-            return result.strip()
+            _, result = await self.llm.chat(self.build_prompt(text))
+            return self.clean_answer(result)
         except Exception as e:
             print(f"地址解析出错: {e}")
             return "解析地址失败"
     
+    async def extract_with_rules_async(self, text):
+        """规则优先、大模型兜底提取地址"""
+        if self.tiered is None:
+            return await self.extract_address_async(text)
+        address, _ = await self.tiered.extract_async(str(text))
+        return address
+    
     async def process_record_async(self, row, has_reply_column, has_complaint_column, index, total):
         """异步处理单条记录"""
         print(f"[{index+1}/{total}] 处理记录...")
@@ -168,13 +152,13 @@ class ComplaintAnalyzer:
         
         if reply_text and str(reply_text).strip():
             print(f"尝试从答复口径提取地址: {str(reply_text)[:80]}..." if len(str(reply_text)) > 80 else str(reply_text))
-            address = await self.extract_address_async(reply_text)
+            address = await self.extract_with_rules_async(reply_text)
             source = "答复口径"
         
         # 如果答复口径提取失败，再尝试从投诉内容提取
         if address == "解析地址失败" and complaint_text and str(complaint_text).strip():
             print(f"答复口径提取失败，尝试从投诉内容提取: {str(complaint_text)[:80]}..." if len(str(complaint_text)) > 80 else str(complaint_text))
-            address = await self.extract_address_async(complaint_text)
+            address = await self.extract_with_rules_async(complaint_text)
             source = "投诉内容"
         
         if address != "解析地址失败":
@@ -193,8 +177,135 @@ class ComplaintAnalyzer:
         
         return result_row, (address != "解析地址失败")
     
-    async def process_and_extract_addresses_async(self, data, batch_size=20):
-        """异步处理数据并提取地址，优先从答复口径列提取，失败则从投诉内容列提取"""
+    async def _extract_single_async(self, all_rows, pending, has_reply_column, has_complaint_column, concurrency):
+        """逐条请求提取地址，按完成顺序产出 (行号, 地址, 来源)"""
+        total = len(all_rows)
+        # 滑动窗口调度：始终保持concurrency个请求在途，结果按完成顺序返回
+        executor = SlidingWindowExecutor(concurrency)
+        worker = lambda i: self.process_record_async(all_rows[i], has_reply_column, has_complaint_column, i, total)
+        async for i, result in executor.run(pending, worker):
+            # 处理异常情况
+            if isinstance(result, Exception):
+                print(f"处理第 {i+1} 条记录时出错: {result}")
+                yield i, "解析地址失败", "处理出错"
+            else:
+                result_row, _ = result
+                yield i, result_row["提取的地址"], result_row["地址来源"]
+    
+    async def _extract_two_rounds_async(self, all_rows, pending, has_reply_column, has_complaint_column, resolve):
+        """
+        分两轮提取地址，按完成顺序产出 (行号, 地址, 来源)
+        
+        先提取答复口径，提取失败的记录再提取投诉内容；每轮中规则能确定的记录不进入大模型请求，
+        其余记录交给 resolve(records, name)，它异步迭代 [(行号, 文本)] 中每条记录的 (行号, 地址)
+        """
+        def has_text(value):
+            return value is not None and str(value).strip() != ""
+        
+        def try_rules(text):
+            return self.tiered.try_rules(text) if self.tiered is not None else None
+        
+        async def resolve_recorded(records, name):
+            # 规则无法确定、交给大模型的记录计入分层统计，耗时按到达间隔分摊
+            texts = dict(records)
+            last = time.perf_counter()
+            async for i, address in resolve(records, name):
+                if self.tiered is not None:
+                    now = time.perf_counter()
+                    self.tiered.record_llm(texts[i], None if address == "解析地址失败" else address, now - last)
+                    last = now
+                yield i, address
+        
+        # 第一轮：答复口径
+        fallback = []
+        reply_records = []
+        for i in pending:
+            reply_text = all_rows[i].get("答复口径") if has_reply_column else None
+            if has_text(reply_text):
+                address = try_rules(str(reply_text))
+                if address:
+                    yield i, address, "答复口径"
+                else:
+                    reply_records.append((i, str(reply_text)))
+            else:
+                fallback.append((i, "无"))
+        async for i, address in resolve_recorded(reply_records, "答复口径"):
+            if address != "解析地址失败":
+                yield i, address, "答复口径"
+            else:
+                fallback.append((i, "答复口径"))
+        
+        # 第二轮：投诉内容
+        complaint_records = []
+        for i, source in fallback:
+            complaint_text = all_rows[i].get("投诉内容") if has_complaint_column else None
+            if has_text(complaint_text):
+                address = try_rules(str(complaint_text))
+                if address:
+                    yield i, address, "投诉内容"
+                else:
+                    complaint_records.append((i, str(complaint_text)))
+            else:
+                yield i, "解析地址失败", source
+        async for i, address in resolve_recorded(complaint_records, "投诉内容"):
+            yield i, address, "投诉内容"
+    
+    async def _extract_packed_async(self, all_rows, pending, has_reply_column, has_complaint_column,
+                                    pack_size, concurrency):
+        """打包请求提取地址，每个请求打包pack_size条记录，按完成顺序产出 (行号, 地址, 来源)"""
+        packer = PromptPacker(ADDRESS_INSTRUCTION + "\n" + ADDRESS_RULES, pack_size,
+                              field="address", failure_value="解析地址失败")
+        
+        async def chat(prompt):
+            _, answer = await self.llm.chat(prompt)
+            return answer
+        
+        def resolve(records, name):
+            return packer.iter_async(records, chat, concurrency)
+        
+        async for entry in self._extract_two_rounds_async(all_rows, pending, has_reply_column, has_complaint_column,
+                                                          resolve):
+            yield entry
+        
+        print(packer.report())
+    
+    async def _extract_batch_async(self, all_rows, pending, has_reply_column, has_complaint_column, concurrency):
+        """
+        批处理模式提取地址，按完成顺序产出 (行号, 地址, 来源)
+        
+        每轮规则无法确定的记录写入请求文件统一提交，批处理中失败的请求改为逐条调用
+        """
+        batch = BatchJob(self.llm, folder=f"{self.results_folder}/批处理")
+        
+        async def resolve(records, name):
+            print(f"批处理提交{name}: {len(records)} 条")
+            answers = await batch.run({str(i): self.build_prompt(text) for i, text in records}, name=name)
+            retry = []
+            for i, text in records:
+                if str(i) in answers:
+                    yield i, self.clean_answer(answers[str(i)]) or "解析地址失败"
+                else:
+                    retry.append((i, text))
+            if retry:
+                print(f"{len(retry)} 条批处理失败的请求改为逐条调用")
+            executor = SlidingWindowExecutor(concurrency)
+            async for (i, _), result in executor.run(retry, lambda record: self.extract_address_async(record[1])):
+                yield i, "解析地址失败" if isinstance(result, Exception) else (result or "解析地址失败")
+        
+        async for entry in self._extract_two_rounds_async(all_rows, pending, has_reply_column, has_complaint_column,
+                                                          resolve):
+            yield entry
+        
+        print(batch.report())
+    
+    async def process_and_extract_addresses_async(self, data, concurrency=20, journal_path=None, resume=False,
+                                                  pack_size=1, batch=False):
+        """
+        异步处理数据并提取地址，优先从答复口径列提取，失败则从投诉内容列提取
+        
+        每条记录完成后追加写入断点日志，resume为True时跳过日志中已完成的记录；
+        pack_size大于1时每个请求打包多条记录；batch为True时通过批处理接口离线处理
+        """
         print(f"开始处理数据并提取地址，共 {data.height} 条记录")
         
         # 检查必要的列是否存在
@@ -206,61 +317,65 @@ class ComplaintAnalyzer:
         if not (has_reply_column or has_complaint_column):
             print("错误: 数据中既没有'答复口径'列也没有'投诉内容'列，无法提取地址。")
             return None
-            
-        # 创建结果列表
-        results = []
+        
+        # 断点日志以记录内容的哈希为键，只记录新增的两列，原始数据在最后汇总时再合并；
+        # 内容完全相同的记录只处理一次
+        journal_path = journal_path or f"{self.results_folder}/地址解析_断点日志.jsonl"
+        journal = CheckpointJournal(journal_path, resume=resume)
+        
         total = data.height
+        all_rows = list(data.iter_rows(named=True))
+        keys = [self.record_key(row) for row in all_rows]
+        first_index = {}
+        for i, key in enumerate(keys):
+            first_index.setdefault(key, i)
+        pending = [i for key, i in first_index.items() if key not in journal]
         processed = 0
         success_count = 0
         
+        restored = len(first_index) - len(pending)
+        if restored:
+            print(f"从断点日志恢复 {restored} 条已完成记录，剩余 {len(pending)} 条")
         print(f"\n开始提取地址...")
         
-        # 按批次处理数据
-        all_rows = list(data.iter_rows(named=True))
-        for i in range(0, len(all_rows), batch_size):
-            batch = all_rows[i:i+batch_size]
-            batch_tasks = []
-            
-            # 创建批处理任务
-            for j, row in enumerate(batch):
-                task = self.process_record_async(
-                    row, has_reply_column, has_complaint_column, i+j, total
-                )
-                batch_tasks.append(task)
-            
-            # 异步执行批处理任务
-            batch_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
-            
-            # 处理结果
-            for j, result in enumerate(batch_results):
-                # 处理异常情况
-                if isinstance(result, Exception):
-                    print(f"处理第 {i+j+1} 条记录时出错: {result}")
-                    result_row = {key: value for key, value in batch[j].items()}
-                    result_row["提取的地址"] = "解析地址失败"
-                    result_row["地址来源"] = "处理出错"
-                    results.append(result_row)
-                    processed += 1
-                    continue
-                    
-                # 正常处理
-                result_row, is_success = result
-                results.append(result_row)
-                processed += 1
-                if is_success:
+        if batch:
+            print("批处理模式: 提示词写入请求文件统一提交，完成后按custom_id合并结果")
+            outcomes = self._extract_batch_async(all_rows, pending, has_reply_column, has_complaint_column,
+                                                 concurrency)
+        elif pack_size > 1:
+            print(f"打包模式: 每个请求包含 {pack_size} 条记录")
+            outcomes = self._extract_packed_async(all_rows, pending, has_reply_column, has_complaint_column,
+                                                  pack_size, concurrency)
+        else:
+            outcomes = self._extract_single_async(all_rows, pending, has_reply_column, has_complaint_column,
+                                                  concurrency)
+        try:
+            async for i, address, source in outcomes:
+                if address != "解析地址失败":
                     success_count += 1
                 
-                # 更新投诉位置列
-                if has_location_column and result_row["提取的地址"] != "解析地址失败":
-                    result_row["投诉位置"] = result_row["提取的地址"]
-            
-            # 每批次保存一次中间结果
-            self._save_interim_results(results, "addresses")
-            success_rate = (success_count/processed*100) if processed > 0 else 0
-            print(f"已完成 {processed}/{total} 条记录处理，成功率: {success_rate:.2f}%")
-            
-            # 短暂暂停，避免过快请求
-            await asyncio.sleep(1)
+                journal.record(keys[i], {"提取的地址": address, "地址来源": source})
+                processed += 1
+                
+                if processed % concurrency == 0:
+                    success_rate = (success_count/processed*100) if processed > 0 else 0
+                    print(f"已完成 {processed}/{len(pending)} 条记录处理，成功率: {success_rate:.2f}%")
+        finally:
+            journal.close()
+        
+        # 由断点日志一次性生成最终结果
+        results = []
+        for i, row in enumerate(all_rows):
+            entry = journal.get(keys[i])
+            if entry is None:
+                continue
+            result_row = dict(row)
+            result_row["提取的地址"] = entry["提取的地址"]
+            result_row["地址来源"] = entry["地址来源"]
+            # 更新投诉位置列
+            if has_location_column and entry["提取的地址"] != "解析地址失败":
+                result_row["投诉位置"] = entry["提取的地址"]
+            results.append(result_row)
         
         # 保存最终结果
         if results:
@@ -280,39 +395,49 @@ class ComplaintAnalyzer:
                 print(f"更新后的完整数据已保存至: {updated_file}")
                 
                 # 输出处理统计信息
-                if processed > 0:
-                    success_rate = (success_count / processed) * 100
-                    print(f"\n处理统计:")
-                    print(f"总记录数: {total}")
-                    print(f"处理记录数: {processed}")
-                    print(f"成功提取地址数: {success_count}")
-                    print(f"地址提取成功率: {success_rate:.2f}%")
+                total_success = sum(1 for row in results if row["提取的地址"] != "解析地址失败")
+                print(f"\n处理统计:")
+                print(f"总记录数: {total}")
+                print(f"本次处理记录数: {processed}")
+                print(f"已完成记录数: {len(results)}")
+                print(f"成功提取地址数: {total_success}")
+                print(f"地址提取成功率: {total_success / len(results) * 100:.2f}%")
+                print(self.cache.report())
+                if self.tiered is not None:
+                    print(self.tiered.report())
+                print(self.llm.telemetry.report())
+                print(self.llm.retry_policy.report())
+                if self.llm.cassette is not None:
+                    print(self.llm.cassette.report())
+                if self.llm.hedge_policy is not None:
+                    print(self.llm.hedge_policy.report())
+                
+                # 运行摘要：调用延迟、token用量和错误统计，便于对比不同批次的运行情况
+                summary_file = self.llm.telemetry.write_summary(
+                    f"{self.results_folder}/运行摘要_{timestamp}.json",
+                    {
+                        "records": total,
+                        "processed": processed,
+                        "succeeded": total_success,
+                        "cache_hit_rate": self.cache.hit_rate,
+                        "tiered": self.tiered.stats() if self.tiered is not None else None,
+                        "retries": self.llm.retry_policy.stats(),
+                        "circuit_breaker": self.llm.circuit_breaker.stats(),
+                        "cassette": self.llm.cassette.stats() if self.llm.cassette is not None else None,
+                        "hedge": self.llm.hedge_policy.stats() if self.llm.hedge_policy is not None else None,
+                    })
+                print(f"运行摘要已保存至: {summary_file}")
             except Exception as e:
                 print(f"保存结果时出错: {e}")
         
         return results
-    
-    def _save_interim_results(self, results, result_type="analysis"):
-        """保存中间结果"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        if result_type == "addresses":
-            interim_file = f"{self.results_folder}/地址解析_中间结果_{timestamp}.csv"
-        else:
-            interim_file = f"{self.results_folder}/投诉分析_中间结果_{timestamp}.csv"
-        
-        try:
-            # 将结果转换为polars DataFrame
-            df = pl.DataFrame(results)
-            # 保存为CSV，不使用encoding参数
-            df.write_csv(interim_file)
-            print(f"已保存中间结果至: {interim_file}")
-        except Exception as e:
-            print(f"保存中间结果时出错: {e}")
 
 
-async def main_async():
-    """异步主函数"""
+async def main_async(resume=False, pack_size=1, use_rules=True, batch=False):
+    """
+    异步主函数，resume为True时从上次中断处继续，pack_size为每个请求打包的记录数，use_rules为False时只用大模型提取，
+    batch为True时使用批处理模式
+    """
     # 默认参数和文件路径
     file_path = "WorkDocument/投诉热点明细分析/source/202403-202502投诉热点明细表-终稿.xlsx"
     sheet_name = "明细"
@@ -324,7 +449,7 @@ async def main_async():
     print(f"默认工作表: {sheet_name}")
     
     # 创建分析器实例
-    analyzer = ComplaintAnalyzer()
+    analyzer = ComplaintAnalyzer(use_rules=use_rules)
     
     # 加载数据
     print(f"\n正在读取Excel文件...")
@@ -336,25 +461,36 @@ async def main_async():
     
     print(f"\n成功加载数据，共 {data.height} 条记录")
     
-    # 批量大小设置
-    batch_size = 20  # 增加到20条/批次
-    print(f"设置批量处理大小: {batch_size}条记录/批次")
+    # 并发设置：同时保持在途的请求数
+    concurrency = 20
+    print(f"设置并发请求数: {concurrency}")
     
     # 直接执行地址提取
     print("\n开始执行地址提取...")
-    await analyzer.process_and_extract_addresses_async(data, batch_size)
+    # 断点日志按输入文件命名，同一文件续跑时复用
+    journal_path = f"{analyzer.results_folder}/地址解析_{os.path.splitext(os.path.basename(file_path))[0]}.jsonl"
+    print(f"断点日志: {journal_path}{'（续跑）' if resume else ''}")
+    await analyzer.process_and_extract_addresses_async(data, concurrency, journal_path, resume, pack_size, batch)
     
     print("\n处理完成！")
 
 
 def main():
     """同步入口函数"""
+    parser = argparse.ArgumentParser(description="投诉热点明细地址自动提取工具")
+    parser.add_argument("--resume", action="store_true", help="从断点日志继续，跳过已完成的记录")
+    parser.add_argument("--pack-size", type=int, default=1, help="每个请求打包的记录数，大于1时启用打包模式")
+    parser.add_argument("--llm-only", action="store_true", help="不使用规则提取，全部记录都调用大模型")
+    parser.add_argument("--batch", action="store_true",
+                        help="批处理模式：全部请求写入文件通过批处理接口提交，不占用交互式请求的配额")
+    args = parser.parse_args()
+    
     # 设置事件循环策略（在Windows上需要）
     if platform.system() == 'Windows':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
     
     # 运行异步主函数
-    asyncio.run(main_async())
+    asyncio.run(main_async(args.resume, args.pack_size, not args.llm_only, args.batch))
 
 
 if __name__ == "__main__":
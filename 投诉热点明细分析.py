@@ -1,153 +1,129 @@
 import datetime as dt
 import logging
+import os
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 import polars as pl
 from tool.data.DataUtils import DataUtils
+from tool.data.Gazetteer import Gazetteer
+from tool.data.SuffixAutomaton import SuffixAutomaton
 from tool.file import FileManager
 from tool.decorators.ErrorHandler import error_handler
 from rapidfuzz import process, fuzz
 
+# 分组数少于该值时串行处理，避免进程池的启动开销
+PARALLEL_MIN_GROUPS = 200
+
+_gazetteer = Gazetteer.default()
+
+
+def clean_duplicate_location(location):
+    # 清理重复的行政区名称
+    return _gazetteer.dedupe(location)
+
+
+def find_common_substring(locations):
+    if not locations:
+        return None
+
+    # 过滤无效数据并清理重复的行政区
+    invalid_words = ['无', '未联系到用户']
+    locations = [clean_duplicate_location(loc) for loc in locations 
+                if loc and isinstance(loc, str) and 
+                not any(word == loc for word in invalid_words)]
+    if not locations:
+        return None
+
+    # 用广义后缀自动机找出被最多位置共享的最长公共子串（至少4个字符），与输入顺序无关
+    shared = SuffixAutomaton(locations).most_shared_substring(min_length=4)
+    if not shared:
+        return None
+    common = shared[0]
+
+    # 定义地址结束标识词（按优先级排序）
+    location_markers = [
+        '学校', '中学', '高中', '学院', '专科学校',  # 教育机构
+        '工业园', '科技园', '厂房',                  # 工业区
+        '村', '小区', '广场', '府', '城',           # 具体地点
+        '镇'                                        # 行政区
+    ]
+
+    # 扩展公共子串以包含完整的地址
+    base_locations = []
+    for loc in locations:
+        if common in loc:
+            start_idx = loc.find(common)
+            # 向后查找地址标识词
+            for marker in location_markers:
+                marker_idx = loc.find(marker, start_idx)
+                if marker_idx >= 0:  # 找到标识词
+                    # 保留完整的行政区信息
+                    prefix = loc[:start_idx]
+                    if any(admin in prefix for admin in ['省', '市', '区', '县']):
+                        base_locations.append(loc[:marker_idx + len(marker)])
+                    else:
+                        base_locations.append(loc[start_idx:marker_idx + len(marker)])
+
+    # 选择出现次数最多的基础地址
+    if base_locations:
+        base_count = Counter(base_locations)
+        base_location = base_count.most_common(1)[0][0]
+
+        # 如果是学校类地址，查找楼栋信息
+        if any(marker in base_location for marker in ['学校', '中学', '学院', '专科']):
+            building_patterns = []
+            for loc in locations:
+                if base_location in loc:
+                    # 提取数字+楼栋标识
+                    remaining = loc[loc.find(base_location) + len(base_location):].strip()
+                    for i, char in enumerate(remaining):
+                        if char.isdigit():
+                            j = i
+                            while j < len(remaining) and (remaining[j].isdigit() or remaining[j] in ['栋', '号', '楼']):
+                                j += 1
+                            if j > i:
+                                # 只保留到"栋"或"号楼"
+                                building = remaining[i:j]
+                                for marker in ['栋', '号楼']:
+                                    if marker in building:
+                                        end_idx = building.find(marker) + len(marker)
+                                        building_patterns.append(building[:end_idx])
+                                        break
+
+            # 统计楼栋信息出现次数
+            if building_patterns:
+                building_count = Counter(building_patterns)
+                most_common = building_count.most_common(1)[0][0]
+                return f"{base_location}{most_common}"
+
+        return base_location
+
+    return common
+
 
 @error_handler
-def process_excel(df: pl.DataFrame):
-    def clean_duplicate_location(location):
-        # 清理重复的行政区名称
-        for admin in ['省', '市', '区', '县']:
-            parts = location.split(admin)
-            if len(parts) > 2:  # 如果同一个行政区出现多次
-                # 保留第一次出现的位置
-                cleaned = admin.join(parts[:2])
-                if len(parts) > 2:
-                    cleaned += admin.join(parts[2:])
-                location = cleaned
-        return location
-
-    def find_common_substring(locations):
-        if not locations:
-            return None
-            
-        # 过滤无效数据并清理重复的行政区
-        invalid_words = ['无', '未联系到用户']
-        locations = [clean_duplicate_location(loc) for loc in locations 
-                    if loc and isinstance(loc, str) and 
-                    not any(word == loc for word in invalid_words)]
-        if not locations:
-            return None
-            
-        # 找出最长公共子串
-        def get_common_substring(str1, str2):
-            matrix = {}
-            longest_length = 0
-            longest_end_pos = 0
-            
-            for i, char1 in enumerate(str1):
-                for j, char2 in enumerate(str2):
-                    if char1 == char2:
-                        current_length = matrix.get((i-1, j-1), 0) + 1
-                        matrix[i, j] = current_length
-                        if current_length > longest_length:
-                            longest_length = current_length
-                            longest_end_pos = i
-            
-            if longest_length < 4:  # 至少4个字符匹配
-                return None
-                
-            return str1[longest_end_pos - longest_length + 1:longest_end_pos + 1]
-            
-        # 找出所有位置中的公共子串
-        common = locations[0]
-        for loc in locations[1:]:
-            common_part = get_common_substring(common, loc)
-            if not common_part:
-                continue
-            common = common_part
-            
-        if len(common) < 4:
-            return None
-            
-        # 定义地址结束标识词（按优先级排序）
-        location_markers = [
-            '学校', '中学', '高中', '学院', '专科学校',  # 教育机构
-            '工业园', '科技园', '厂房',                  # 工业区
-            '村', '小区', '广场', '府', '城',           # 具体地点
-            '镇'                                        # 行政区
-        ]
-        
-        # 扩展公共子串以包含完整的地址
-        base_locations = []
-        for loc in locations:
-            if common in loc:
-                start_idx = loc.find(common)
-                # 向后查找地址标识词
-                for marker in location_markers:
-                    marker_idx = loc.find(marker, start_idx)
-                    if marker_idx >= 0:  # 找到标识词
-                        # 保留完整的行政区信息
-                        prefix = loc[:start_idx]
-                        if any(admin in prefix for admin in ['省', '市', '区', '县']):
-                            base_locations.append(loc[:marker_idx + len(marker)])
-                        else:
-                            base_locations.append(loc[start_idx:marker_idx + len(marker)])
-        
-        # 选择出现次数最多的基础地址
-        if base_locations:
-            base_count = Counter(base_locations)
-            base_location = base_count.most_common(1)[0][0]
-            
-            # 如果是学校类地址，查找楼栋信息
-            if any(marker in base_location for marker in ['学校', '中学', '学院', '专科']):
-                building_patterns = []
-                for loc in locations:
-                    if base_location in loc:
-                        # 提取数字+楼栋标识
-                        remaining = loc[loc.find(base_location) + len(base_location):].strip()
-                        for i, char in enumerate(remaining):
-                            if char.isdigit():
-                                j = i
-                                while j < len(remaining) and (remaining[j].isdigit() or remaining[j] in ['栋', '号', '楼']):
-                                    j += 1
-                                if j > i:
-                                    # 只保留到"栋"或"号楼"
-                                    building = remaining[i:j]
-                                    for marker in ['栋', '号楼']:
-                                        if marker in building:
-                                            end_idx = building.find(marker) + len(marker)
-                                            building_patterns.append(building[:end_idx])
-                                            break
-                
-                # 统计楼栋信息出现次数
-                if building_patterns:
-                    building_count = Counter(building_patterns)
-                    most_common = building_count.most_common(1)[0][0]
-                    return f"{base_location}{most_common}"
-            
-            return base_location
-
-        return common
-
-    # 按投诉标识分组
-    grouped_data = {}
-    for row in df.iter_rows(named=True):
-        complaint_id = row['投诉标识']
-        location = row['参考位置']
-        if complaint_id not in grouped_data:
-            grouped_data[complaint_id] = []
-        grouped_data[complaint_id].append(location)
-
-    # 处理每组数据
-    results = {}
-    for complaint_id, locations in grouped_data.items():
-        common_location = find_common_substring(locations)
-        if common_location:
-            results[complaint_id] = common_location
-
-    # 创建结果DataFrame
-    result_df = df.clone()
-    result_df = result_df.with_columns(
-        pl.Series(name="投诉位置", 
-                 values=[results.get(row['投诉标识']) for row in df.iter_rows(named=True)])
+def process_excel(df: pl.DataFrame, workers: int = None):
+    # 按投诉标识分组，每组的参考位置聚合为列表
+    grouped = df.group_by('投诉标识', maintain_order=True).agg(pl.col('参考位置'))
+    groups = grouped.get_column('参考位置').to_list()
+
+    # 各组互不依赖，分组较多时交给进程池并行处理
+    if workers == 1 or len(groups) < PARALLEL_MIN_GROUPS:
+        locations = [find_common_substring(group) for group in groups]
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(groups) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            locations = list(executor.map(find_common_substring, groups, chunksize=chunksize))
+
+    # 一次连接把结果写回所有记录，保持原记录顺序；投诉标识为空的记录与分组时一样归为同一组
+    results = grouped.select('投诉标识').with_columns(
+        pl.Series(name="_投诉位置", values=locations, dtype=pl.Utf8)
     )
+    result_df = (df.join(results, on='投诉标识', how='left', maintain_order='left', nulls_equal=True)
+                 .with_columns(pl.col('_投诉位置').alias('投诉位置'))
+                 .drop('_投诉位置'))
 
     return df, result_df
 